@@ -13,9 +13,13 @@ from datetime import datetime
 import matplotlib.pyplot as plt
 import numpy as np
 
+from app.telemetry import read_session
+
 def load_log_file(filename):
-    """Load a debug log file."""
+    """Load a debug log file (session logs are rebuilt into cumulative timings)."""
     try:
+        if filename.endswith('.jsonl'):
+            return read_session(filename)
         with open(filename, 'r') as f:
             return json.load(f)
     except Exception as e:
@@ -28,7 +32,7 @@ def list_log_files():
         print("No logs directory found.")
         return []
     
-    log_files = [f for f in os.listdir('logs') if f.endswith('.json')]
+    log_files = [f for f in os.listdir('logs') if f.endswith(('.json', '.jsonl'))]
     log_files.sort(reverse=True)  # Most recent first
     return log_files
 
@@ -180,6 +184,10 @@ def analyze_function_timings(log_data):
         print(f"     Total: {total_time:.2f}ms ({percentage:.1f}% of all function time)")
         print(f"     Avg: {avg_time:.2f}ms, Max: {max_time:.2f}ms, Calls: {calls}")
     
+    # Session logs also say how each function behaved window by window
+    if log_data.get('intervals'):
+        print_interval_timings(log_data['intervals'], [t[0] for t in timings[:10]])
+    
     # Plot function timings as a pie chart
     if timings:
         plt.figure(figsize=(10, 8))
@@ -208,6 +216,20 @@ def analyze_function_timings(log_data):
         
         plt.show()
 
+def print_interval_timings(intervals, func_names):
+    """Print how each function's average time per call varied across report windows."""
+    print(f"\nPer-window average time ({len(intervals)} windows):")
+    for func_name in func_names:
+        windows = [w['functionTimings'][func_name] for w in intervals
+                   if func_name in w['functionTimings'] and w['functionTimings'][func_name]['calls'] > 0]
+        if not windows:
+            continue
+        avgs = np.array([w['totalTime'] / w['calls'] for w in windows])
+        worst = max(range(len(windows)), key=lambda i: avgs[i])
+        print(f"  {func_name}: {len(windows)} active windows, avg min={avgs.min():.2f}ms, "
+              f"median={np.median(avgs):.2f}ms, max={avgs.max():.2f}ms "
+              f"({windows[worst]['calls']} calls in the slowest window)")
+
 def analyze_long_frames(log_data):
     """Analyze long frames to identify patterns."""
     if not log_data['longFrames']:
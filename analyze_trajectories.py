@@ -0,0 +1,80 @@
+"""
+Ant Simulation Trajectory Analyzer
+
+Streams a recorded run (see TrajectoryRecorder) and reports per-ant trip
+times from food to queen, food discovery latency, recruitment wait times,
+predator kill rates, deaths by cause and spatial occupancy. Recordings larger than memory
+are read in chunks.
+
+    python analyze_trajectories.py recordings/<colony id>
+    python analyze_trajectories.py recordings/<colony id> --heatmap occupancy.png
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from app.engine import TrajectoryReader
+from app.engine import analytics
+from app.engine.recorder import CHUNK_ROWS
+
+
+def list_recordings():
+    if not os.path.exists('recordings'):
+        return []
+    return sorted(os.listdir('recordings'), key=lambda d: os.path.getmtime(os.path.join('recordings', d)),
+                  reverse=True)
+
+
+def plot_heatmap(report, filename):
+    """Save the occupancy heatmap, one panel per phase plus the total."""
+    import matplotlib.pyplot as plt
+
+    heatmap = report['heatmap']
+    panels = [('all', heatmap.sum(axis=0))] + list(zip(analytics.PHASE_NAMES, heatmap))
+    fig, axs = plt.subplots(1, len(panels), figsize=(3 * len(panels), 3))
+    for ax, (name, counts) in zip(axs, panels):
+        ax.imshow(counts, cmap='magma', interpolation='nearest')
+        ax.set_title(name)
+        ax.set_xticks([])
+        ax.set_yticks([])
+    plt.tight_layout()
+    plt.savefig(filename)
+    print(f"\nOccupancy heatmap saved as {filename}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze recorded Ant Simulation trajectories')
+    parser.add_argument('path', nargs='?', help='Recording directory (default: the latest under recordings/)')
+    parser.add_argument('--cell', type=int, default=analytics.HEATMAP_CELL, help='Heatmap cell size in pixels')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Rows read per chunk')
+    parser.add_argument('--heatmap', type=str, default=None, help='Save the occupancy heatmap to this image')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    args = parser.parse_args()
+
+    path = args.path
+    if path is None:
+        recordings = list_recordings()
+        if not recordings:
+            print("No recordings found. Create a colony with \"record\": true first.")
+            sys.exit(1)
+        path = os.path.join('recordings', recordings[0])
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        print(f"Error: {path} is not a trajectory recording.")
+        sys.exit(1)
+
+    report = analytics.analyze(TrajectoryReader(path), cell=args.cell, chunk_rows=args.chunk_rows)
+    if args.json:
+        heatmap = report.pop('heatmap')
+        report['heatmap'] = heatmap.tolist() if heatmap is not None else None
+        print(json.dumps(report, indent=2))
+    else:
+        print(analytics.format_report(report))
+
+    if args.heatmap and report['heatmap'] is not None:
+        plot_heatmap(report, args.heatmap)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Fingerprinted asset lookup and the /dist static handler.
+
+build_assets.py writes hashed, precompressed copies of the scripts,
+stylesheets and images to app/dist together with a manifest. Templates call
+asset('/static/js/main.js') to get the hashed URL; without a build the
+original path is returned so development keeps working unchanged.
+"""
+
+import json
+import mimetypes
+import os
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Preferred encodings and the suffix of their precompressed files
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class AssetManifest:
+    """Maps logical asset URLs to their fingerprinted build outputs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.entries = {}
+
+    def reload(self):
+        """Re-read the manifest if it changed on disk."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self.mtime, self.entries = None, {}
+            return
+        if mtime != self.mtime:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+            self.mtime = mtime
+
+    def url(self, path):
+        self.reload()
+        return self.entries.get(path, path)
+
+    __call__ = url
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Serve .br/.gz siblings when the client accepts them, cached forever.
+
+    Every file under /dist has a content hash in its name, so responses can
+    be marked immutable and never revalidated.
+    """
+
+    async def get_response(self, path, scope):
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        response = None
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accept:
+                continue
+            try:
+                response = await super().get_response(path + suffix, scope)
+            except HTTPException:
+                continue
+            response.headers["content-encoding"] = encoding
+            media_type, _ = mimetypes.guess_type(path)
+            if media_type:
+                response.headers["content-type"] = media_type
+            break
+
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["cache-control"] = IMMUTABLE
+        response.headers["vary"] = "Accept-Encoding"
+        return response
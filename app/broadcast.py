@@ -0,0 +1,208 @@
+"""
+Encode-once fan-out of colony frames, with a bounded outbox per client.
+
+A popular colony can have dozens of viewers, most of them watching the
+whole world. Instead of every connection building and encoding its own
+frame, the runner encodes one frame per broadcast tick. The hub keeps it
+as an immutable bytes object and sends the same memoryview over it on
+every spectator's WebSocket, so adding a spectator adds only the send and
+never another copy. Clients that send a viewport leave the hub for the
+per-client interest tier (see ColonyRunner.broadcast).
+
+The tick loop never waits on a socket. Every connection has a ClientStream:
+a short outbound queue drained by its own sender task. When a slow client's
+queue is full, the frames still waiting are dropped and the next frame is
+sent as a keyframe, so the client catches up in one step. Memory per client
+is bounded by the queue length. Text messages are coalesced too: only the
+newest waits, but it takes over the event lists ("changes") of the ones it
+replaces, so no event is lost.
+"""
+
+import asyncio
+import json
+from collections import deque
+
+QUEUE_FRAMES = 4  # Frames waiting per client before they are coalesced
+SMOOTHING = 0.1   # Weight of the newest sample in the send time average
+
+
+class EncodedFrame:
+    """One tick's frame, encoded at most once as a delta and once as a keyframe."""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.tick = frame.tick
+        self._encoded = {}
+
+    def data(self, keyframe=False):
+        if keyframe not in self._encoded:
+            self._encoded[keyframe] = memoryview(self.frame.encode(keyframe=keyframe))
+        return self._encoded[keyframe]
+
+    @property
+    def nbytes(self):
+        return sum(len(data) for data in self._encoded.values())
+
+
+def merge_changes(older, newer):
+    """`newer` with the "changes" of `older` prepended, when both are JSON objects carrying them."""
+    try:
+        old, new = json.loads(older), json.loads(newer)
+    except ValueError:
+        return newer
+    if not isinstance(old, dict) or not isinstance(new, dict) or not old.get("changes"):
+        return newer
+    if not isinstance(old["changes"], list) or not isinstance(new.get("changes", []), list):
+        return newer
+    new["changes"] = old["changes"] + new.get("changes", [])
+    return json.dumps(new)
+
+
+class ClientStream:
+    """A client's bounded outbound queue and the task that sends it."""
+
+    def __init__(self, websocket, on_error=None, limit=QUEUE_FRAMES, meter=None):
+        self.websocket = websocket
+        self.on_error = on_error
+        self.meter = meter  # Rollup of bytes sent, shared by a colony's streams
+        self.queue = deque()  # (tick, frame bytes, is keyframe), or (None, text, False)
+        self.limit = limit
+        self.frames = 0       # Frames in the queue
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.needs_keyframe = True  # A new client, or one whose deltas were dropped
+
+        # Lag metrics
+        self.offered_tick = None
+        self.sent_tick = None
+        self.sent = 0
+        self.dropped = 0
+        self.keyframes = 0
+        self.send_ms = 0.0
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.queue.clear()
+        self.frames = 0
+
+    def push_text(self, message):
+        """Queue a state message; only the newest one waiting is kept, with the changes of any it replaces."""
+        for _, waiting, _ in (item for item in self.queue if item[0] is None):
+            message = merge_changes(waiting, message)
+        self.queue = deque(item for item in self.queue if item[0] is not None)
+        self.queue.append((None, message, False))
+        self.wakeup.set()
+
+    def push_frame(self, frame):
+        """Queue an EncodedFrame, coalescing everything still waiting if the client fell behind."""
+        if self.offered_tick is None:
+            self.sent_tick = frame.tick - 1  # Lag counts from the first frame offered
+        self.offered_tick = frame.tick
+        if self.frames >= self.limit:
+            self.dropped += self.frames
+            self.queue = deque(item for item in self.queue if item[0] is None)
+            self.frames = 0
+            self.needs_keyframe = True
+        keyframe = self.needs_keyframe
+        self.needs_keyframe = False
+        self.keyframes += keyframe
+        self.queue.append((frame.tick, frame.data(keyframe), keyframe))
+        self.frames += 1
+        self.wakeup.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.queue:
+                    tick, data, _ = self.queue.popleft()
+                    if tick is None:
+                        await self.websocket.send_text(data)
+                        if self.meter is not None:
+                            self.meter.add(len(data))
+                        continue
+                    self.frames -= 1
+                    started = loop.time()
+                    await self.websocket.send_bytes(data)
+                    self.send_ms += SMOOTHING * ((loop.time() - started) * 1000 - self.send_ms)
+                    if self.meter is not None:
+                        self.meter.add(len(data))
+                    self.sent_tick = tick
+                    self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.queue.clear()
+            self.frames = 0
+            if self.on_error is not None:
+                self.on_error()
+
+    @property
+    def lag(self):
+        """Ticks between the newest frame offered and the newest one sent."""
+        if self.offered_tick is None:
+            return 0
+        return self.offered_tick - self.sent_tick
+
+    def to_dict(self):
+        return {
+            "queued": self.frames,
+            "lagTicks": self.lag,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "keyframes": self.keyframes,
+            "sendMs": round(self.send_ms, 3),
+        }
+
+
+class BroadcastHub:
+    """Spectators of one colony; all of them get the same encoded frame."""
+
+    def __init__(self):
+        self.clients = {}  # client_id -> ClientStream
+        self.tick = None
+        self.frame = None  # EncodedFrame last published
+        self.published = 0
+
+    def __len__(self):
+        return len(self.clients)
+
+    def __contains__(self, client_id):
+        return client_id in self.clients
+
+    def add(self, client_id, stream):
+        stream.needs_keyframe = True
+        self.clients[client_id] = stream
+
+    def remove(self, client_id):
+        return self.clients.pop(client_id, None)
+
+    def publish(self, frame, message=None):
+        """Queue one tick's frame for every spectator, with an optional text message first.
+
+        The delta is encoded once, and the keyframe once if any spectator
+        needs one; every queue holds a memoryview over the same bytes.
+        """
+        self.frame = EncodedFrame(frame)
+        self.tick = frame.tick
+        self.published += 1
+        for stream in self.clients.values():
+            if message is not None:
+                stream.push_text(message)
+            stream.push_frame(self.frame)
+
+    def to_dict(self):
+        return {
+            "spectators": len(self.clients),
+            "tick": self.tick,
+            "frameBytes": self.frame.nbytes if self.frame is not None else 0,
+            "published": self.published,
+        }
@@ -0,0 +1,316 @@
+"""
+Server-side colonies: a registry of running engines and their tick loops.
+
+Each colony runs in its own asyncio task at the game's target frame rate.
+Spectators watching the whole world share one frame encoded per tick
+(BroadcastHub), and clients that sent a viewport get frames filtered to it.
+Frames are queued per client and sent by the client's own task, so a slow
+socket never holds up the tick loop.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict, deque
+
+from app.broadcast import BroadcastHub, ClientStream, EncodedFrame
+from app.engine import Colony, InterestManager, StateBuffer, TrajectoryRecorder
+from app.engine import constants as C
+from app.engine.commands import apply_batch, parse_batch
+from app.engine.quality import CLIENT_KNOBS, CLIENT_TARGET_MS, QualityController
+from app.metrics import Rollup
+
+RECORDINGS_DIR = "recordings"
+BATCH_HISTORY = 10000  # Idempotency keys remembered per colony
+SPECTATOR_FEED = "*"  # Interest subscription behind the shared spectator frame
+
+logger = logging.getLogger(__name__)
+
+
+class ColonyRunner:
+    """Ticks one colony and streams it to its subscribers."""
+
+    def __init__(self, colony_id, colony, interval_ms=C.FRAME_INTERVAL_MS):
+        self.colony_id = colony_id
+        self.colony = colony
+        self.interval_ms = interval_ms
+        self.interest = InterestManager()
+        self.interest.subscribe(SPECTATOR_FEED, width=colony.width, height=colony.height)
+        self.streams = {}  # client_id -> ClientStream, for every connection
+        self.hub = BroadcastHub()  # Spectators, sent the shared whole-world frame
+        self.clients = {}  # client_id -> ClientStream, for clients with their own viewport
+        self.quality = QualityController()  # Engine settings, driven by tick cost
+        self.client_quality = {}  # client_id -> QualityController for its stream
+        self.recorder = None  # TrajectoryRecorder when the colony is being recorded
+        self.tick_ms = Rollup()  # Wall time per tick, for the dashboard
+        self.stream_bytes = Rollup(quantiles=False)  # Bytes sent to clients, per message
+        self.state = StateBuffer(colony)  # Snapshots for readers in worker threads
+        # Command batches waiting for the next tick. deque append/popleft are atomic,
+        # so handlers hand batches to the tick loop without a lock.
+        self.commands = deque()
+        self.batches = OrderedDict()  # idempotency key -> (status, applied future)
+        self.task = None
+        self.error = None  # Why the tick loop stopped, if a tick raised
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                logger.exception("Colony %s tick loop failed", self.colony_id)
+            self.task = None
+        self.fail_pending("Colony stopped")
+        for client_id in list(self.streams):
+            self.disconnect(client_id)
+        if self.recorder is not None:
+            self.recorder.close()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        interval = self.interval_ms / 1000
+        while True:
+            started = loop.time()
+            try:
+                self.tick(loop.time)
+            except Exception as e:
+                # The colony may be half-updated, so it is not ticked again
+                self.error = f"Tick {self.colony.tick} failed: {type(e).__name__}: {e}"
+                logger.exception("Colony %s stopped: %s", self.colony_id, self.error)
+                self.fail_pending(self.error)
+                return
+            self.tick_ms.add((loop.time() - started) * 1000)
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+
+    def tick(self, clock):
+        """Apply queued commands, step the colony, record and stream it."""
+        self.apply_commands()
+        self.apply_quality()
+        self.colony.step(self.interval_ms)
+        if self.recorder is not None:
+            self.recorder.record(self.colony)
+
+        timings = dict(self.colony.timings, stream=0.0)
+        if self.colony.tick % self.quality["stream_every"] == 0:
+            index_ms = self.colony.index_ms
+            broadcast_started = clock()
+            self.broadcast()
+            # An ant index built for the frames counts as index cost, not stream cost
+            built = self.colony.index_ms - index_ms
+            timings["stream"] = (clock() - broadcast_started) * 1000 - built
+            timings["index"] += built
+        self.quality.observe(self.colony.tick, timings)
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def submit(self, commands, key=None):
+        """Validate a batch and queue it for the next tick.
+
+        Returns the batch status and a future resolved once it is applied. A
+        key that was already submitted returns the original batch instead of
+        queueing it again.
+        """
+        if key is not None and key in self.batches:
+            self.batches.move_to_end(key)
+            return self.batches[key]
+        if not self.running:
+            raise ValueError(self.error or "Colony is not running")
+        parsed = parse_batch(commands, self.colony.width, self.colony.height)
+        status = {"key": key, "status": "queued", "commands": len(parsed), "tick": None, "results": None}
+        applied = asyncio.get_running_loop().create_future()
+        self.commands.append((parsed, status, applied))
+        if key is not None:
+            self.batches[key] = (status, applied)
+            if len(self.batches) > BATCH_HISTORY:
+                self.batches.popitem(last=False)
+        return status, applied
+
+    def apply_commands(self):
+        """Apply every queued batch to the colony (between ticks)."""
+        while self.commands:
+            parsed, status, applied = self.commands.popleft()
+            try:
+                status["results"] = apply_batch(self.colony, parsed)
+                status["status"] = "applied"
+            except Exception as e:
+                if not isinstance(e, ValueError):
+                    logger.exception("Colony %s: command batch failed", self.colony_id)
+                status["status"] = "failed"
+                status["error"] = str(e)
+            status["tick"] = self.colony.tick
+            if not applied.done():
+                applied.set_result(status)
+
+    def fail_pending(self, error):
+        """Fail every batch still queued, so handlers waiting on them return."""
+        while self.commands:
+            parsed, status, applied = self.commands.popleft()
+            status["status"] = "failed"
+            status["error"] = error
+            if not applied.done():
+                applied.set_result(status)
+
+    def apply_quality(self):
+        """Copy the controller's engine settings onto the colony."""
+        self.colony.predator_interval = self.quality["predator_interval"]
+        self.colony.grid_size = self.quality["grid_size"]
+
+    def publish_state(self):
+        """The colony's StateBuffer, with the current tick published to its front.
+
+        Runs on the event loop, so it always sees the colony between ticks.
+        Readers then use state.read() from any thread while the colony ticks on.
+        """
+        if self.state.stale:
+            self.state.publish()
+        return self.state
+
+    def connect(self, client_id, websocket, **viewport):
+        """Add a client: a spectator, or with a viewport its own filtered stream.
+
+        Everything sent to it goes through its ClientStream, starting with
+        the current environment.
+        """
+        stream = ClientStream(websocket, on_error=lambda: self.disconnect(client_id), meter=self.stream_bytes)
+        stream.push_text(self.environment_message())
+        stream.start()
+        self.streams[client_id] = stream
+        self.attach(client_id, stream, **viewport)
+
+    def attach(self, client_id, stream, **viewport):
+        if not viewport:
+            self.hub.add(client_id, stream)
+            return
+        stream.needs_keyframe = True
+        self.clients[client_id] = stream
+        self.client_quality[client_id] = QualityController(CLIENT_KNOBS, CLIENT_TARGET_MS)
+        self.interest.subscribe(client_id, **viewport)
+
+    def detach(self, client_id):
+        stream = self.hub.remove(client_id) or self.clients.pop(client_id, None)
+        self.client_quality.pop(client_id, None)
+        self.interest.unsubscribe(client_id)
+        return stream
+
+    def disconnect(self, client_id):
+        self.detach(client_id)
+        stream = self.streams.pop(client_id, None)
+        if stream is not None:
+            stream.close()
+
+    def handle_message(self, client_id, message):
+        """Pan/zoom moves a spectator to its own viewport; {"type": "spectate"} moves it back."""
+        if not isinstance(message, dict):
+            return False
+        if message.get("type") == "spectate":
+            if client_id in self.clients:
+                self.attach(client_id, self.detach(client_id))
+            return True
+        if message.get("type") == "viewport" and client_id in self.hub:
+            self.attach(client_id, self.detach(client_id), width=self.colony.width, height=self.colony.height)
+        return self.interest.handle_message(client_id, message)
+
+    def environment_message(self, changes=()):
+        """Text message telling clients the environment entered a new state."""
+        return json.dumps({
+            "type": "environment",
+            "changes": list(changes),
+            "environment": self.colony.environment.to_dict(),
+        })
+
+    def broadcast(self):
+        """Queue the shared frame for spectators and a viewport frame for every other client.
+
+        Nothing here waits on a socket: frames go into each client's bounded
+        queue and its own task sends them. The spectator frame is built and
+        encoded once, however many are watching. Each viewport client's own
+        controller sets its frame detail and rate from how long its frames
+        take to build and send.
+        """
+        clock = asyncio.get_running_loop().time
+        tick = self.colony.tick
+        # Environment changes are pushed as events rather than polled
+        changes = self.colony.environment.drain_events()
+        message = self.environment_message(changes) if changes else None
+        if len(self.hub):
+            self.hub.publish(self.interest.frame(SPECTATOR_FEED, self.colony), message)
+        for client_id, stream in self.clients.items():
+            quality = self.client_quality[client_id]
+            if message is not None:
+                stream.push_text(message)
+            if tick % quality["stream_every"]:
+                continue
+            started = clock()
+            stream.push_frame(EncodedFrame(self.interest.frame(client_id, self.colony,
+                                                               max_ants=quality["max_ants"])))
+            quality.observe(tick, {"send": (clock() - started) * 1000 + stream.send_ms})
+
+    def to_dict(self):
+        info = self.colony.to_dict()
+        info["id"] = self.colony_id
+        info["running"] = self.running
+        info["error"] = self.error
+        info["clients"] = len(self.streams)
+        info["broadcast"] = self.hub.to_dict()
+        info["recording"] = self.recorder.path if self.recorder is not None else None
+        info["state"] = self.state.to_dict()
+        return info
+
+    def streams_dict(self):
+        """Queue and lag metrics of every connection."""
+        return {
+            client_id: dict(stream.to_dict(), tier="spectator" if client_id in self.hub else "viewport")
+            for client_id, stream in self.streams.items()
+        }
+
+    def quality_dict(self):
+        """Controller state and audit logs for the colony and each client."""
+        return {
+            "colony": self.quality.to_dict(),
+            "clients": {client_id: quality.to_dict() for client_id, quality in self.client_quality.items()},
+        }
+
+
+class ColonyRegistry:
+    """All colonies hosted by this server process."""
+
+    def __init__(self):
+        self.runners = {}
+
+    def create(self, record=False, record_every=1, **config):
+        colony_id = uuid.uuid4().hex[:12]
+        runner = ColonyRunner(colony_id, Colony(**config))
+        if record:
+            runner.recorder = TrajectoryRecorder(os.path.join(RECORDINGS_DIR, colony_id), runner.colony.width,
+                                                 runner.colony.height, every=record_every,
+                                                 tick_ms=runner.interval_ms)
+            runner.colony.track_deaths()  # Before the first tick, so every death is logged
+        self.runners[colony_id] = runner
+        runner.start()
+        return runner
+
+    def get(self, colony_id):
+        return self.runners.get(colony_id)
+
+    async def remove(self, colony_id):
+        runner = self.runners.pop(colony_id, None)
+        if runner is not None:
+            await runner.stop()
+        return runner
+
+    async def shutdown(self):
+        for colony_id in list(self.runners):
+            await self.remove(colony_id)
+
+
+registry = ColonyRegistry()
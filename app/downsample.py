@@ -0,0 +1,126 @@
+"""
+Largest-Triangle-Three-Buckets downsampling of debug log time series.
+
+A long debug session holds tens of thousands of fps and frameTime samples,
+and charting all of them stalls the debug viewer. LTTB (Steinarsson 2013)
+splits a series into as many buckets as points wanted and keeps, from each
+bucket, the sample forming the largest triangle with the point kept before
+it and the mean of the next bucket. Unlike averaging, this keeps the spikes
+that matter when looking for long frames.
+
+Each series gets a Pyramid: the raw samples plus levels downsampled by
+LEVEL_FACTOR in turn, down to about MIN_LEVEL points. A query for `points`
+samples in a time range starts from the coarsest level that still has at
+least that many samples in the range, so it runs LTTB over at most
+LEVEL_FACTOR times the points asked for, however long the session is.
+Pyramids are cached per log file (SeriesCache) and rebuilt only when the
+file changes.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+LEVEL_FACTOR = 4       # Points of a pyramid level per point of the next one
+MIN_LEVEL = 512        # Levels stop once they are this short
+DEFAULT_POINTS = 1000  # Points per series when a query gives only a time range
+MAX_POINTS = 5000      # Most points a query may ask for
+MAX_LOGS = 32          # Log files whose pyramids are cached
+
+
+def lttb(times, values, points):
+    """Indices of the `points` samples LTTB keeps (all of them if there are fewer)."""
+    n = len(times)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(times, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+    # First and last samples are kept; the rest is split into points - 2 buckets.
+    # The bucket after the last one is the final sample itself.
+    edges = np.append(np.linspace(1, n - 1, points - 1).astype(np.int64), n)
+    sums_x = np.concatenate(([0.0], np.cumsum(x)))
+    sums_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = edges[1:] - edges[:-1]
+    mean_x = (sums_x[edges[1:]] - sums_x[edges[:-1]]) / sizes
+    mean_y = (sums_y[edges[1:]] - sums_y[edges[:-1]]) / sizes
+
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = mean_x[i + 1], mean_y[i + 1]
+        # Twice the triangle area (a, candidate, next bucket mean); the constant half is dropped
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+class Pyramid:
+    """One series at full resolution and at successively coarser LTTB levels."""
+
+    def __init__(self, times, values):
+        order = np.argsort(times, kind="stable")
+        levels = [(np.asarray(times, dtype=np.float64)[order], np.asarray(values, dtype=np.float64)[order])]
+        while len(levels[-1][0]) > MIN_LEVEL * LEVEL_FACTOR:
+            t, v = levels[-1]
+            kept = lttb(t, v, len(t) // LEVEL_FACTOR)
+            levels.append((t[kept], v[kept]))
+        self.levels = levels
+
+    def __len__(self):
+        return len(self.levels[0][0])
+
+    def query(self, points, start=None, end=None):
+        """Up to `points` samples between `start` and `end` (inclusive) as (times, values, samples in range)."""
+        spans = []
+        for t, _ in self.levels:
+            lo = 0 if start is None else int(np.searchsorted(t, start, side="left"))
+            hi = len(t) if end is None else int(np.searchsorted(t, end, side="right"))
+            spans.append((lo, hi))
+        level = 0
+        while level + 1 < len(self.levels) and spans[level + 1][1] - spans[level + 1][0] >= points:
+            level += 1
+        t, v = self.levels[level]
+        lo, hi = spans[level]
+        kept = lttb(t[lo:hi], v[lo:hi], points) + lo
+        return t[kept], v[kept], spans[0][1] - spans[0][0]
+
+
+class SeriesCache:
+    """Pyramids of each log file's series, rebuilt when the file changes."""
+
+    def __init__(self, load, max_logs=MAX_LOGS):
+        self.load = load  # path -> {name: [(time, value), ...]}
+        self.max_logs = max_logs
+        self.logs = OrderedDict()  # path -> ((mtime, size), {name: Pyramid})
+        self.lock = threading.Lock()  # Queries run in worker threads
+
+    def pyramids(self, path):
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            cached = self.logs.pop(path, None)
+        if cached is None or cached[0] != version:
+            pyramids = {}
+            for name, samples in self.load(path).items():
+                times, values = zip(*samples) if samples else ((), ())
+                pyramids[name] = Pyramid(times, values)
+            cached = (version, pyramids)
+        with self.lock:
+            self.logs[path] = cached
+            while len(self.logs) > self.max_logs:
+                self.logs.popitem(last=False)
+        return cached[1]
+
+    def query(self, path, points, start=None, end=None):
+        """Each series of a log downsampled to `points`, with how many samples the range held."""
+        series, info = {}, {}
+        for name, pyramid in self.pyramids(path).items():
+            times, values, total = pyramid.query(points, start, end)
+            series[name] = [{"time": int(t), "value": float(v)} for t, v in zip(times, values)]
+            info[name] = {"samples": total, "points": len(series[name])}
+        return series, info
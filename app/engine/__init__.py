@@ -0,0 +1,35 @@
+"""
+Headless ant colony engine.
+
+Runs the same colony rules as the browser game on the server, with all
+entities stored as NumPy arrays so large colonies can be simulated, streamed
+and analysed without a canvas.
+"""
+
+from .colony import Colony
+from .ensemble import Ensemble
+from .environment import Environment
+from .interest import InterestFrame, InterestManager, Subscription
+from .recorder import TrajectoryReader, TrajectoryRecorder
+from .render import RenderCache, encode_png, rasterize
+from .snapshot import Snapshot, StateBuffer
+from .spatial import SpatialGrid
+from .timers import TimerWheel
+
+__all__ = [
+    "Colony",
+    "Ensemble",
+    "Environment",
+    "InterestFrame",
+    "InterestManager",
+    "RenderCache",
+    "Snapshot",
+    "SpatialGrid",
+    "StateBuffer",
+    "Subscription",
+    "TimerWheel",
+    "TrajectoryReader",
+    "TrajectoryRecorder",
+    "encode_png",
+    "rasterize",
+]
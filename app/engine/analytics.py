@@ -0,0 +1,257 @@
+"""
+Analytics over recorded trajectories.
+
+A recording is streamed chunk by chunk (see TrajectoryReader.chunks), so
+runs larger than memory can be analysed. Each chunk is split into phase
+episodes: runs of consecutive samples where one ant stays in one phase.
+Every metric is a vectorized group-by over those episodes:
+
+- trip time: CARRY episodes that end in a delivery (back to WANDER)
+- food discovery latency: scout WANDER episodes that end in SEEK
+- recruitment wait: worker FOLLOW episodes that end at the food
+- deaths: ants that vanish from the recording, by the cause in the
+  recording's deaths log (eaten, old age, burned); only the eaten ones
+  count as predator kills. Recordings made before the log existed report
+  every death as unknown.
+- occupancy: sample counts per grid cell and phase
+
+An episode that is still open at the end of a chunk is carried into the
+next one. Episodes cut off by the end of the recording are left out, and
+those cut off by its start are left out of the durations (but an ant seen
+from the start can still die).
+"""
+
+import itertools
+
+import numpy as np
+
+from . import constants as C
+from .recorder import CHUNK_ROWS, Trajectories
+
+DIED = -1  # Episode outcome: the ant disappeared
+UNKNOWN = len(C.DEATH_CAUSES)  # Cause of a death missing from the deaths log
+CAUSE_NAMES = C.DEATH_CAUSES + ("unknown",)
+PHASE_NAMES = ("wander", "seek", "lead", "follow", "wait", "carry")
+KIND_NAMES = ("worker", "scout")
+HEATMAP_CELL = 20
+
+
+class EpisodeStream:
+    """Turns time-ordered trajectory chunks into closed phase episodes."""
+
+    def __init__(self, ticks):
+        self.ticks = np.asarray(ticks)  # Every recorded tick, to find when an ant vanished
+        self.first_tick = self.ticks[0] if len(self.ticks) else 0
+        empty = np.zeros(0, dtype=np.int64)
+        # Open episodes carried between chunks
+        self.carry = {"ant_id": empty, "kind": empty, "phase": empty, "start": empty,
+                      "seen": empty, "fleeing": np.zeros(0, dtype=bool)}
+
+    def feed(self, rows, last_tick=None):
+        """Closed episodes in a chunk: dict of ant_id, kind, phase, start, end, outcome, fleeing
+        and complete (False when the episode was already under way at the first recorded tick).
+
+        `last_tick` is the chunk's last recorded tick, if it held no rows for it.
+        """
+        if not len(rows) and (last_tick is None or not len(self.carry["ant_id"])):
+            return None
+        if last_tick is None:
+            last_tick = rows.tick[-1]
+        carry = self.carry
+        ids = np.concatenate([carry["ant_id"], rows.ant_id])
+        kind = np.concatenate([carry["kind"], rows.kind])
+        phase = np.concatenate([carry["phase"], rows.phase])
+        seen = np.concatenate([carry["seen"], rows.tick])  # Tick the row was observed
+        begin = np.concatenate([carry["start"], rows.tick])  # Tick the episode began
+        fleeing = np.concatenate([carry["fleeing"], rows.fleeing])
+
+        # Carried rows come first, so a stable sort keeps each ant in time order
+        order = np.argsort(ids, kind="stable")
+        ids, kind, phase, seen, begin, fleeing = (a[order] for a in (ids, kind, phase, seen, begin, fleeing))
+
+        new = np.ones(len(ids), dtype=bool)
+        new[1:] = (ids[1:] != ids[:-1]) | (phase[1:] != phase[:-1])
+        first = np.flatnonzero(new)
+        last = np.append(first[1:], len(ids)) - 1
+        same_ant_next = np.append(ids[first[1:]] == ids[first[:-1]], False)
+
+        # Episodes followed by another phase of the same ant end when it starts
+        end = np.empty(len(first), dtype=np.int64)
+        outcome = np.empty(len(first), dtype=np.int64)
+        end[same_ant_next] = seen[first[1:]][same_ant_next[:-1]]
+        outcome[same_ant_next] = phase[first[1:]][same_ant_next[:-1]]
+
+        # An ant's last episode is still open if it was seen at the chunk's last tick,
+        # otherwise it vanished at the next recorded tick
+        tail = ~same_ant_next
+        open_ = tail & (seen[last] == last_tick)
+        died = tail & ~open_
+        after = np.searchsorted(self.ticks, seen[last[died]], side="right")
+        end[died] = self.ticks[np.minimum(after, len(self.ticks) - 1)]
+        outcome[died] = DIED
+
+        keep = first[open_]
+        self.carry = {"ant_id": ids[keep], "kind": kind[keep], "phase": phase[keep],
+                      "start": begin[keep], "seen": seen[last[open_]], "fleeing": fleeing[last[open_]]}
+
+        closed = ~open_
+        return {
+            "ant_id": ids[first][closed],
+            "kind": kind[first][closed],
+            "phase": phase[first][closed],
+            "start": begin[first][closed],
+            "end": end[closed],
+            "outcome": outcome[closed],
+            "fleeing": fleeing[last][closed],
+            "complete": begin[first][closed] > self.first_tick,
+        }
+
+    def finish(self):
+        """Episodes of ants that vanished after the last chunk with rows in it."""
+        return self.feed(Trajectories.empty(), self.ticks[-1]) if len(self.ticks) else None
+
+
+def duration_stats(seconds):
+    """Count, mean and percentiles of a set of durations (in seconds)."""
+    if not len(seconds):
+        return {"count": 0, "mean": None, "median": None, "p90": None, "max": None}
+    return {
+        "count": int(len(seconds)),
+        "mean": float(np.mean(seconds)),
+        "median": float(np.median(seconds)),
+        "p90": float(np.percentile(seconds, 90)),
+        "max": float(np.max(seconds)),
+    }
+
+
+def occupancy(rows, width, height, cell=HEATMAP_CELL):
+    """Sample counts per (phase, row, column) grid cell for a chunk of rows."""
+    gx = int(np.ceil(width / cell))
+    gy = int(np.ceil(height / cell))
+    cx = np.clip((rows.x // cell).astype(np.int64), 0, gx - 1)
+    cy = np.clip((rows.y // cell).astype(np.int64), 0, gy - 1)
+    cells = (rows.phase.astype(np.int64) * gy + cy) * gx + cx
+    return np.bincount(cells, minlength=len(PHASE_NAMES) * gy * gx).reshape(len(PHASE_NAMES), gy, gx)
+
+
+def death_causes(log, ant_ids):
+    """Cause of each ant's death in a (sorted ant ids, causes) log; UNKNOWN if not logged."""
+    if log is None or not len(log[0]):
+        return np.full(len(ant_ids), UNKNOWN, dtype=np.int64)
+    ids, causes = log
+    at = np.minimum(np.searchsorted(ids, ant_ids), len(ids) - 1)
+    return np.where(ids[at] == ant_ids, causes[at], UNKNOWN).astype(np.int64)
+
+
+def analyze(reader, cell=HEATMAP_CELL, chunk_rows=CHUNK_ROWS):
+    """Stream a recording once and compute every metric."""
+    meta = reader.meta
+    tick_s = reader.tick_ms / 1000
+    stream = EpisodeStream(reader.ticks)
+    trips, searches, waits = [], [], []
+    joined = abandoned = 0
+    deaths = np.zeros((len(CAUSE_NAMES), len(KIND_NAMES), 2), dtype=np.int64)  # [cause, kind, was fleeing]
+    log = reader.death_causes()
+    if log is not None:
+        order = np.argsort(log[0], kind="stable")
+        log = (log[0][order], log[1][order])
+    heatmap = None
+    ant_samples = 0
+
+    for rows in itertools.chain(reader.chunks(chunk_rows), [None]):
+        if rows is None:
+            ep = stream.finish()
+        else:
+            ant_samples += len(rows)
+            counts = occupancy(rows, meta["width"], meta["height"], cell)
+            heatmap = counts if heatmap is None else heatmap + counts
+            ep = stream.feed(rows)
+        if ep is None:
+            continue
+        duration = (ep["end"] - ep["start"]) * tick_s
+        phase, outcome, complete = ep["phase"], ep["outcome"], ep["complete"]
+
+        trips.append(duration[complete & (phase == C.CARRY) & (outcome == C.WANDER)])
+        searches.append(duration[complete & (ep["kind"] == C.SCOUT) & (phase == C.WANDER) & (outcome == C.SEEK)])
+        follow = complete & (ep["kind"] == C.WORKER) & (phase == C.FOLLOW)
+        arrived = follow & ((outcome == C.WAIT) | (outcome == C.CARRY))
+        waits.append(duration[arrived])
+        joined += int(arrived.sum())
+        abandoned += int((follow & (outcome == C.WANDER)).sum())
+
+        died = outcome == DIED
+        cause = death_causes(log, ep["ant_id"][died])
+        np.add.at(deaths, (cause, ep["kind"][died], ep["fleeing"][died].astype(np.int64)), 1)
+
+    ticks = reader.ticks
+    span = float(ticks[-1] - ticks[0]) * tick_s if len(ticks) > 1 else 0.0
+    # Ant-seconds observed; every row stands for `every` ticks of one ant
+    exposure = ant_samples * meta["every"] * tick_s
+    kills = deaths[C.EATEN]
+    total_kills = int(kills.sum())
+    return {
+        "seconds": span,
+        "samples": int(len(ticks)),
+        "rows": int(ant_samples),
+        "tripTime": duration_stats(np.concatenate(trips) if trips else []),
+        "discoveryLatency": duration_stats(np.concatenate(searches) if searches else []),
+        "recruitmentWait": {
+            **duration_stats(np.concatenate(waits) if waits else []),
+            "abandoned": abandoned,
+            "joinRate": joined / (joined + abandoned) if joined + abandoned else None,
+        },
+        "kills": {
+            "total": total_kills,
+            "byKind": {name: int(kills[k].sum()) for k, name in enumerate(KIND_NAMES)},
+            "whileFleeing": int(kills[:, 1].sum()),
+            "perMinute": total_kills / span * 60 if span else None,
+            "perAntHour": total_kills / exposure * 3600 if exposure else None,
+        },
+        "deaths": {name: int(deaths[c].sum()) for c, name in enumerate(CAUSE_NAMES)},
+        "heatmap": heatmap,
+        "cell": cell,
+    }
+
+
+def format_report(report):
+    """Plain-text summary of analyze()'s results."""
+    def stats_line(label, stats):
+        if not stats["count"]:
+            return f"  {label:<22} no complete episodes"
+        return (f"  {label:<22} n={stats['count']:<7} mean={stats['mean']:.2f}s median={stats['median']:.2f}s "
+                f"p90={stats['p90']:.2f}s max={stats['max']:.2f}s")
+
+    kills = report["kills"]
+    wait = report["recruitmentWait"]
+    lines = [
+        f"Recording: {report['seconds']:.0f}s simulated, {report['samples']} samples, {report['rows']} ant rows",
+        "",
+        "Episodes:",
+        stats_line("Trip time (food->queen)", report["tripTime"]),
+        stats_line("Food discovery", report["discoveryLatency"]),
+        stats_line("Recruitment wait", wait),
+    ]
+    if wait["joinRate"] is not None:
+        lines.append(f"  {'':<22} {wait['joinRate']:.0%} of recruited workers reached the food "
+                     f"({wait['abandoned']} gave up)")
+    lines += ["", "Predator kills:",
+              f"  total={kills['total']} workers={kills['byKind']['worker']} scouts={kills['byKind']['scout']} "
+              f"while fleeing={kills['whileFleeing']}"]
+    if kills["perMinute"] is not None:
+        lines.append(f"  {kills['perMinute']:.2f} per minute, {kills['perAntHour']:.3f} per ant-hour")
+    deaths = report["deaths"]
+    lines += ["", "Deaths by cause:", "  " + " ".join(f"{name}={n}" for name, n in deaths.items())]
+    if deaths["unknown"]:
+        lines.append("  (ants that vanished without a logged cause; recordings before the deaths log have no causes)")
+
+    heatmap = report["heatmap"]
+    if heatmap is not None:
+        total = heatmap.sum(axis=0)
+        row, col = np.unravel_index(np.argmax(total), total.shape)
+        cell = report["cell"]
+        lines += ["", f"Occupancy ({cell}px cells): busiest cell at x={col * cell}, y={row * cell} "
+                      f"with {total[row, col] / max(1, total.sum()):.1%} of all samples"]
+        for p, name in enumerate(PHASE_NAMES):
+            share = heatmap[p].sum() / max(1, total.sum())
+            lines.append(f"  {name:<8} {share:.1%} of samples")
+    return "\n".join(lines)
@@ -0,0 +1,858 @@
+"""
+Headless, vectorized colony simulation.
+
+A Colony keeps ants, food, obstacles and predators as NumPy column arrays
+(one array per field) instead of one object per entity, and advances all of
+them with array operations. The rules follow the browser game in
+app/static/js (Ant.updateScout/updateWorker, PredatorManager,
+updateFoodDecay, addNewAnt) so a server-side colony plays like the canvas
+version.
+"""
+
+import time
+
+import numpy as np
+
+from . import constants as C
+from .environment import Environment
+from .kernels import default_kernels, load_backend
+from .obstacles import ObstacleIndex, point_in_polygon
+from .spatial import SpatialGrid
+from .timers import TimerWheel
+
+# Ant columns: dtype and the value of a free slot
+ANT_COLUMNS = {
+    'ant_id': (np.int64, -1),
+    'ant_x': (np.float32, 0),
+    'ant_y': (np.float32, 0),
+    'ant_kind': (np.uint8, 0),
+    'ant_phase': (np.uint8, C.WANDER),
+    'ant_active': (bool, False),
+    'ant_fleeing': (bool, False),
+    'ant_food': (np.int32, -1),    # food slot or -1
+    'ant_follow': (np.int32, -1),  # scout slot or -1
+    'ant_born': (np.float32, 0),   # simulated seconds at birth
+}
+ANT_BLOCK = 256  # Initial ant capacity; it doubles whenever the pool runs out
+
+# Recruitment: idle workers are bucketed into cells holding about this many
+# workers on average, and each scout considers this many workers per open slot
+WORKERS_PER_CELL = 4
+CANDIDATES_PER_SLOT = 3
+
+PREDATOR_COLUMNS = (
+    'predator_id', 'predator_type', 'predator_x', 'predator_y', 'predator_tx', 'predator_ty',
+    'predator_hunger', 'predator_health', 'predator_cooldown', 'predator_target',
+    'predator_wander_timer', 'predator_wander_interval', 'predator_direction',
+)
+
+def rank_within(groups):
+    """Position of each element among earlier elements of the same group."""
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    first = np.searchsorted(sorted_groups, sorted_groups, side="left")
+    rank = np.empty(len(groups), dtype=np.intp)
+    rank[order] = np.arange(len(groups)) - first
+    return rank
+
+
+class Colony:
+    """One ant colony: queen, ants, food, obstacles, predators and environment."""
+
+    def __init__(self, seed=None, width=C.WORLD_WIDTH, height=C.WORLD_HEIGHT,
+                 scouts=C.INITIAL_SCOUTS, workers=C.INITIAL_WORKERS,
+                 scout_ratio=C.SCOUT_RATIO, food_ants_needed=C.FOOD_ANTS_NEEDED,
+                 predator_spawn_interval=C.PREDATOR_SPAWN_INTERVAL, max_predators=C.MAX_PREDATORS,
+                 predator_weights=None, multipliers=None, backend=None, birth_rate=0.0, lifespan=None):
+        self.seed = seed
+        self.kernels = default_kernels if backend is None else load_backend(backend)
+        self.rng = np.random.default_rng(seed)
+        self.width = float(width)
+        self.height = float(height)
+        self.queen = (self.width / 2, self.height - C.QUEEN_OFFSET)
+        self.environment = Environment(self.width, self.height, self.rng, multipliers)
+
+        # Tunable rules (defaults are the browser game's values)
+        self.scout_ratio = scout_ratio
+        self.food_ants_needed = np.asarray(food_ants_needed, dtype=np.int16)
+        self.predator_spawn_interval = predator_spawn_interval
+        self.max_predators = max_predators
+        if predator_weights is not None:
+            predator_weights = np.asarray(predator_weights, dtype=np.float64)
+            predator_weights = predator_weights / predator_weights.sum()
+        self.predator_weights = predator_weights
+        self.birth_rate = birth_rate  # Extra ants per second laid by the queen
+        self.lifespan = lifespan      # Seconds an ant lives (None: until eaten)
+
+        # Quality settings (see quality.QualityController)
+        self.grid_size = C.GRID_SIZE
+        self.predator_interval = 1  # Ticks between predator updates
+        self.predator_dt = 0.0      # Milliseconds not yet applied to predators
+        self.timings = {}           # Milliseconds per subsystem in the last step
+        self.index_ms = 0.0         # Time spent building the ant index this tick
+
+        self.tick = 0
+        self.score = 0
+        self.last_ant_added_score = 0
+        self.kills = 0
+        self.deaths = 0  # Ants that died of old age
+        self.burned = 0  # Ants burned by the magnifying glass
+        self.death_log = None  # (ant ids, cause) batches since drain_deaths, once track_deaths is called
+        self.births = 0.0  # Fractional queen births carried between ticks
+        self.next_ant_id = 0
+        self.next_food_id = 0
+        self.next_predator_id = 0
+        self._ant_index = None
+        self._ant_index_tick = -1
+
+        # Ant columns: a pool of slots, free while ant_active is False
+        for name, (dtype, fill) in ANT_COLUMNS.items():
+            setattr(self, name, np.full(ANT_BLOCK, fill, dtype=dtype))
+
+        # Food columns (slots are reused once the food is gone)
+        self.food_id = np.zeros(0, dtype=np.int64)
+        self.food_x = np.zeros(0, dtype=np.float32)
+        self.food_y = np.zeros(0, dtype=np.float32)
+        self.food_type = np.zeros(0, dtype=np.uint8)
+        self.food_decay_time = np.zeros(0, dtype=np.float32)
+        self.food_decay_timer = np.zeros(0, dtype=np.float32)  # Left as of food_decay_tick
+        self.food_decay_rate = np.zeros(0, dtype=np.float32)   # Lost per tick in the current epoch
+        self.food_decay_tick = np.zeros(0, dtype=np.int64)
+        self.food_decay_due = np.zeros(0, dtype=np.int64)      # Tick the food spoils on, or -1
+        self.food_needed = np.zeros(0, dtype=np.int16)
+        self.food_assigned = np.zeros(0, dtype=np.int16)
+        self.food_alive = np.zeros(0, dtype=bool)
+        self.food_timers = TimerWheel()
+        self.decay_epoch = self.environment.epoch
+
+        # Obstacle columns
+        self.obstacle_x = np.zeros(0, dtype=np.float32)
+        self.obstacle_y = np.zeros(0, dtype=np.float32)
+        self.obstacle_type = np.zeros(0, dtype=np.uint8)
+        self.obstacle_polygons = []  # Outline vertices relative to the centre, or None
+        self._obstacle_index = None  # Rebuilt after obstacle edits
+
+        # Predator columns
+        self.predator_id = np.zeros(0, dtype=np.int64)
+        self.predator_type = np.zeros(0, dtype=np.uint8)
+        self.predator_x = np.zeros(0, dtype=np.float32)
+        self.predator_y = np.zeros(0, dtype=np.float32)
+        self.predator_tx = np.zeros(0, dtype=np.float32)
+        self.predator_ty = np.zeros(0, dtype=np.float32)
+        self.predator_hunger = np.zeros(0, dtype=np.float32)
+        self.predator_health = np.zeros(0, dtype=np.float32)
+        self.predator_cooldown = np.zeros(0, dtype=np.float32)
+        self.predator_target = np.zeros(0, dtype=np.int32)
+        self.predator_wander_timer = np.zeros(0, dtype=np.float32)
+        self.predator_wander_interval = np.zeros(0, dtype=np.float32)
+        self.predator_direction = np.zeros(0, dtype=np.float32)
+        self.predator_spawn_timer = 0.0
+
+        self.add_ants(C.SCOUT, scouts)
+        self.add_ants(C.WORKER, workers)
+
+    # ------------------------------------------------------------------
+    # Counts and queries
+    # ------------------------------------------------------------------
+
+    @property
+    def ant_count(self):
+        return int(self.ant_active.sum())
+
+    @property
+    def scout_count(self):
+        return int((self.ant_active & (self.ant_kind == C.SCOUT)).sum())
+
+    @property
+    def worker_count(self):
+        return int((self.ant_active & (self.ant_kind == C.WORKER)).sum())
+
+    @property
+    def ant_capacity(self):
+        return len(self.ant_active)
+
+    @property
+    def food_count(self):
+        return int(self.food_alive.sum())
+
+    @property
+    def obstacle_count(self):
+        return len(self.obstacle_x)
+
+    @property
+    def predator_count(self):
+        return len(self.predator_x)
+
+    def ant_index(self):
+        """Spatial index over active ants, rebuilt at most once per tick."""
+        if self._ant_index is None or self._ant_index_tick != self.tick:
+            started = time.perf_counter()
+            slots = np.flatnonzero(self.ant_active)
+            self._ant_index = SpatialGrid(self.ant_x[slots], self.ant_y[slots], self.grid_size, ids=slots)
+            self._ant_index_tick = self.tick
+            self.index_ms += (time.perf_counter() - started) * 1000
+        return self._ant_index
+
+    def to_dict(self):
+        """Summary of the colony for API responses."""
+        return {
+            "tick": self.tick,
+            "seed": self.seed,
+            "width": self.width,
+            "height": self.height,
+            "score": self.score,
+            "antCount": self.ant_count,
+            "scoutCount": self.scout_count,
+            "workerCount": self.worker_count,
+            "foodCount": self.food_count,
+            "obstacleCount": self.obstacle_count,
+            "predatorCount": self.predator_count,
+            "kills": self.kills,
+            "deaths": self.deaths,
+            "burned": self.burned,
+            "antCapacity": self.ant_capacity,
+            "environment": self.environment.to_dict(),
+        }
+
+    # ------------------------------------------------------------------
+    # Edits (applied between ticks)
+    # ------------------------------------------------------------------
+
+    def grow_ants(self, capacity):
+        """Widen the ant pool to `capacity` slots; new slots are free."""
+        for name, (dtype, fill) in ANT_COLUMNS.items():
+            column = getattr(self, name)
+            if len(column) < capacity:
+                setattr(self, name, np.concatenate([column, np.full(capacity - len(column), fill, dtype=dtype)]))
+
+    def claim_ant_slots(self, n):
+        """n free ant slots (lowest first), doubling the pool when it runs out."""
+        free = np.flatnonzero(~self.ant_active)
+        if len(free) < n:
+            capacity = self.ant_capacity
+            while capacity - self.ant_count < n:
+                capacity *= 2
+            self.grow_ants(capacity)
+            free = np.flatnonzero(~self.ant_active)
+        return free[:n]
+
+    def add_ants(self, kind, n):
+        """Spawn n ants of one kind (or an array of n kinds) around the queen."""
+        if n <= 0:
+            return
+        slots = self.claim_ant_slots(n)
+        qx, qy = self.queen
+        offsets = self.rng.random((2, n), dtype=np.float32) * 50 - 25
+        self.ant_id[slots] = np.arange(self.next_ant_id, self.next_ant_id + n)
+        self.next_ant_id += n
+        self.ant_x[slots] = qx + offsets[0]
+        self.ant_y[slots] = qy + offsets[1]
+        self.ant_kind[slots] = kind
+        self.ant_phase[slots] = C.WANDER
+        self.ant_active[slots] = True
+        self.ant_fleeing[slots] = False
+        self.ant_food[slots] = -1
+        self.ant_follow[slots] = -1
+        self.ant_born[slots] = self.environment.elapsed
+        self._ant_index = None
+
+    def spawn_ants(self, n):
+        """Spawn a batch of n ants, choosing kinds to keep the scout ratio."""
+        if n <= 0:
+            return
+        scouts = int(round((self.ant_count + n) * self.scout_ratio)) - self.scout_count
+        scouts = min(max(scouts, 0), n)
+        self.add_ants(np.repeat(np.uint8([C.SCOUT, C.WORKER]), [scouts, n - scouts]), n)
+
+    def remove_ants(self, slots, cause):
+        """Ants die of `cause` (C.EATEN, C.OLD_AGE, C.BURNED): their slots go
+        back to the pool and their food and predator claims are dropped."""
+        slots = np.asarray(slots, dtype=np.intp)
+        if not len(slots):
+            return
+        if self.death_log is not None:
+            self.death_log.append((self.ant_id[slots].copy(), cause))
+        # Waiting ants and carriers both count towards their food's assigned ants
+        phase = self.ant_phase[slots]
+        claimed = slots[(self.ant_food[slots] >= 0) & ((phase == C.WAIT) | (phase == C.CARRY))]
+        np.subtract.at(self.food_assigned, self.ant_food[claimed], 1)
+        self.ant_active[slots] = False
+        self.ant_phase[slots] = C.WANDER
+        self.ant_food[slots] = -1
+        self.ant_follow[slots] = -1
+        # A freed slot may be reused by a newborn; no predator should keep chasing it
+        self.predator_target[np.isin(self.predator_target, slots)] = -1
+
+    def track_deaths(self):
+        """Start logging every death for drain_deaths. Call it when attaching
+        the consumer, before the colony ticks, so no death is missed."""
+        if self.death_log is None:
+            self.death_log = []
+
+    def drain_deaths(self):
+        """Ids and causes of the ants that died since the last call (or since track_deaths)."""
+        log = self.death_log
+        if log is not None:
+            self.death_log = []
+        if not log:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8)
+        return (np.concatenate([ids for ids, _ in log]),
+                np.concatenate([np.full(len(ids), cause, dtype=np.uint8) for ids, cause in log]))
+
+    def place_food(self, x, y, food_type='apple'):
+        """Place a food item and return its id."""
+        return int(self.place_foods([x], [y], [food_type])[0])
+
+    def place_foods(self, x, y, food_types):
+        """Place a batch of food items (free slots first) and return their ids."""
+        codes = np.array([C.FOOD_TYPES.index(t) for t in food_types], dtype=np.intp)
+        n = len(codes)
+        free = np.flatnonzero(~self.food_alive)
+        if len(free) < n:
+            extra = n - len(free)
+            for name in ('food_id', 'food_x', 'food_y', 'food_type', 'food_decay_time',
+                         'food_decay_timer', 'food_decay_rate', 'food_decay_tick', 'food_decay_due',
+                         'food_needed', 'food_assigned', 'food_alive'):
+                column = getattr(self, name)
+                setattr(self, name, np.concatenate([column, np.zeros(extra, dtype=column.dtype)]))
+            free = np.flatnonzero(~self.food_alive)
+        slots = free[:n]
+
+        ids = np.arange(self.next_food_id, self.next_food_id + n)
+        self.next_food_id += n
+        self.food_id[slots] = ids
+        self.food_x[slots] = x
+        self.food_y[slots] = y
+        self.food_type[slots] = codes
+        self.food_decay_time[slots] = C.FOOD_DECAY[codes]
+        self.food_decay_timer[slots] = C.FOOD_DECAY[codes]
+        self.food_needed[slots] = self.food_ants_needed[codes]
+        self.food_assigned[slots] = 0
+        self.food_alive[slots] = True
+        self.schedule_food_decay(slots)
+        return ids
+
+    def place_obstacle(self, x, y, obstacle_type='rock', polygon=None):
+        """Place an obstacle, optionally with a polygon outline of (dx, dy) vertices around (x, y)."""
+        self.place_obstacles([x], [y], [obstacle_type], None if polygon is None else [polygon])
+
+    def place_obstacles(self, x, y, obstacle_types, polygons=None):
+        """Place a batch of obstacles (polygons: one outline or None per obstacle)."""
+        codes = np.array([C.OBSTACLE_TYPES.index(t) for t in obstacle_types], dtype=np.uint8)
+        polygons = [None] * len(codes) if polygons is None else list(polygons)
+        for i, polygon in enumerate(polygons):
+            if polygon is not None:
+                polygons[i] = np.asarray(polygon, dtype=np.float32).reshape(-1, 2)
+                if len(polygons[i]) < 3:
+                    raise ValueError("An obstacle polygon needs at least 3 vertices")
+        self.obstacle_x = np.concatenate([self.obstacle_x, np.asarray(x, dtype=np.float32)])
+        self.obstacle_y = np.concatenate([self.obstacle_y, np.asarray(y, dtype=np.float32)])
+        self.obstacle_type = np.concatenate([self.obstacle_type, codes])
+        self.obstacle_polygons.extend(polygons)
+        self._obstacle_index = None
+
+    def obstacle_index(self):
+        """Collision index over the obstacles, rebuilt only after edits."""
+        if self._obstacle_index is None:
+            self._obstacle_index = ObstacleIndex(self.obstacle_x, self.obstacle_y, self.obstacle_type,
+                                                 self.obstacle_polygons, self.width, self.height)
+        return self._obstacle_index
+
+    def obstacles_at(self, x, y):
+        """Mask of obstacles containing the point (isPointInObstacle)."""
+        dx = x - self.obstacle_x
+        dy = y - self.obstacle_y
+        stick = self.obstacle_type == C.OBSTACLE_TYPES.index('stick')
+        in_rect = (np.abs(dx) <= 30) & (np.abs(dy) <= 10)
+        in_circle = np.hypot(dx, dy) < 20
+        inside = np.where(stick, in_rect, in_circle)
+        for j, polygon in enumerate(self.obstacle_polygons):
+            if polygon is not None:
+                inside[j] = point_in_polygon(dx[j], dy[j], polygon)
+        return inside
+
+    def remove_obstacle_at(self, x, y):
+        """Remove the first obstacle under the point; return True if one was removed."""
+        hits = np.flatnonzero(self.obstacles_at(x, y))
+        if not len(hits):
+            return False
+        keep = np.ones(len(self.obstacle_x), dtype=bool)
+        keep[hits[0]] = False
+        self.obstacle_x = self.obstacle_x[keep]
+        self.obstacle_y = self.obstacle_y[keep]
+        self.obstacle_type = self.obstacle_type[keep]
+        self.obstacle_polygons = [p for p, k in zip(self.obstacle_polygons, keep) if k]
+        self._obstacle_index = None
+        return True
+
+    def burn(self, x, y, radius):
+        """Magnifying glass: burn every ant and predator within radius of (x, y).
+
+        Burned ants die like any other (remove_ants), with their own cause.
+        """
+        ants = np.flatnonzero(self.ant_active & (np.hypot(self.ant_x - x, self.ant_y - y) <= radius))
+        self.remove_ants(ants, C.BURNED)
+        self.burned += len(ants)
+        hit = np.hypot(self.predator_x - x, self.predator_y - y) <= radius
+        if hit.any():
+            for name in PREDATOR_COLUMNS:
+                setattr(self, name, getattr(self, name)[~hit])
+        return len(ants), int(hit.sum())
+
+    def kill_food(self, slots):
+        """Remove food slots and release every ant that was working on them."""
+        slots = np.asarray(slots, dtype=np.intp)
+        if not len(slots):
+            return
+        self.food_alive[slots] = False
+        self.food_assigned[slots] = 0
+
+        involved = np.isin(self.ant_food, slots)
+        # Carriers keep walking home; everyone else goes back to searching
+        carrying = involved & (self.ant_phase == C.CARRY)
+        released = involved & ~carrying
+        self.ant_phase[released] = C.WANDER
+        self.ant_food[involved] = -1
+
+    # ------------------------------------------------------------------
+    # Simulation step
+    # ------------------------------------------------------------------
+
+    def step(self, dt_ms=C.FRAME_INTERVAL_MS):
+        """Advance the colony by one tick, timing each subsystem."""
+        clock = time.perf_counter
+        self.index_ms = 0.0
+        started = clock()
+        self.environment.update(dt_ms)
+        self.predator_dt += dt_ms
+        if self.tick % self.predator_interval == 0:
+            self.update_predators(self.predator_dt)
+            self.predator_dt = 0.0
+        predators = clock()
+        self.update_ants()
+        ants = clock()
+        self.update_food_decay()
+        self.update_population(dt_ms)
+        self.add_new_ants()
+        done = clock()
+        self.timings = {
+            "predators": (predators - started) * 1000 - self.index_ms,  # Includes the environment update
+            "ants": (ants - predators) * 1000,
+            "food": (done - ants) * 1000,
+            "index": self.index_ms,
+        }
+        self.tick += 1
+
+    def update_food_decay(self):
+        """Remove the food that spoils this tick.
+
+        Food decays at a fixed rate between environment epochs, so each
+        item's spoil tick is computed once and filed in a timer wheel; only
+        a new epoch reschedules the food that is left.
+        """
+        if self.environment.epoch != self.decay_epoch:
+            self.decay_epoch = self.environment.epoch
+            alive = np.flatnonzero(self.food_alive)
+            self.food_decay_timer[alive] = self.food_decay_left(alive)
+            self.food_timers.clear()
+            self.schedule_food_decay(alive)
+
+        fired = self.food_timers.advance(self.tick)
+        fired = fired[self.food_alive[fired] & (self.food_decay_due[fired] == self.tick)]
+        self.kill_food(np.unique(fired))
+
+    def schedule_food_decay(self, slots):
+        """Work out when food spoils from its timer and the current multipliers."""
+        rate = C.FOOD_DECAY_RATE * self.environment.food_decay_multiplier(self.food_x[slots], self.food_y[slots])
+        self.food_decay_rate[slots] = rate
+        self.food_decay_tick[slots] = self.tick
+        # The timer is decremented once per tick from this one on and spoils at <= 0
+        due = np.full(len(slots), -1, dtype=np.int64)
+        decaying = rate > 0
+        ticks = np.ceil(self.food_decay_timer[slots][decaying].astype(np.float64) / rate[decaying])
+        due[decaying] = self.tick + np.maximum(ticks, 1).astype(np.int64) - 1
+        self.food_decay_due[slots] = due
+        self.food_timers.schedule(slots[due >= 0], due[due >= 0])
+
+    def food_decay_left(self, slots=None):
+        """Current decay timers (of all food, or of the given slots)."""
+        if slots is None:
+            slots = np.arange(len(self.food_alive))
+        spent = (self.tick - self.food_decay_tick[slots]) * self.food_decay_rate[slots]
+        return np.maximum(self.food_decay_timer[slots] - spent, 0).astype(np.float32)
+
+    def update_population(self, dt_ms):
+        """Queen births at birth_rate and deaths of old age, each as one batch."""
+        if self.lifespan is not None:
+            old = self.ant_active & (self.environment.elapsed - self.ant_born >= self.lifespan)
+            if old.any():
+                old = np.flatnonzero(old)
+                self.remove_ants(old, C.OLD_AGE)
+                self.deaths += len(old)
+        if self.birth_rate > 0:
+            self.births += self.birth_rate * dt_ms / 1000
+            born = int(self.births)
+            self.births -= born
+            self.spawn_ants(born)
+
+    def add_new_ants(self):
+        """Add a new ant every 10 points, keeping roughly 30% scouts."""
+        if self.score > 0 and self.score % C.POINTS_PER_ANT == 0 and self.score != self.last_ant_added_score:
+            self.last_ant_added_score = self.score
+            scouts, workers = self.scout_count, self.worker_count
+            total = scouts + workers
+            if total == 0 or scouts / total < self.scout_ratio:
+                self.add_ants(C.SCOUT, 1)
+            else:
+                self.add_ants(C.WORKER, 1)
+
+    # ------------------------------------------------------------------
+    # Ants
+    # ------------------------------------------------------------------
+
+    def obstacle_avoidance(self, nx, ny):
+        """Summed avoidance vectors from obstacles near the next positions."""
+        return self.obstacle_index().avoidance(self.kernels, nx, ny)
+
+    def move_ants_toward(self, idx, tx, ty):
+        """Move ants toward targets with terrain speed and obstacle avoidance."""
+        if not len(idx):
+            return np.zeros(0, dtype=np.float32)
+        x, y = self.ant_x[idx], self.ant_y[idx]
+        dx, dy = tx - x, ty - y
+        dist = np.hypot(dx, dy)
+        ux = dx / np.maximum(dist, 1e-6)
+        uy = dy / np.maximum(dist, 1e-6)
+
+        speed = C.ANT_SPEED[self.ant_kind[idx]]
+        step = speed * self.environment.ant_speed_multiplier(x, y)
+        nx = x + ux * step
+        ny = y + uy * step
+
+        ax, ay = self.obstacle_avoidance(nx, ny)
+        magnitude = np.hypot(ax, ay)
+        blend = np.minimum(1.0, magnitude / 2)
+        avoiding = magnitude > 0
+        nx = np.where(avoiding, x + ux * speed * (1 - blend) + ax * blend, nx)
+        ny = np.where(avoiding, y + uy * speed * (1 - blend) + ay * blend, ny)
+
+        arrived = dist < 0.1
+        self.ant_x[idx] = np.where(arrived, tx, nx)
+        self.ant_y[idx] = np.where(arrived, ty, ny)
+        return np.hypot(tx - self.ant_x[idx], ty - self.ant_y[idx])
+
+    def wander_ants(self, idx):
+        """Random walk with environment speed, kept inside the world."""
+        if not len(idx):
+            return
+        x, y = self.ant_x[idx], self.ant_y[idx]
+        multiplier = self.environment.ant_speed_multiplier(x, y)
+        jitter = self.rng.random((2, len(idx)), dtype=np.float32) * 2 - 1
+        self.ant_x[idx] = np.clip(x + jitter[0] * multiplier, 0, self.width)
+        self.ant_y[idx] = np.clip(y + jitter[1] * multiplier, 0, self.height)
+
+    def update_ants(self):
+        """Advance every active ant by one step."""
+        qx, qy = self.queen
+        wandering = []
+
+        fleeing = self.update_fleeing()
+        ready = self.ant_active & ~fleeing
+        wandering.append(self.update_scouts(ready))
+        self.update_carriers(ready, qx, qy)
+        wandering.append(self.update_workers(ready))
+
+        self.wander_ants(np.sort(np.concatenate(wandering)))
+
+    def update_fleeing(self):
+        """Start/continue fleeing to the queen when a predator is close (checkForPredators)."""
+        active = self.ant_active
+        if len(self.predator_x):
+            slots = np.flatnonzero(active)
+            near = self.kernels.within_radius(self.ant_x[slots], self.ant_y[slots],
+                                              self.predator_x, self.predator_y, C.FLEE_RADIUS)
+            self.ant_fleeing[slots[near]] = True
+        fleeing = active & self.ant_fleeing
+        idx = np.flatnonzero(fleeing)
+        if len(idx):
+            qx, qy = self.queen
+            dist = self.move_ants_toward(idx, qx, qy)
+            self.ant_fleeing[idx[dist < C.ARRIVE_RADIUS]] = False
+        return fleeing
+
+    def update_scouts(self, ready):
+        """Scouts search for food, stand on it while recruiting, or pick it up."""
+        scouts = ready & (self.ant_kind == C.SCOUT)
+
+        # Scouts leading workers: go back to searching once the food is gone or full
+        lead = np.flatnonzero(scouts & (self.ant_phase == C.LEAD))
+        if len(lead):
+            f = self.ant_food[lead]
+            done = (f < 0) | (self.food_assigned[f] >= self.food_needed[f])
+            self.ant_phase[lead[done]] = C.WANDER
+            self.ant_food[lead[done]] = -1
+            lead = lead[~done]
+            f = self.ant_food[lead]
+            self.move_ants_toward(lead, self.food_x[f], self.food_y[f])
+
+        search = np.flatnonzero(scouts & ((self.ant_phase == C.WANDER) | (self.ant_phase == C.SEEK)))
+        available = np.flatnonzero(self.food_alive & (self.food_assigned < self.food_needed))
+        if not len(search) or not len(available):
+            self.ant_phase[search] = C.WANDER
+            self.ant_food[search] = -1
+            return search
+
+        best, _ = self.kernels.nearest(self.ant_x[search], self.ant_y[search],
+                                       self.food_x[available], self.food_y[available])
+        target = available[best]
+        self.ant_phase[search] = C.SEEK
+        self.ant_food[search] = target
+        dist = self.move_ants_toward(search, self.food_x[target], self.food_y[target])
+
+        found = dist < C.FOOD_REACH
+        solo = found & (self.food_needed[target] == 1)
+        if solo.any():
+            # Only the first scout to reach a single-ant item picks it up
+            picked, first = np.unique(target[solo], return_index=True)
+            carriers = search[solo][first]
+            self.ant_phase[carriers] = C.CARRY
+            self.food_assigned[picked] = 1
+        group = found & (self.food_needed[target] > 1)
+        self.ant_phase[search[group]] = C.LEAD
+        return np.zeros(0, dtype=np.intp)
+
+    def update_carriers(self, ready, qx, qy):
+        """Carry food back to the queen and score on delivery."""
+        carry = np.flatnonzero(ready & (self.ant_phase == C.CARRY))
+        if not len(carry):
+            return
+        dist = self.move_ants_toward(carry, qx, qy)
+        delivered = carry[dist < C.ARRIVE_RADIUS]
+        if not len(delivered):
+            return
+        self.score += len(delivered)
+        slots = self.ant_food[delivered]
+        self.ant_phase[delivered] = C.WANDER
+        self.ant_food[delivered] = -1
+        self.kill_food(np.unique(slots[slots >= 0]))
+
+    def update_workers(self, ready):
+        """Workers follow scouts to food and join the group carrying it."""
+        workers = ready & (self.ant_kind == C.WORKER)
+
+        follow = np.flatnonzero(workers & (self.ant_phase == C.FOLLOW))
+        if len(follow):
+            scout = self.ant_follow[follow]
+            valid = self.ant_active[scout] & (self.ant_phase[scout] == C.LEAD)
+            self.ant_phase[follow[~valid]] = C.WANDER
+            self.ant_follow[follow[~valid]] = -1
+            follow, scout = follow[valid], scout[valid]
+
+            self.move_ants_toward(follow, self.ant_x[scout], self.ant_y[scout])
+            f = self.ant_food[scout]
+            at_food = np.hypot(self.ant_x[follow] - self.food_x[f],
+                               self.ant_y[follow] - self.food_y[f]) < C.ARRIVE_RADIUS
+            self.join_food(follow[at_food], f[at_food])
+
+        idle = np.flatnonzero(workers & (self.ant_phase == C.WANDER))
+        return self.recruit_workers(idle)
+
+    def join_food(self, joiners, slots):
+        """Add arriving workers to their food; the one that completes the group carries it."""
+        if not len(joiners):
+            return
+        new_count = self.food_assigned[slots] + rank_within(slots) + 1
+        needed = self.food_needed[slots]
+        overflow = new_count > needed
+        self.ant_phase[joiners[overflow]] = C.WANDER
+        self.ant_follow[joiners] = -1
+
+        joined, slots, new_count = joiners[~overflow], slots[~overflow], new_count[~overflow]
+        self.ant_food[joined] = slots
+        self.ant_phase[joined] = np.where(new_count == self.food_needed[slots], C.CARRY, C.WAIT)
+        np.maximum.at(self.food_assigned, slots, new_count.astype(self.food_assigned.dtype))
+
+    def recruit_workers(self, idle):
+        """Send idle workers to the nearest scout that still needs helpers."""
+        lead = np.flatnonzero(self.ant_active & (self.ant_kind == C.SCOUT) & (self.ant_phase == C.LEAD))
+        if not len(idle) or not len(lead):
+            return idle
+
+        following = self.ant_follow[self.ant_active & (self.ant_phase == C.FOLLOW)]
+        followers = np.bincount(following, minlength=len(self.ant_x))[lead]
+        f = self.ant_food[lead]
+        open_slots = self.food_needed[f] - self.food_assigned[f] - followers
+        lead, open_slots = lead[open_slots > 0], open_slots[open_slots > 0]
+        if not len(lead):
+            return idle
+
+        # One matching for the whole tick: closest (worker, scout) pairs first,
+        # instead of each worker sorting the scouts in arrival order as in ant.js
+        w, s, d = self.recruit_candidates(idle, lead, open_slots)
+        order = np.argsort(d)
+        w, s = w[order], s[order]
+        accepted = self.kernels.match_pairs(w, s, open_slots, len(idle))
+        recruits = idle[w[accepted]]
+        self.ant_phase[recruits] = C.FOLLOW
+        self.ant_follow[recruits] = lead[s[accepted]]
+        remaining = np.ones(len(idle), dtype=bool)
+        remaining[w[accepted]] = False
+        return idle[remaining]
+
+    def recruit_candidates(self, idle, lead, open_slots):
+        """(worker, scout, distance) candidate pairs: each scout's nearest idle workers.
+
+        Idle workers are bucketed into a grid sized to their density and each
+        scout looks at the cells around it, widening the ring only for scouts
+        that found too few, so the cost stays near-linear in colony size.
+        """
+        cell = max(1.0, np.sqrt(self.width * self.height * WORKERS_PER_CELL / len(idle)))
+        grid = SpatialGrid(self.ant_x[idle], self.ant_y[idle], cell)
+        wanted = open_slots.astype(np.int64) * CANDIDATES_PER_SLOT
+        near, far = grid.ring_bounds(self.ant_x[lead], self.ant_y[lead])
+
+        # Scouts away from the workers start at the first ring that reaches
+        # them and then double how deep they look; no cell gives a scout
+        # more workers than it wants
+        workers, scouts = [], []
+        pending = np.arange(len(lead))
+        rings = np.maximum(near, 1)
+        while len(pending):
+            query, worker = grid.neighbours(self.ant_x[lead[pending]], self.ant_y[lead[pending]],
+                                            rings, wanted[pending])
+            found = np.bincount(query, minlength=len(pending))
+            done = (found >= wanted[pending]) | (rings >= far[pending])
+            take = done[query]
+            workers.append(worker[take])
+            scouts.append(pending[query[take]])
+            pending, rings = pending[~done], rings[~done]
+            rings += np.maximum(rings - near[pending], 1)
+        w, s = np.concatenate(workers), np.concatenate(scouts)
+
+        d = np.hypot(self.ant_x[idle[w]] - self.ant_x[lead[s]], self.ant_y[idle[w]] - self.ant_y[lead[s]])
+        # Nearest first within each scout, with one sort over a combined key
+        order = np.argsort(s * (2.0 * float(d.max(initial=0.0)) + 1.0) + d)
+        w, s, d = w[order], s[order], d[order]
+        counts = np.bincount(s, minlength=len(lead))
+        rank = np.arange(len(s)) - np.repeat(np.cumsum(counts) - counts, counts)
+        keep = rank < wanted[s]
+        return w[keep], s[keep], d[keep]
+
+    # ------------------------------------------------------------------
+    # Predators
+    # ------------------------------------------------------------------
+
+    def spawn_predator(self, type_code=None):
+        """Spawn a predator at a random edge of the world."""
+        if type_code is None:
+            # selectPredatorType: uniform unless weights were given
+            if self.predator_weights is None:
+                type_code = int(self.rng.integers(len(C.PREDATOR_TYPES)))
+            else:
+                type_code = int(self.rng.choice(len(C.PREDATOR_TYPES), p=self.predator_weights))
+        side = int(self.rng.integers(4))
+        r = float(self.rng.random())
+        x, y = [(r * self.width, 0.0), (self.width, r * self.height),
+                (r * self.width, self.height), (0.0, r * self.height)][side]
+
+        values = {
+            'predator_id': self.next_predator_id, 'predator_type': type_code,
+            'predator_x': x, 'predator_y': y, 'predator_tx': x, 'predator_ty': y,
+            'predator_hunger': 50.0, 'predator_health': 100.0, 'predator_cooldown': 0.0, 'predator_target': -1,
+            'predator_wander_timer': 0.0,
+            'predator_wander_interval': 2 + float(self.rng.random()) * 3,
+            'predator_direction': float(self.rng.random()) * np.pi * 2,
+        }
+        for name, value in values.items():
+            column = getattr(self, name)
+            setattr(self, name, np.append(column, column.dtype.type(value)))
+        self.next_predator_id += 1
+
+    def move_predator(self, i, tx, ty, dt):
+        """Move predator i toward a point (speed is per second, like predators.js)."""
+        dx, dy = tx - self.predator_x[i], ty - self.predator_y[i]
+        dist = np.hypot(dx, dy)
+        if dist < 1:
+            return
+        multiplier = self.environment.ant_speed_multiplier(self.predator_x[i], self.predator_y[i])
+        step = C.PREDATOR_SPEED[self.predator_type[i]] * multiplier * dt
+        self.predator_x[i] += dx / dist * step
+        self.predator_y[i] += dy / dist * step
+        self.predator_direction[i] = np.arctan2(dy, dx)
+
+    def update_predators(self, dt_ms):
+        """Hunger, hunting, eating and spawning of predators."""
+        dt = dt_ms / 1000
+        alive = np.ones(len(self.predator_x), dtype=bool)
+
+        for i in range(len(self.predator_x)):
+            self.predator_hunger[i] += dt * 2
+            if self.predator_hunger[i] > 80:
+                self.predator_health[i] -= dt * 5
+            if self.predator_health[i] <= 0:
+                alive[i] = False
+                continue
+            if self.predator_cooldown[i] > 0:
+                self.predator_cooldown[i] -= dt
+
+            target = self.predator_target[i]
+            if target >= 0 and not self.ant_active[target]:
+                target = -1
+            if target < 0 and self.predator_hunger[i] > 30 and self.predator_cooldown[i] <= 0:
+                target = self.find_prey(i)
+            self.predator_target[i] = target
+
+            if target >= 0:
+                self.move_predator(i, self.ant_x[target], self.ant_y[target], dt)
+                size = C.PREDATOR_SIZE[self.predator_type[i]]
+                if np.hypot(self.predator_x[i] - self.ant_x[target],
+                            self.predator_y[i] - self.ant_y[target]) < size / 2:
+                    self.eat_ant(i, target)
+            else:
+                self.wander_predator(i, dt)
+
+        if not alive.all():
+            for name in PREDATOR_COLUMNS:
+                setattr(self, name, getattr(self, name)[alive])
+
+        self.predator_spawn_timer += dt
+        if self.predator_spawn_timer >= self.predator_spawn_interval and len(self.predator_x) < self.max_predators:
+            self.spawn_predator()
+            self.predator_spawn_timer = 0.0
+
+    def find_prey(self, i):
+        """Closest active ant within the predator's hunt radius, or -1."""
+        px, py = self.predator_x[i], self.predator_y[i]
+        index = self.ant_index()
+        hits = index.query_radius(px, py, C.PREDATOR_HUNT_RADIUS[self.predator_type[i]])
+        if not len(hits):
+            return -1
+        slots = index.ids[hits]
+        slots = slots[self.ant_active[slots]]
+        if not len(slots):
+            return -1
+        d = np.hypot(self.ant_x[slots] - px, self.ant_y[slots] - py)
+        return int(slots[np.argmin(d)])
+
+    def wander_predator(self, i, dt):
+        """Pick a new wander point every few seconds and walk toward it."""
+        self.predator_wander_timer[i] += dt
+        if self.predator_wander_timer[i] >= self.predator_wander_interval[i]:
+            self.predator_wander_timer[i] = 0
+            self.predator_wander_interval[i] = 2 + self.rng.random() * 3
+            direction = self.rng.random() * np.pi * 2
+            distance = 100 + self.rng.random() * 100
+            size = C.PREDATOR_SIZE[self.predator_type[i]]
+            self.predator_direction[i] = direction
+            self.predator_tx[i] = np.clip(self.predator_x[i] + np.cos(direction) * distance, size, self.width - size)
+            self.predator_ty[i] = np.clip(self.predator_y[i] + np.sin(direction) * distance, size, self.height - size)
+        self.move_predator(i, self.predator_tx[i], self.predator_ty[i], dt)
+
+    def eat_ant(self, i, ant):
+        """Predator i eats an ant: its slot goes back to the pool."""
+        self.remove_ants([ant], C.EATEN)
+        self.predator_hunger[i] = max(0.0, self.predator_hunger[i] - 20)
+        self.predator_health[i] = min(100.0, self.predator_health[i] + 10)
+        self.predator_cooldown[i] = 2
+        self.predator_target[i] = -1
+        self.kills += 1
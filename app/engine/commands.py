@@ -0,0 +1,175 @@
+"""
+Batched edit commands for server-side colonies.
+
+The browser places food and obstacles one click at a time. Here a client
+sends a batch of commands, which is validated up front and then applied to
+the colony between two ticks:
+
+    {"type": "food", "x": [..], "y": [..], "foodType": "apple" | [..]}
+    {"type": "obstacle", "x": [..], "y": [..], "obstacleType": "rock" | [..]}
+    {"type": "polyline", "points": [[x, y], ..], "width": 10}
+    {"type": "burn", "x": .., "y": .., "radius": 20}
+    {"type": "ants", "count": n, "kind": "scout" | "worker"}  (no kind: keep the scout ratio)
+    {"type": "removeObstacle", "x": .., "y": ..}
+
+Each command becomes one bulk edit on the colony (place_foods,
+place_obstacles, spawn_ants, burn), and every command returns a small
+result. Positions are checked as the float32 values the colony stores,
+and must lie inside the world.
+"""
+
+import numpy as np
+
+from . import constants as C
+
+MAX_BATCH_ITEMS = 100000  # Items (food, obstacles, ants, points) per batch
+POLYLINE_WIDTH = 10
+BURN_RADIUS = 20
+
+
+def _number(command, name, default=None):
+    value = command.get(name, default)
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise ValueError(f"'{name}' must be a number")
+    with np.errstate(over="ignore"):
+        finite = np.isfinite(np.float32(value))
+    if not finite:
+        raise ValueError(f"'{name}' must be finite")
+    return float(value)
+
+
+def _in_world(x, y, width, height):
+    """Check float32 positions; values too large for float32 have become inf."""
+    if not np.isfinite(x).all() or not np.isfinite(y).all():
+        raise ValueError("Positions must be finite")
+    if (x < 0).any() or (x > width).any() or (y < 0).any() or (y > height).any():
+        raise ValueError(f"Positions must lie inside the world (0..{width:g} x 0..{height:g})")
+
+
+def _positions(command, width, height):
+    x = np.atleast_1d(np.asarray(command.get("x", []), dtype=np.float64))
+    y = np.atleast_1d(np.asarray(command.get("y", []), dtype=np.float64))
+    if x.ndim != 1 or x.shape != y.shape or not len(x):
+        raise ValueError("'x' and 'y' must be numbers or equal-length lists")
+    with np.errstate(over="ignore"):
+        x, y = x.astype(np.float32), y.astype(np.float32)
+    _in_world(x, y, width, height)
+    return x, y
+
+
+def _position(command, width, height):
+    x, y = np.float32(_number(command, "x")), np.float32(_number(command, "y"))
+    _in_world(x, y, width, height)
+    return float(x), float(y)
+
+
+def _types(value, n, names, field):
+    values = [value] * n if isinstance(value, str) else list(value)
+    if len(values) != n:
+        raise ValueError(f"'{field}' must be one type or one per item")
+    for name in values:
+        if name not in names:
+            raise ValueError(f"Unknown {field} '{name}' (choose from {', '.join(names)})")
+    return values
+
+
+def parse_command(command, width=C.WORLD_WIDTH, height=C.WORLD_HEIGHT):
+    """Validate one command dict for a width x height world; return (type, arguments, item count)."""
+    if not isinstance(command, dict):
+        raise ValueError("Each command must be an object")
+    kind = command.get("type")
+    if kind == "food":
+        x, y = _positions(command, width, height)
+        return kind, (x, y, _types(command.get("foodType", "apple"), len(x), C.FOOD_TYPES, "foodType")), len(x)
+    if kind == "obstacle":
+        x, y = _positions(command, width, height)
+        types = _types(command.get("obstacleType", "rock"), len(x), C.OBSTACLE_TYPES, "obstacleType")
+        return kind, (x, y, types), len(x)
+    if kind == "polyline":
+        points = np.asarray(command.get("points", []), dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] != 2 or len(points) < 2:
+            raise ValueError("'points' must be a list of at least two [x, y] pairs")
+        with np.errstate(over="ignore"):
+            points = points.astype(np.float32)
+        _in_world(points[:, 0], points[:, 1], width, height)
+        line_width = _number(command, "width", POLYLINE_WIDTH)
+        if line_width <= 0:
+            raise ValueError("'width' must be positive")
+        return kind, (points, line_width), len(points)
+    if kind == "burn":
+        radius = _number(command, "radius", BURN_RADIUS)
+        if radius <= 0:
+            raise ValueError("'radius' must be positive")
+        return kind, (*_position(command, width, height), radius), 1
+    if kind == "ants":
+        count = command.get("count")
+        if not isinstance(count, int) or isinstance(count, bool) or count <= 0:
+            raise ValueError("'count' must be a positive integer")
+        ant_kind = command.get("kind")
+        if ant_kind not in (None, "scout", "worker"):
+            raise ValueError("'kind' must be 'scout' or 'worker'")
+        return kind, (count, ant_kind), count
+    if kind == "removeObstacle":
+        return kind, _position(command, width, height), 1
+    raise ValueError(f"Unknown command type: {kind!r}")
+
+
+def parse_batch(commands, width=C.WORLD_WIDTH, height=C.WORLD_HEIGHT):
+    """Validate a whole batch for a width x height world before anything is queued."""
+    if not isinstance(commands, list) or not commands:
+        raise ValueError("A batch needs a non-empty list of commands")
+    parsed, items = [], 0
+    for i, command in enumerate(commands):
+        try:
+            kind, args, count = parse_command(command, width, height)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Command {i}: {e}") from None
+        parsed.append((kind, args))
+        items += count
+    if items > MAX_BATCH_ITEMS:
+        raise ValueError(f"A batch may hold at most {MAX_BATCH_ITEMS} items")
+    return parsed
+
+
+def polyline_polygons(points, width):
+    """One rectangle outline (centre, vertices relative to it) per polyline segment."""
+    a, b = points[:-1], points[1:]
+    direction = b - a
+    length = np.maximum(np.hypot(direction[:, 0], direction[:, 1]), 1e-6)
+    normal = np.stack([-direction[:, 1], direction[:, 0]], axis=1) / length[:, None] * (width / 2)
+    centre = (a + b) / 2
+    half = direction / 2
+    corners = np.stack([-half - normal, half - normal, half + normal, -half + normal], axis=1)
+    return centre, corners
+
+
+def apply_command(colony, kind, args):
+    """Apply one parsed command and return its result."""
+    if kind == "food":
+        x, y, types = args
+        return {"foodIds": colony.place_foods(x, y, types).tolist()}
+    if kind == "obstacle":
+        x, y, types = args
+        colony.place_obstacles(x, y, types)
+        return {"obstacles": len(x)}
+    if kind == "polyline":
+        centre, corners = polyline_polygons(*args)
+        colony.place_obstacles(centre[:, 0], centre[:, 1], ["stick"] * len(centre), list(corners))
+        return {"obstacles": len(centre)}
+    if kind == "burn":
+        ants, predators = colony.burn(*args)
+        return {"ants": ants, "predators": predators}
+    if kind == "ants":
+        count, ant_kind = args
+        if ant_kind is None:
+            colony.spawn_ants(count)
+        else:
+            colony.add_ants(C.SCOUT if ant_kind == "scout" else C.WORKER, count)
+        return {"ants": count}
+    if kind == "removeObstacle":
+        return {"removed": colony.remove_obstacle_at(*args)}
+    raise ValueError(f"Unknown command type: {kind!r}")
+
+
+def apply_batch(colony, parsed):
+    return [apply_command(colony, kind, args) for kind, args in parsed]
@@ -0,0 +1,84 @@
+"""
+Simulation constants for the headless engine.
+
+These mirror the values hard-coded in the browser modules (main.js, ant.js,
+predators.js, environment.js, obstacles.js and performance.js) so that a
+server-side colony behaves like the one in the canvas.
+"""
+
+import numpy as np
+
+# Timing (performance.js settings)
+TARGET_FPS = 15
+FRAME_INTERVAL_MS = 1000 / TARGET_FPS
+GRID_SIZE = 200
+
+# Default world size (canvas size used by the game)
+WORLD_WIDTH = 800
+WORLD_HEIGHT = 600
+QUEEN_OFFSET = 50  # Queen sits 50px above the bottom edge
+
+# Ant kinds
+WORKER = 0
+SCOUT = 1
+ANT_SPEED = np.array([1.2, 1.8], dtype=np.float32)  # Scouts are faster
+INITIAL_SCOUTS = 3
+INITIAL_WORKERS = 7
+SCOUT_RATIO = 0.3  # addNewAnt keeps roughly 30% scouts
+POINTS_PER_ANT = 10  # A new ant every 10 points
+
+# Ant phases (flattened version of the Ant object's state fields)
+WANDER = 0   # No target, random walk
+SEEK = 1     # Scout heading for food
+LEAD = 2     # Scout standing on food, recruiting workers
+FOLLOW = 3   # Worker following a scout (followingScout)
+WAIT = 4     # Worker at the food, waiting for enough ants
+CARRY = 5    # Carrying food back to the queen
+
+# Death causes (Colony.remove_ants), indexing DEATH_CAUSES
+EATEN = 0    # Caught by a predator
+OLD_AGE = 1  # Outlived the colony's lifespan
+BURNED = 2   # Magnifying glass (Colony.burn)
+DEATH_CAUSES = ('eaten', 'oldAge', 'burned')
+
+FOOD_REACH = 15     # Scout discovers food within this distance
+ARRIVE_RADIUS = 10  # Delivery / join distance
+FLEE_RADIUS = 60    # Ants flee when a predator gets this close
+
+# Food properties by type (main.js foodProperties)
+FOOD_TYPES = ('apple', 'bread', 'cheese', 'sugar')
+FOOD_DECAY = np.array([15, 30, 20, 10], dtype=np.float32)
+FOOD_ANTS_NEEDED = np.array([2, 3, 4, 1], dtype=np.int16)
+FOOD_DECAY_RATE = 0.02  # decayTimer units lost per update
+
+# Obstacles (obstacles.js / Ant.moveToward)
+OBSTACLE_TYPES = ('rock', 'stick', 'leaf')
+OBSTACLE_RADIUS = np.array([20, 15, 20], dtype=np.float32)
+OBSTACLE_BUFFER = 5
+
+# Predators (predators.js)
+PREDATOR_TYPES = ('spider', 'beetle', 'lizard')
+PREDATOR_SPEED = np.array([1.5, 0.8, 2.0], dtype=np.float32)
+PREDATOR_SIZE = np.array([30, 35, 50], dtype=np.float32)
+PREDATOR_HUNT_RADIUS = np.array([150, 100, 200], dtype=np.float32)
+PREDATOR_SPAWN_INTERVAL = 30  # seconds
+MAX_PREDATORS = 3
+
+# Environment (environment.js)
+DAY_LENGTH = 240  # seconds for a full day/night cycle
+START_HOUR = 8
+WEATHER_DURATION = 60  # seconds
+WEATHER_TRANSITION = 5  # seconds to fade in new weather
+TERRAIN_CELL = 50
+WEATHER_TYPES = ('clear', 'rain', 'fog', 'heat')
+TERRAIN_TYPES = ('normal', 'sand', 'mud', 'grass')
+
+# Multipliers indexed by [is_night], weather code and terrain code
+ANT_SPEED_TIME = np.array([1.0, 0.7], dtype=np.float32)
+ANT_SPEED_WEATHER = np.array([1.0, 0.6, 0.8, 1.2], dtype=np.float32)
+ANT_SPEED_TERRAIN = np.array([1.0, 0.7, 0.5, 1.2], dtype=np.float32)
+FOOD_DECAY_TIME = np.array([1.0, 0.5], dtype=np.float32)
+FOOD_DECAY_WEATHER = np.array([1.0, 1.5, 0.8, 2.0], dtype=np.float32)
+FOOD_DECAY_TERRAIN = np.array([1.0, 1.2, 0.7, 0.9], dtype=np.float32)
+VISIBILITY_TIME = np.array([1.0, 0.5], dtype=np.float32)
+VISIBILITY_WEATHER = np.array([1.0, 0.7, 0.4, 0.9], dtype=np.float32)
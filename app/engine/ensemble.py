@@ -0,0 +1,706 @@
+"""
+Ensemble mode: many small colonies advanced as one batch.
+
+An Ensemble stacks K independent colonies along a leading batch axis. Every
+ant, food, obstacle and predator column is a (K, capacity) array with an
+activity mask, and each rule of Colony.step runs once for all colonies as a
+vectorized call. Entities only ever see entities of their own row (nearest
+searches are masked per colony), so results stay per colony. For the tiny
+colonies used in sweeps and Monte-Carlo runs this removes the per-colony
+Python overhead that dominates a Colony tick.
+
+Each colony has its own Environment, advanced only when its precomputed
+timeline has an event due. With a sequence of seeds, colony k gets the same
+terrain and weather timeline as Colony(seed=seeds[k]); movement jitter and
+predator rolls come from one shared stream.
+
+The rules that Colony runs through kernels use the same kernels here:
+predator proximity (within_radius), recruitment (each scout's nearest idle
+workers, matched closest pair first by match_pairs) and obstacle avoidance
+(the colonies' ObstacleIndexes stacked into one). What the ensemble leaves
+out is listed in the README; sweep.parity() checks that both modes agree
+on the same configurations.
+"""
+
+import numpy as np
+
+from . import constants as C
+from .colony import CANDIDATES_PER_SLOT, rank_within
+from .environment import Environment
+from .kernels import NEAREST_CHUNK, default_kernels, load_backend
+from .obstacles import ObstacleIndex, StackedObstacleIndex
+
+MIN_CAPACITY = 16
+
+# Batched columns: name -> (dtype, fill value of an empty slot)
+ANT_COLUMNS = {
+    'ant_x': (np.float32, 0), 'ant_y': (np.float32, 0), 'ant_kind': (np.uint8, 0),
+    'ant_phase': (np.uint8, C.WANDER), 'ant_active': (bool, False), 'ant_fleeing': (bool, False),
+    'ant_food': (np.int32, -1), 'ant_follow': (np.int32, -1),
+}
+FOOD_COLUMNS = {
+    'food_x': (np.float32, 0), 'food_y': (np.float32, 0), 'food_type': (np.uint8, 0),
+    'food_decay_timer': (np.float32, 0), 'food_needed': (np.int16, 0), 'food_assigned': (np.int16, 0),
+    'food_alive': (bool, False),
+}
+OBSTACLE_COLUMNS = {
+    'obstacle_x': (np.float32, 0), 'obstacle_y': (np.float32, 0), 'obstacle_type': (np.uint8, 0),
+    'obstacle_alive': (bool, False),
+}
+PREDATOR_COLUMNS = {
+    'predator_type': (np.uint8, 0), 'predator_x': (np.float32, 0), 'predator_y': (np.float32, 0),
+    'predator_tx': (np.float32, 0), 'predator_ty': (np.float32, 0), 'predator_hunger': (np.float32, 0),
+    'predator_health': (np.float32, 0), 'predator_cooldown': (np.float32, 0),
+    'predator_target': (np.int32, -1), 'predator_wander_timer': (np.float32, 0),
+    'predator_wander_interval': (np.float32, 0), 'predator_direction': (np.float32, 0),
+    'predator_alive': (bool, False),
+}
+
+
+def per_colony(value, k, dtype, shape=()):
+    """Broadcast a scalar (or per-type table) to one row per colony."""
+    return np.array(np.broadcast_to(np.asarray(value, dtype=dtype), (k,) + shape))
+
+
+def masked_argmin(d):
+    """Row-wise argmin and minimum of a distance matrix (inf = excluded)."""
+    best = np.argmin(d, axis=1)
+    return best, d[np.arange(len(d)), best]
+
+
+class Ensemble:
+    """K independent colonies stepped together.
+
+    Rule parameters take a scalar (shared) or one value per colony, so a
+    whole sweep batch can run as one ensemble.
+    """
+
+    def __init__(self, colonies, seed=None, width=C.WORLD_WIDTH, height=C.WORLD_HEIGHT,
+                 scouts=C.INITIAL_SCOUTS, workers=C.INITIAL_WORKERS,
+                 scout_ratio=C.SCOUT_RATIO, food_ants_needed=C.FOOD_ANTS_NEEDED,
+                 predator_spawn_interval=C.PREDATOR_SPAWN_INTERVAL, max_predators=C.MAX_PREDATORS,
+                 predator_weights=None, multipliers=None, backend=None):
+        k = self.k = int(colonies)
+        self.kernels = default_kernels if backend is None else load_backend(backend)
+        self.rows = np.arange(k)
+        self.width = float(width)
+        self.height = float(height)
+        self.queen = (self.width / 2, self.height - C.QUEEN_OFFSET)
+
+        # A sequence seeds each colony like Colony(seed=...); an int seeds the batch
+        if seed is not None and np.ndim(seed) == 1:
+            self.seed = [int(s) for s in seed]
+            self.rng = np.random.default_rng(self.seed)
+            env_rngs = [np.random.default_rng(s) for s in self.seed]
+        else:
+            self.seed = seed
+            self.rng = np.random.default_rng(seed)
+            env_rngs = self.rng.spawn(k)
+
+        # Rules, one row per colony
+        n_types = len(C.PREDATOR_TYPES)
+        self.scout_ratio = per_colony(scout_ratio, k, np.float64)
+        self.food_ants_needed = per_colony(food_ants_needed, k, np.int16, (len(C.FOOD_TYPES),))
+        self.predator_spawn_interval = per_colony(predator_spawn_interval, k, np.float64)
+        self.max_predators = per_colony(max_predators, k, np.int64)
+        weights = per_colony(np.ones(n_types) if predator_weights is None else predator_weights,
+                             k, np.float64, (n_types,))
+        self.predator_cdf = np.cumsum(weights / weights.sum(axis=1, keepdims=True), axis=1)
+
+        # Environments: event timelines stay per colony, multiplier tables are stacked
+        if multipliers is None or isinstance(multipliers, dict):
+            multipliers = [multipliers] * k
+        self.environments = [Environment(self.width, self.height, rng, overrides)
+                             for rng, overrides in zip(env_rngs, multipliers)]
+        self.terrain = np.stack([environment.terrain for environment in self.environments])
+        self.speed_tables = np.zeros((k, len(C.TERRAIN_TYPES)), dtype=np.float32)
+        self.decay_tables = np.zeros((k, len(C.TERRAIN_TYPES)), dtype=np.float32)
+        self.elapsed = 0.0
+        self.next_changes = np.zeros(k)
+        self.update_environments()
+
+        self.tick = 0
+        self.score = np.zeros(k, dtype=np.int64)
+        self.last_ant_added_score = np.zeros(k, dtype=np.int64)
+        self.kills = np.zeros(k, dtype=np.int64)
+        self.ant_slots = np.zeros(k, dtype=np.int64)  # Slots used per row (dead ants keep theirs)
+        self.predator_spawn_timer = np.zeros(k, dtype=np.float64)
+
+        scouts = per_colony(scouts, k, np.int64)
+        workers = per_colony(workers, k, np.int64)
+        self.allocate(ANT_COLUMNS, max(MIN_CAPACITY, 2 * int((scouts + workers).max(initial=0))))
+        self.allocate(FOOD_COLUMNS, MIN_CAPACITY)
+        self.allocate(OBSTACLE_COLUMNS, MIN_CAPACITY)
+        self._obstacle_index = None
+        self.allocate(PREDATOR_COLUMNS, max(1, int(self.max_predators.max(initial=0))))
+        self.add_ants(C.SCOUT, scouts)
+        self.add_ants(C.WORKER, workers)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def allocate(self, columns, capacity):
+        for name, (dtype, fill) in columns.items():
+            setattr(self, name, np.full((self.k, capacity), fill, dtype=dtype))
+
+    def grow(self, columns, capacity):
+        """Widen a group of columns to `capacity` slots per colony."""
+        for name, (dtype, fill) in columns.items():
+            column = getattr(self, name)
+            if column.shape[1] < capacity:
+                extra = np.full((self.k, capacity - column.shape[1]), fill, dtype=dtype)
+                setattr(self, name, np.concatenate([column, extra], axis=1))
+
+    def claim_slots(self, columns, alive_name, colonies):
+        """Free slots for new entities in the given colonies (growing if needed)."""
+        colonies = np.asarray(colonies, dtype=np.intp)
+        rank = rank_within(colonies)
+        free = (~getattr(self, alive_name)).sum(axis=1)
+        short = rank - free[colonies] + 1
+        if len(short) and short.max() > 0:
+            width = getattr(self, alive_name).shape[1]
+            self.grow(columns, max(2 * width, width + int(short.max())))
+        # Free slots first, in slot order
+        order = np.argsort(getattr(self, alive_name)[colonies], axis=1, kind='stable')
+        return order[np.arange(len(colonies)), rank]
+
+    # ------------------------------------------------------------------
+    # Counts and queries
+    # ------------------------------------------------------------------
+
+    @property
+    def ant_count(self):
+        return self.ant_active.sum(axis=1)
+
+    @property
+    def scout_count(self):
+        return (self.ant_active & (self.ant_kind == C.SCOUT)).sum(axis=1)
+
+    @property
+    def worker_count(self):
+        return (self.ant_active & (self.ant_kind == C.WORKER)).sum(axis=1)
+
+    @property
+    def food_count(self):
+        return self.food_alive.sum(axis=1)
+
+    @property
+    def obstacle_count(self):
+        return self.obstacle_alive.sum(axis=1)
+
+    @property
+    def predator_count(self):
+        return self.predator_alive.sum(axis=1)
+
+    def terrain_at(self, b, x, y):
+        """Terrain codes at positions of colonies `b`."""
+        rows, cols = self.terrain.shape[1:]
+        gx = np.clip((x // C.TERRAIN_CELL).astype(np.intp), 0, cols - 1)
+        gy = np.clip((y // C.TERRAIN_CELL).astype(np.intp), 0, rows - 1)
+        return self.terrain[b, gy, gx]
+
+    def update_environments(self):
+        """Advance the environments that reach their next scheduled event.
+
+        Weather and day/night follow precomputed timelines, so an environment
+        only needs touching when its next event is due; its multiplier tables
+        are copied into the stacked ones at the same time.
+        """
+        for b in np.flatnonzero(self.next_changes <= self.elapsed):
+            environment = self.environments[b]
+            environment.advance_to(self.elapsed)
+            self.next_changes[b] = environment.next_change()
+            self.speed_tables[b] = environment.speed_by_terrain
+            self.decay_tables[b] = environment.decay_by_terrain
+
+    def to_dict(self):
+        """Per-colony summary (lists indexed by colony) for API responses."""
+        return {
+            "tick": self.tick,
+            "colonies": self.k,
+            "score": self.score.tolist(),
+            "antCount": self.ant_count.tolist(),
+            "scoutCount": self.scout_count.tolist(),
+            "workerCount": self.worker_count.tolist(),
+            "foodCount": self.food_count.tolist(),
+            "obstacleCount": self.obstacle_count.tolist(),
+            "predatorCount": self.predator_count.tolist(),
+            "kills": self.kills.tolist(),
+        }
+
+    # ------------------------------------------------------------------
+    # Edits (applied between ticks)
+    # ------------------------------------------------------------------
+
+    def add_ants(self, kind, counts):
+        """Spawn counts[k] ants of one kind around each colony's queen."""
+        counts = per_colony(counts, self.k, np.int64)
+        total = int(counts.sum())
+        if total <= 0:
+            return
+        needed = int((self.ant_slots + counts).max())
+        if needed > self.ant_x.shape[1]:
+            self.grow(ANT_COLUMNS, max(2 * self.ant_x.shape[1], needed))
+
+        b = np.repeat(self.rows, counts)
+        i = self.ant_slots[b] + rank_within(b)
+        qx, qy = self.queen
+        offsets = self.rng.random((2, total), dtype=np.float32) * 50 - 25
+        self.ant_x[b, i] = qx + offsets[0]
+        self.ant_y[b, i] = qy + offsets[1]
+        self.ant_kind[b, i] = kind
+        self.ant_phase[b, i] = C.WANDER
+        self.ant_active[b, i] = True
+        self.ant_fleeing[b, i] = False
+        self.ant_food[b, i] = -1
+        self.ant_follow[b, i] = -1
+        self.ant_slots += counts
+
+    def place_food(self, colonies, x, y, food_types):
+        """Place one food item per entry of `colonies` (a colony may repeat)."""
+        colonies = np.atleast_1d(np.asarray(colonies, dtype=np.intp))
+        if not len(colonies):
+            return
+        codes = np.array([C.FOOD_TYPES.index(t) for t in np.broadcast_to(food_types, colonies.shape)],
+                         dtype=np.intp)
+        f = self.claim_slots(FOOD_COLUMNS, 'food_alive', colonies)
+        self.food_x[colonies, f] = x
+        self.food_y[colonies, f] = y
+        self.food_type[colonies, f] = codes
+        self.food_decay_timer[colonies, f] = C.FOOD_DECAY[codes]
+        self.food_needed[colonies, f] = self.food_ants_needed[colonies, codes]
+        self.food_assigned[colonies, f] = 0
+        self.food_alive[colonies, f] = True
+
+    def place_obstacle(self, colonies, x, y, obstacle_type='rock'):
+        """Place one obstacle per entry of `colonies`."""
+        colonies = np.atleast_1d(np.asarray(colonies, dtype=np.intp))
+        o = self.claim_slots(OBSTACLE_COLUMNS, 'obstacle_alive', colonies)
+        self.obstacle_x[colonies, o] = x
+        self.obstacle_y[colonies, o] = y
+        self.obstacle_type[colonies, o] = C.OBSTACLE_TYPES.index(obstacle_type)
+        self.obstacle_alive[colonies, o] = True
+        self._obstacle_index = None
+
+    def obstacle_index(self):
+        """Every colony's collision index stacked into one, rebuilt only after edits."""
+        if self._obstacle_index is None:
+            # No obstacle is ever removed, so slot order is placement order, as in Colony
+            self._obstacle_index = StackedObstacleIndex([
+                ObstacleIndex(self.obstacle_x[b][alive], self.obstacle_y[b][alive], self.obstacle_type[b][alive],
+                              None, self.width, self.height)
+                for b, alive in enumerate(self.obstacle_alive)])
+        return self._obstacle_index
+
+    def kill_food(self, b, f):
+        """Remove food items and release every ant that was working on them."""
+        if not len(b):
+            return
+        killed = np.zeros(self.food_alive.shape, dtype=bool)
+        killed[b, f] = True
+        self.food_alive[killed] = False
+        self.food_assigned[killed] = 0
+
+        has_food = self.ant_food >= 0
+        involved = has_food & np.take_along_axis(killed, np.where(has_food, self.ant_food, 0), axis=1)
+        # Carriers keep walking home; everyone else goes back to searching
+        self.ant_phase[involved & (self.ant_phase != C.CARRY)] = C.WANDER
+        self.ant_food[involved] = -1
+
+    # ------------------------------------------------------------------
+    # Simulation step
+    # ------------------------------------------------------------------
+
+    def step(self, dt_ms=C.FRAME_INTERVAL_MS):
+        """Advance every colony by one tick."""
+        self.elapsed += dt_ms / 1000
+        self.update_environments()
+        self.update_predators(dt_ms)
+        self.update_ants()
+        self.update_food_decay()
+        self.add_new_ants()
+        self.tick += 1
+
+    def update_food_decay(self):
+        """Decay food with environment effects and remove spoiled items."""
+        b, f = np.nonzero(self.food_alive)
+        if not len(b):
+            return
+        terrain = self.terrain_at(b, self.food_x[b, f], self.food_y[b, f])
+        self.food_decay_timer[b, f] -= C.FOOD_DECAY_RATE * self.decay_tables[b, terrain]
+        spoiled = self.food_decay_timer[b, f] <= 0
+        self.kill_food(b[spoiled], f[spoiled])
+
+    def add_new_ants(self):
+        """Add a new ant every 10 points, keeping each colony's scout ratio."""
+        due = (self.score > 0) & (self.score % C.POINTS_PER_ANT == 0) & (self.score != self.last_ant_added_score)
+        if not due.any():
+            return
+        self.last_ant_added_score[due] = self.score[due]
+        total = self.ant_count
+        scout = due & ((total == 0) | (self.scout_count < self.scout_ratio * total))
+        self.add_ants(C.SCOUT, scout.astype(np.int64))
+        self.add_ants(C.WORKER, (due & ~scout).astype(np.int64))
+
+    # ------------------------------------------------------------------
+    # Ants
+    # ------------------------------------------------------------------
+
+    def obstacle_avoidance(self, b, nx, ny):
+        """Summed avoidance vectors from the obstacles of each ant's colony."""
+        return self.obstacle_index().avoidance(self.kernels, b, nx, ny)
+
+    def move_ants_toward(self, b, i, tx, ty):
+        """Move ants (b, i) toward targets with terrain speed and obstacle avoidance."""
+        if not len(b):
+            return np.zeros(0, dtype=np.float32)
+        x, y = self.ant_x[b, i], self.ant_y[b, i]
+        dx, dy = tx - x, ty - y
+        dist = np.hypot(dx, dy)
+        ux = dx / np.maximum(dist, 1e-6)
+        uy = dy / np.maximum(dist, 1e-6)
+
+        speed = C.ANT_SPEED[self.ant_kind[b, i]]
+        step = speed * self.speed_tables[b, self.terrain_at(b, x, y)]
+        nx = x + ux * step
+        ny = y + uy * step
+
+        ax, ay = self.obstacle_avoidance(b, nx, ny)
+        magnitude = np.hypot(ax, ay)
+        blend = np.minimum(1.0, magnitude / 2)
+        avoiding = magnitude > 0
+        nx = np.where(avoiding, x + ux * speed * (1 - blend) + ax * blend, nx)
+        ny = np.where(avoiding, y + uy * speed * (1 - blend) + ay * blend, ny)
+
+        arrived = dist < 0.1
+        self.ant_x[b, i] = np.where(arrived, tx, nx)
+        self.ant_y[b, i] = np.where(arrived, ty, ny)
+        return np.hypot(tx - self.ant_x[b, i], ty - self.ant_y[b, i])
+
+    def wander_ants(self, b, i):
+        """Random walk with environment speed, kept inside the world."""
+        if not len(b):
+            return
+        x, y = self.ant_x[b, i], self.ant_y[b, i]
+        multiplier = self.speed_tables[b, self.terrain_at(b, x, y)]
+        jitter = self.rng.random((2, len(b)), dtype=np.float32) * 2 - 1
+        self.ant_x[b, i] = np.clip(x + jitter[0] * multiplier, 0, self.width)
+        self.ant_y[b, i] = np.clip(y + jitter[1] * multiplier, 0, self.height)
+
+    def update_ants(self):
+        """Advance every active ant of every colony by one step."""
+        fleeing = self.update_fleeing()
+        ready = self.ant_active & ~fleeing
+        scouts_b, scouts_i = self.update_scouts(ready)
+        self.update_carriers(ready)
+        workers_b, workers_i = self.update_workers(ready)
+        self.wander_ants(np.concatenate([scouts_b, workers_b]), np.concatenate([scouts_i, workers_i]))
+
+    def update_fleeing(self):
+        """Start/continue fleeing to the queen when a predator is close."""
+        # One kernel call per predator slot: each ant's position relative to its
+        # colony's predator in that slot, tested against the origin (the same
+        # float32 differences the kernel takes itself)
+        origin = np.zeros(1, dtype=np.float32)
+        b, i = np.nonzero(self.ant_active & self.predator_alive.any(axis=1)[:, None])
+        for p in range(self.predator_alive.shape[1]):
+            hunted = self.predator_alive[b, p]
+            hb, hi = b[hunted], i[hunted]
+            near = self.kernels.within_radius(self.ant_x[hb, hi] - self.predator_x[hb, p],
+                                              self.ant_y[hb, hi] - self.predator_y[hb, p],
+                                              origin, origin, C.FLEE_RADIUS)
+            self.ant_fleeing[hb[near], hi[near]] = True
+        fleeing = self.ant_active & self.ant_fleeing
+        b, i = np.nonzero(fleeing)
+        if len(b):
+            qx, qy = self.queen
+            home = self.move_ants_toward(b, i, qx, qy) < C.ARRIVE_RADIUS
+            self.ant_fleeing[b[home], i[home]] = False
+        return fleeing
+
+    def update_scouts(self, ready):
+        """Scouts search for food, stand on it while recruiting, or pick it up."""
+        scouts = ready & (self.ant_kind == C.SCOUT)
+
+        # Scouts leading workers: go back to searching once the food is gone or full
+        b, i = np.nonzero(scouts & (self.ant_phase == C.LEAD))
+        if len(b):
+            f = self.ant_food[b, i]
+            fs = np.maximum(f, 0)
+            done = (f < 0) | (self.food_assigned[b, fs] >= self.food_needed[b, fs])
+            self.ant_phase[b[done], i[done]] = C.WANDER
+            self.ant_food[b[done], i[done]] = -1
+            b, i, f = b[~done], i[~done], f[~done]
+            self.move_ants_toward(b, i, self.food_x[b, f], self.food_y[b, f])
+
+        b, i = np.nonzero(scouts & ((self.ant_phase == C.WANDER) | (self.ant_phase == C.SEEK)))
+        available = self.food_alive & (self.food_assigned < self.food_needed)
+        if not len(b):
+            return b, i
+        has_food = available.any(axis=1)[b]
+        self.ant_phase[b[~has_food], i[~has_food]] = C.WANDER
+        self.ant_food[b[~has_food], i[~has_food]] = -1
+        wandering = (b[~has_food], i[~has_food])
+        b, i = b[has_food], i[has_food]
+        if not len(b):
+            return wandering
+
+        target = np.empty(len(b), dtype=np.intp)
+        for start in range(0, len(b), NEAREST_CHUNK):
+            rows = b[start:start + NEAREST_CHUNK]
+            slots = i[start:start + NEAREST_CHUNK]
+            d = np.hypot(self.ant_x[rows, slots, None] - self.food_x[rows],
+                         self.ant_y[rows, slots, None] - self.food_y[rows])
+            d[~available[rows]] = np.inf
+            target[start:start + NEAREST_CHUNK], _ = masked_argmin(d)
+        self.ant_phase[b, i] = C.SEEK
+        self.ant_food[b, i] = target
+        dist = self.move_ants_toward(b, i, self.food_x[b, target], self.food_y[b, target])
+
+        found = dist < C.FOOD_REACH
+        needed = self.food_needed[b, target]
+        solo = found & (needed == 1)
+        if solo.any():
+            # Only the first scout to reach a single-ant item picks it up
+            sb, si, sf = b[solo], i[solo], target[solo]
+            _, first = np.unique(sb * self.food_alive.shape[1] + sf, return_index=True)
+            self.ant_phase[sb[first], si[first]] = C.CARRY
+            self.food_assigned[sb[first], sf[first]] = 1
+        group = found & (needed > 1)
+        self.ant_phase[b[group], i[group]] = C.LEAD
+        return wandering
+
+    def update_carriers(self, ready):
+        """Carry food back to the queen and score on delivery."""
+        b, i = np.nonzero(ready & (self.ant_phase == C.CARRY))
+        if not len(b):
+            return
+        qx, qy = self.queen
+        delivered = self.move_ants_toward(b, i, qx, qy) < C.ARRIVE_RADIUS
+        b, i = b[delivered], i[delivered]
+        if not len(b):
+            return
+        self.score += np.bincount(b, minlength=self.k)
+        f = self.ant_food[b, i]
+        self.ant_phase[b, i] = C.WANDER
+        self.ant_food[b, i] = -1
+        self.kill_food(b[f >= 0], f[f >= 0])
+
+    def update_workers(self, ready):
+        """Workers follow scouts to food and join the group carrying it."""
+        workers = ready & (self.ant_kind == C.WORKER)
+
+        b, i = np.nonzero(workers & (self.ant_phase == C.FOLLOW))
+        if len(b):
+            s = self.ant_follow[b, i]
+            ss = np.maximum(s, 0)
+            valid = (s >= 0) & self.ant_active[b, ss] & (self.ant_phase[b, ss] == C.LEAD)
+            self.ant_phase[b[~valid], i[~valid]] = C.WANDER
+            self.ant_follow[b[~valid], i[~valid]] = -1
+            b, i, s = b[valid], i[valid], s[valid]
+
+            self.move_ants_toward(b, i, self.ant_x[b, s], self.ant_y[b, s])
+            f = self.ant_food[b, s]
+            at_food = np.hypot(self.ant_x[b, i] - self.food_x[b, f],
+                               self.ant_y[b, i] - self.food_y[b, f]) < C.ARRIVE_RADIUS
+            self.join_food(b[at_food], i[at_food], f[at_food])
+
+        return self.recruit_workers(*np.nonzero(workers & (self.ant_phase == C.WANDER)))
+
+    def join_food(self, b, i, f):
+        """Add arriving workers to their food; the one that completes the group carries it."""
+        if not len(b):
+            return
+        new_count = self.food_assigned[b, f] + rank_within(b * self.food_alive.shape[1] + f) + 1
+        needed = self.food_needed[b, f]
+        overflow = new_count > needed
+        self.ant_phase[b[overflow], i[overflow]] = C.WANDER
+        self.ant_follow[b, i] = -1
+
+        b, i, f, new_count = b[~overflow], i[~overflow], f[~overflow], new_count[~overflow]
+        self.ant_food[b, i] = f
+        self.ant_phase[b, i] = np.where(new_count == self.food_needed[b, f], C.CARRY, C.WAIT)
+        np.maximum.at(self.food_assigned, (b, f), new_count.astype(self.food_assigned.dtype))
+
+    def recruit_workers(self, b, i):
+        """Match idle workers to scouts of their colony that still need helpers, closest pairs first."""
+        lead = self.ant_active & (self.ant_kind == C.SCOUT) & (self.ant_phase == C.LEAD)
+        if not len(b) or not lead.any():
+            return b, i
+
+        width = self.ant_x.shape[1]
+        fb, fi = np.nonzero(self.ant_active & (self.ant_phase == C.FOLLOW))
+        followers = np.bincount(fb * width + self.ant_follow[fb, fi],
+                                minlength=self.k * width).reshape(self.k, width)
+        lb, li = np.nonzero(lead)
+        f = self.ant_food[lb, li]
+        open_slots = self.food_needed[lb, f] - self.food_assigned[lb, f] - followers[lb, li]
+        keep = open_slots > 0
+        lb, li, open_slots = lb[keep], li[keep], open_slots[keep]
+        if not len(lb):
+            return b, i
+
+        # Open scouts of each colony, padded into a (K, L) table
+        rank = rank_within(lb)
+        shape = (self.k, int(rank.max()) + 1)
+        lead_x = np.full(shape, np.inf, dtype=np.float32)
+        lead_y = np.full(shape, np.inf, dtype=np.float32)
+        lead_index = np.zeros(shape, dtype=np.intp)
+        lead_x[lb, rank] = self.ant_x[lb, li]
+        lead_y[lb, rank] = self.ant_y[lb, li]
+        lead_index[lb, rank] = np.arange(len(lb))
+
+        # Candidate pairs, as in Colony.recruit_candidates: each scout's nearest
+        # idle workers of its own colony, CANDIDATES_PER_SLOT per open slot
+        d = np.hypot(self.ant_x[b, i, None] - lead_x[b], self.ant_y[b, i, None] - lead_y[b])
+        w, column = np.nonzero(np.isfinite(d))
+        s, d = lead_index[b[w], column], d[w, column]
+        order = np.lexsort((d, s))
+        w, s, d = w[order], s[order], d[order]
+        counts = np.bincount(s, minlength=len(lb))
+        rank = np.arange(len(s)) - np.repeat(np.cumsum(counts) - counts, counts)
+        keep = rank < open_slots[s] * CANDIDATES_PER_SLOT
+        w, s, d = w[keep], s[keep], d[keep]
+
+        # One matching for the whole batch, closest pairs first (Colony.recruit_workers);
+        # pairs never cross colonies, so each colony is matched on its own
+        order = np.argsort(d)
+        w, s = w[order], s[order]
+        accepted = self.kernels.match_pairs(w, s, open_slots, len(b))
+        recruits = w[accepted]
+        self.ant_phase[b[recruits], i[recruits]] = C.FOLLOW
+        self.ant_follow[b[recruits], i[recruits]] = li[s[accepted]]
+        remaining = np.ones(len(b), dtype=bool)
+        remaining[recruits] = False
+        return b[remaining], i[remaining]
+
+    # ------------------------------------------------------------------
+    # Predators
+    # ------------------------------------------------------------------
+
+    def spawn_predators(self, colonies):
+        """Spawn one predator at a random edge of each given colony."""
+        n = len(colonies)
+        roll = self.rng.random((3, n))
+        type_code = np.minimum((self.predator_cdf[colonies] <= roll[0, :, None]).sum(axis=1),
+                               len(C.PREDATOR_TYPES) - 1)
+        side = (roll[1] * 4).astype(np.intp)
+        r = roll[2]
+        x = np.choose(side, [r * self.width, np.full(n, self.width), r * self.width, np.zeros(n)])
+        y = np.choose(side, [np.zeros(n), r * self.height, np.full(n, self.height), r * self.height])
+
+        p = np.argmin(self.predator_alive[colonies], axis=1)  # First free slot
+        wander = self.rng.random((2, n))
+        self.predator_type[colonies, p] = type_code
+        self.predator_x[colonies, p] = x
+        self.predator_y[colonies, p] = y
+        self.predator_tx[colonies, p] = x
+        self.predator_ty[colonies, p] = y
+        self.predator_hunger[colonies, p] = 50
+        self.predator_health[colonies, p] = 100
+        self.predator_cooldown[colonies, p] = 0
+        self.predator_target[colonies, p] = -1
+        self.predator_wander_timer[colonies, p] = 0
+        self.predator_wander_interval[colonies, p] = 2 + wander[0] * 3
+        self.predator_direction[colonies, p] = wander[1] * np.pi * 2
+        self.predator_alive[colonies, p] = True
+
+    def move_predators(self, b, p, tx, ty, dt):
+        """Move predators toward points (speed is per second, like predators.js)."""
+        x, y = self.predator_x[b, p], self.predator_y[b, p]
+        dx, dy = tx - x, ty - y
+        dist = np.hypot(dx, dy)
+        moving = dist >= 1
+        multiplier = self.speed_tables[b, self.terrain_at(b, x, y)]
+        step = np.where(moving, C.PREDATOR_SPEED[self.predator_type[b, p]] * multiplier * dt
+                        / np.maximum(dist, 1e-6), 0)
+        self.predator_x[b, p] = x + dx * step
+        self.predator_y[b, p] = y + dy * step
+        self.predator_direction[b, p] = np.where(moving, np.arctan2(dy, dx), self.predator_direction[b, p])
+
+    def update_predators(self, dt_ms):
+        """Hunger, hunting, eating and spawning of every colony's predators."""
+        dt = dt_ms / 1000
+        alive = self.predator_alive
+        if alive.any():
+            self.predator_hunger[alive] += dt * 2
+            self.predator_health[alive & (self.predator_hunger > 80)] -= dt * 5
+            alive &= self.predator_health > 0
+            self.predator_cooldown[alive & (self.predator_cooldown > 0)] -= dt
+
+            target = self.predator_target
+            gone = (target >= 0) & ~np.take_along_axis(self.ant_active, np.maximum(target, 0), axis=1)
+            target[gone] = -1
+            seeking = alive & (target < 0) & (self.predator_hunger > 30) & (self.predator_cooldown <= 0)
+            if seeking.any():
+                self.find_prey(*np.nonzero(seeking))
+
+            hunting = alive & (target >= 0)
+            b, p = np.nonzero(hunting)
+            if len(b):
+                a = target[b, p]
+                tx, ty = self.ant_x[b, a], self.ant_y[b, a]
+                self.move_predators(b, p, tx, ty, dt)
+                size = C.PREDATOR_SIZE[self.predator_type[b, p]]
+                caught = np.hypot(self.predator_x[b, p] - tx, self.predator_y[b, p] - ty) < size / 2
+                self.eat_ants(b[caught], p[caught], a[caught])
+
+            b, p = np.nonzero(alive & ~hunting)
+            if len(b):
+                self.wander_predators(b, p, dt)
+
+        self.predator_spawn_timer += dt
+        due = (self.predator_spawn_timer >= self.predator_spawn_interval) & (alive.sum(axis=1) < self.max_predators)
+        if due.any():
+            self.spawn_predators(np.flatnonzero(due))
+            self.predator_spawn_timer[due] = 0.0
+
+    def find_prey(self, b, p):
+        """Closest active ant of the same colony within each predator's hunt radius."""
+        px, py = self.predator_x[b, p], self.predator_y[b, p]
+        d = np.hypot(self.ant_x[b] - px[:, None], self.ant_y[b] - py[:, None])
+        radius = C.PREDATOR_HUNT_RADIUS[self.predator_type[b, p]]
+        d[~self.ant_active[b] | (d > radius[:, None])] = np.inf
+        best, dist = masked_argmin(d)
+        self.predator_target[b, p] = np.where(np.isfinite(dist), best, -1)
+
+    def wander_predators(self, b, p, dt):
+        """Pick a new wander point every few seconds and walk toward it."""
+        self.predator_wander_timer[b, p] += dt
+        due = self.predator_wander_timer[b, p] >= self.predator_wander_interval[b, p]
+        rb, rp = b[due], p[due]
+        if len(rb):
+            roll = self.rng.random((3, len(rb)))
+            direction = roll[1] * np.pi * 2
+            distance = 100 + roll[2] * 100
+            size = C.PREDATOR_SIZE[self.predator_type[rb, rp]]
+            self.predator_wander_timer[rb, rp] = 0
+            self.predator_wander_interval[rb, rp] = 2 + roll[0] * 3
+            self.predator_direction[rb, rp] = direction
+            self.predator_tx[rb, rp] = np.clip(self.predator_x[rb, rp] + np.cos(direction) * distance,
+                                               size, self.width - size)
+            self.predator_ty[rb, rp] = np.clip(self.predator_y[rb, rp] + np.sin(direction) * distance,
+                                               size, self.height - size)
+        self.move_predators(b, p, self.predator_tx[b, p], self.predator_ty[b, p], dt)
+
+    def eat_ants(self, b, p, a):
+        """Predators eat ants; an ant caught by two predators counts once."""
+        if not len(b):
+            return
+        _, first = np.unique(b * self.ant_x.shape[1] + a, return_index=True)
+        b, p, a = b[first], p[first], a[first]
+        f = self.ant_food[b, a]
+        phase = self.ant_phase[b, a]
+        # Waiting ants and carriers both count towards their food's assigned ants (Colony.remove_ants)
+        claimed = (f >= 0) & ((phase == C.WAIT) | (phase == C.CARRY))
+        np.subtract.at(self.food_assigned, (b[claimed], f[claimed]), 1)
+        self.ant_active[b, a] = False
+        self.ant_phase[b, a] = C.WANDER
+        self.ant_food[b, a] = -1
+        self.ant_follow[b, a] = -1
+        self.predator_hunger[b, p] = np.maximum(0.0, self.predator_hunger[b, p] - 20)
+        self.predator_health[b, p] = np.minimum(100.0, self.predator_health[b, p] + 10)
+        self.predator_cooldown[b, p] = 2
+        self.predator_target[b, p] = -1
+        self.kills += np.bincount(b, minlength=self.k)
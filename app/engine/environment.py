@@ -0,0 +1,216 @@
+"""
+Day/night cycle, weather and terrain for the headless engine.
+
+Port of modules/environment.js. Terrain is stored as a small uint8 grid so
+that multipliers can be looked up for whole position arrays at once, and
+weather follows a seeded event timeline instead of per-tick dice rolls.
+"""
+
+import heapq
+import math
+from collections import deque
+
+import numpy as np
+
+from . import constants as C
+
+MAX_EVENTS = 256  # Undrained changes kept for headless colonies
+
+# Multiplier tables that can be overridden per colony
+MULTIPLIERS = (
+    'ANT_SPEED_TIME', 'ANT_SPEED_WEATHER', 'ANT_SPEED_TERRAIN',
+    'FOOD_DECAY_TIME', 'FOOD_DECAY_WEATHER', 'FOOD_DECAY_TERRAIN',
+    'VISIBILITY_TIME', 'VISIBILITY_WEATHER',
+)
+
+
+class Environment:
+    """Time of day, weather and terrain of one colony.
+
+    Day/night changes and weather transitions are not rolled tick by tick:
+    they come from an event timeline generated ahead of time from a
+    dedicated random stream, so the schedule depends only on the seed.
+    Between two events the environment is in a fixed epoch, and the
+    multiplier tables are only rebuilt when the epoch changes.
+    """
+
+    def __init__(self, width, height, rng, multipliers=None):
+        self.width = width
+        self.height = height
+        self.rng = rng
+
+        # Multiplier tables, optionally overridden (e.g. by parameter sweeps)
+        self.tables = {name: getattr(C, name) for name in MULTIPLIERS}
+        for name, values in (multipliers or {}).items():
+            if name not in self.tables:
+                raise ValueError(f"Unknown multiplier table: {name}")
+            self.tables[name] = np.asarray(values, dtype=np.float32)
+
+        self.elapsed = 0.0  # seconds since the colony started
+        self.time = float(C.START_HOUR)
+        self.is_night = False
+
+        self.weather = 0  # index into WEATHER_TYPES
+        self.next_weather = 0
+        self.weather_intensity = 0.0
+        self.weather_transitioning = False
+        self.transition_started = 0.0
+
+        self.terrain = self.generate_terrain()
+
+        # Timeline of (time, seq, kind, value) events, generated one weather
+        # period at a time; the weather stream is independent of the colony's
+        self.weather_rng = rng.spawn(1)[0]
+        self.schedule = []
+        self.scheduled_until = 0.0
+        self.planned_weather = 0
+        self.event_seq = 0
+
+        # Changes applied since the last drain_events() call
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.epoch = 0
+        self.update_multipliers()
+
+    def generate_terrain(self):
+        """Generate random terrain patches (70% normal, 10% sand/mud/grass)."""
+        cols = int(np.ceil(self.width / C.TERRAIN_CELL))
+        rows = int(np.ceil(self.height / C.TERRAIN_CELL))
+        rand = self.rng.random((rows, cols))
+        terrain = np.digitize(rand, [0.7, 0.8, 0.9]).astype(np.uint8)
+
+        # Normal terrain near the queen
+        cx = (np.arange(cols) + 0.5) * C.TERRAIN_CELL
+        cy = (np.arange(rows) + 0.5) * C.TERRAIN_CELL
+        qx, qy = self.width / 2, self.height - C.QUEEN_OFFSET
+        near_queen = np.hypot(cx[None, :] - qx, cy[:, None] - qy) < 100
+        terrain[near_queen] = 0
+        return terrain
+
+    def terrain_at(self, x, y):
+        """Return terrain codes for arrays of positions."""
+        rows, cols = self.terrain.shape
+        gx = np.clip((np.asarray(x) // C.TERRAIN_CELL).astype(np.intp), 0, cols - 1)
+        gy = np.clip((np.asarray(y) // C.TERRAIN_CELL).astype(np.intp), 0, rows - 1)
+        return self.terrain[gy, gx]
+
+    # ------------------------------------------------------------------
+    # Timeline
+    # ------------------------------------------------------------------
+
+    def push_event(self, at, kind, value):
+        heapq.heappush(self.schedule, (at, self.event_seq, kind, value))
+        self.event_seq += 1
+
+    def extend_schedule(self):
+        """Schedule the events of the next weather period."""
+        start = self.scheduled_until
+        end = start + C.WEATHER_DURATION
+
+        # Night falls at 18:00 and ends at 06:00
+        for hour, kind in ((18, 'night'), (6, 'day')):
+            offset = (hour - C.START_HOUR) % 24 / 24 * C.DAY_LENGTH
+            at = offset + math.ceil((start - offset) / C.DAY_LENGTH) * C.DAY_LENGTH
+            while at < end:
+                self.push_event(at, kind, kind == 'night')
+                at += C.DAY_LENGTH
+
+        # Weather is re-rolled at the end of every period
+        n = len(C.WEATHER_TYPES)
+        if self.planned_weather != 0:
+            # Higher chance to return to clear weather
+            weather = 0 if self.weather_rng.random() < 0.7 else int(self.weather_rng.integers(n))
+        else:
+            weather = int(self.weather_rng.integers(n)) if self.weather_rng.random() < 0.3 else 0
+        if weather != self.planned_weather:
+            self.push_event(end, 'transition', weather)
+            self.push_event(end + C.WEATHER_TRANSITION, 'weather', weather)
+            self.planned_weather = weather
+
+        self.scheduled_until = end
+
+    def apply_event(self, at, kind, value):
+        if kind == 'transition':
+            self.next_weather = value
+            self.weather_transitioning = True
+            self.weather_intensity = 0.0
+            self.transition_started = at
+        elif kind == 'weather':
+            self.weather = value
+            self.weather_transitioning = False
+            self.weather_intensity = 1.0
+        else:
+            self.is_night = value
+
+        if kind != 'transition':
+            self.epoch += 1
+            self.update_multipliers()
+
+        label = C.WEATHER_TYPES[value] if kind in ('transition', 'weather') else value
+        self.events.append({"event": kind, "at": round(at, 3), "value": label, "epoch": self.epoch})
+
+    def advance_to(self, elapsed):
+        """Jump to `elapsed` seconds, applying every event on the way."""
+        while self.scheduled_until <= elapsed:
+            self.extend_schedule()
+        while self.schedule and self.schedule[0][0] <= elapsed:
+            at, _, kind, value = heapq.heappop(self.schedule)
+            self.apply_event(at, kind, value)
+
+        self.elapsed = elapsed
+        self.time = (C.START_HOUR + elapsed * 24 / C.DAY_LENGTH) % 24
+        if self.weather_transitioning:
+            self.weather_intensity = min(1.0, (elapsed - self.transition_started) / C.WEATHER_TRANSITION)
+
+    def update(self, dt_ms):
+        """Advance time of day and weather by dt_ms milliseconds."""
+        self.advance_to(self.elapsed + dt_ms / 1000)
+
+    def next_change(self):
+        """Elapsed time of the next possible event (fast-forward target).
+
+        Periods that are not generated yet can only hold events at or after
+        scheduled_until.
+        """
+        return min(self.schedule[0][0], self.scheduled_until) if self.schedule else self.scheduled_until
+
+    def drain_events(self):
+        """Return and clear the changes applied since the last call."""
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+    # ------------------------------------------------------------------
+    # Multipliers
+    # ------------------------------------------------------------------
+
+    def update_multipliers(self):
+        """Rebuild the per-terrain multiplier tables for the current epoch."""
+        night, weather, t = int(self.is_night), self.weather, self.tables
+        self.speed_by_terrain = (t['ANT_SPEED_TIME'][night] * t['ANT_SPEED_WEATHER'][weather]
+                                 * t['ANT_SPEED_TERRAIN'])
+        self.decay_by_terrain = (t['FOOD_DECAY_TIME'][night] * t['FOOD_DECAY_WEATHER'][weather]
+                                 * t['FOOD_DECAY_TERRAIN'])
+        self.visibility = float(t['VISIBILITY_TIME'][night] * t['VISIBILITY_WEATHER'][weather])
+
+    def ant_speed_multiplier(self, x, y):
+        """Speed multiplier for ants at the given positions."""
+        return self.speed_by_terrain[self.terrain_at(x, y)]
+
+    def food_decay_multiplier(self, x, y):
+        """Decay multiplier for food at the given positions."""
+        return self.decay_by_terrain[self.terrain_at(x, y)]
+
+    def visibility_multiplier(self):
+        """Visibility multiplier for the current time and weather."""
+        return self.visibility
+
+    def to_dict(self):
+        """Summary of the environment state for API responses."""
+        return {
+            "time": round(self.time, 2),
+            "isNight": self.is_night,
+            "weather": C.WEATHER_TYPES[self.weather],
+            "weatherIntensity": round(self.weather_intensity, 3),
+            "nextWeather": C.WEATHER_TYPES[self.next_weather],
+            "epoch": self.epoch,
+        }
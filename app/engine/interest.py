@@ -0,0 +1,179 @@
+"""
+Viewport-based interest management for streamed clients.
+
+Server-side version of isOnScreen/cullOffscreenObjects from
+modules/performance.js: each connected client subscribes with its viewport
+(pan offset, canvas size and zoom) and only receives the entities inside it
+plus a margin. Ants are looked up through the colony's spatial grid, so the
+cost per client depends on what it can see rather than on colony size.
+
+Frames are packed little-endian binary:
+
+    header   magic b'ANTF', version u8, flags u8, tick u32, score u32
+    section  (ants, food, predators), each:
+             visible u32, entered u32, exited u32,
+             ids i32[visible], x f32[visible], y f32[visible], code u8[visible],
+             entered ids i32[entered], exited ids i32[exited]
+
+The ant code is kind * 8 + phase; food and predator codes are their type.
+A frame with the KEYFRAME flag lists every visible entity as entered and
+none as exited: the client replaces what it had instead of applying a
+delta (sent first, and after frames were dropped for a slow client).
+"""
+
+import struct
+
+import numpy as np
+
+from . import constants as C
+
+FRAME_MAGIC = b'ANTF'
+FRAME_VERSION = 2
+KEYFRAME = 0x01
+DEFAULT_MARGIN = 50  # Same buffer isOnScreen uses, in screen pixels
+MIN_ZOOM = 0.01
+
+_HEADER = struct.Struct('<4sBBII')
+_SECTION = struct.Struct('<III')
+_EMPTY_IDS = np.zeros(0, dtype=np.int64)
+
+
+class Subscription:
+    """One client's viewport and what it was sent last frame."""
+
+    def __init__(self, client_id, x=0.0, y=0.0, width=C.WORLD_WIDTH, height=C.WORLD_HEIGHT,
+                 zoom=1.0, margin=DEFAULT_MARGIN):
+        self.client_id = client_id
+        self.margin = margin
+        self.set_viewport(x, y, width, height, zoom)
+        self.visible = {"ants": _EMPTY_IDS, "food": _EMPTY_IDS, "predators": _EMPTY_IDS}
+
+    def set_viewport(self, x=None, y=None, width=None, height=None, zoom=None):
+        """Update any part of the viewport (pan/zoom)."""
+        if x is not None:
+            self.x = float(x)
+        if y is not None:
+            self.y = float(y)
+        if width is not None:
+            self.width = max(float(width), 0.0)
+        if height is not None:
+            self.height = max(float(height), 0.0)
+        if zoom is not None:
+            self.zoom = max(float(zoom), MIN_ZOOM)
+
+    def bounds(self):
+        """World-space rectangle covered by the viewport plus margin."""
+        margin = self.margin / self.zoom
+        return (self.x - margin, self.y - margin,
+                self.x + self.width / self.zoom + margin,
+                self.y + self.height / self.zoom + margin)
+
+
+class InterestFrame:
+    """Entities visible to one client in one tick, with entry/exit events."""
+
+    def __init__(self, tick, score):
+        self.tick = tick
+        self.score = score
+        self.sections = {}
+
+    def add_section(self, name, ids, x, y, code, entered, exited):
+        self.sections[name] = (ids, x, y, code, entered, exited)
+
+    def encode(self, keyframe=False):
+        """Pack the frame into the binary wire format (as a delta or a keyframe)."""
+        parts = [_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, KEYFRAME if keyframe else 0, self.tick, self.score)]
+        for name in ("ants", "food", "predators"):
+            ids, x, y, code, entered, exited = self.sections[name]
+            if keyframe:
+                entered, exited = ids, _EMPTY_IDS
+            parts.append(_SECTION.pack(len(ids), len(entered), len(exited)))
+            parts.append(ids.astype('<i4').tobytes())
+            parts.append(x.astype('<f4').tobytes())
+            parts.append(y.astype('<f4').tobytes())
+            parts.append(code.astype(np.uint8).tobytes())
+            parts.append(entered.astype('<i4').tobytes())
+            parts.append(exited.astype('<i4').tobytes())
+        return b''.join(parts)
+
+
+class InterestManager:
+    """Per-client viewport subscriptions for one colony."""
+
+    def __init__(self, margin=DEFAULT_MARGIN):
+        self.margin = margin
+        self.subscriptions = {}
+
+    def __len__(self):
+        return len(self.subscriptions)
+
+    def subscribe(self, client_id, **viewport):
+        subscription = Subscription(client_id, margin=self.margin, **viewport)
+        self.subscriptions[client_id] = subscription
+        return subscription
+
+    def unsubscribe(self, client_id):
+        self.subscriptions.pop(client_id, None)
+
+    def update_viewport(self, client_id, **viewport):
+        subscription = self.subscriptions.get(client_id)
+        if subscription is not None:
+            subscription.set_viewport(**viewport)
+
+    def handle_message(self, client_id, message):
+        """Apply a pan/zoom message from a client; return True if it was one."""
+        if not isinstance(message, dict) or message.get("type") != "viewport":
+            return False
+        viewport = {key: message[key] for key in ("x", "y", "width", "height", "zoom")
+                    if isinstance(message.get(key), (int, float))}
+        self.update_viewport(client_id, **viewport)
+        return True
+
+    def frame(self, client_id, colony, max_ants=None):
+        """Build the next frame for one client and remember what it saw.
+
+        With max_ants set, a crowded viewport only gets every n-th ant by id,
+        so the same ants stay visible from frame to frame.
+        """
+        subscription = self.subscriptions[client_id]
+        x0, y0, x1, y1 = subscription.bounds()
+        frame = InterestFrame(colony.tick, colony.score)
+
+        # Ants through the spatial grid
+        index = colony.ant_index()
+        slots = index.ids[index.query_rect(x0, y0, x1, y1)]
+        slots = slots[colony.ant_active[slots]]
+        if max_ants is not None and len(slots) > max_ants:
+            stride = -(-len(slots) // max_ants)
+            slots = slots[colony.ant_id[slots] % stride == 0]
+        self._add(frame, subscription, "ants", colony.ant_id[slots],
+                  colony.ant_x[slots], colony.ant_y[slots],
+                  colony.ant_kind[slots] * 8 + colony.ant_phase[slots])
+
+        # Food and predators are few, a mask is enough
+        slots = np.flatnonzero(colony.food_alive & self._inside(colony.food_x, colony.food_y, x0, y0, x1, y1))
+        self._add(frame, subscription, "food", colony.food_id[slots],
+                  colony.food_x[slots], colony.food_y[slots], colony.food_type[slots])
+
+        slots = np.flatnonzero(self._inside(colony.predator_x, colony.predator_y, x0, y0, x1, y1))
+        self._add(frame, subscription, "predators", colony.predator_id[slots],
+                  colony.predator_x[slots], colony.predator_y[slots], colony.predator_type[slots])
+        return frame
+
+    def frames(self, colony):
+        """Frames for every subscribed client."""
+        return {client_id: self.frame(client_id, colony) for client_id in self.subscriptions}
+
+    @staticmethod
+    def _inside(x, y, x0, y0, x1, y1):
+        return (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+
+    @staticmethod
+    def _add(frame, subscription, name, ids, x, y, code):
+        order = np.argsort(ids)
+        ids, x, y, code = ids[order], x[order], y[order], code[order]
+        previous = subscription.visible[name]
+        entered = np.setdiff1d(ids, previous, assume_unique=True)
+        exited = np.setdiff1d(previous, ids, assume_unique=True)
+        subscription.visible[name] = ids
+        frame.add_section(name, ids, x, y, code, entered, exited)
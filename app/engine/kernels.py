@@ -0,0 +1,262 @@
+"""
+Compute kernels for the branchy parts of the colony rules.
+
+Nearest-target searches, indexed obstacle avoidance, predator proximity and
+capacity-constrained pair matching are written twice: once with NumPy array
+operations and once as Numba-compiled loops. Both use the same float32
+arithmetic in the same order, so a seeded colony produces identical results
+on either backend. The backend is chosen once at startup from the
+ANT_ENGINE_BACKEND environment variable ("numpy", "numba" or "auto", the
+default). Without Numba installed, "auto" falls back to NumPy.
+
+The Numba kernels are compiled without parallel=True and must stay that
+way. Colonies can be stepped from threads other than the main one (a
+threading.Thread, a test client, a worker pool), and once a parallel
+kernel has run off the main thread, Numba's default threading layer
+hangs the interpreter at exit. Serial loops have no threading layer, so
+either backend is safe from any thread.
+"""
+
+import os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # numba is optional, the NumPy kernels are always available
+    numba = None
+
+# Rows of the distance matrix evaluated at once in nearest-target searches
+NEAREST_CHUNK = 4096
+
+F32_ZERO = np.float32(0)
+F32_ONE = np.float32(1)
+F32_TWO = np.float32(2)
+F32_MIN_DIST = np.float32(0.1)
+
+
+class NumpyKernels:
+    """Reference kernels built from NumPy array operations."""
+
+    name = "numpy"
+
+    def warm_up(self):
+        """Run every kernel once on tiny inputs (compiles compiled backends)."""
+        xy = np.zeros(2, dtype=np.float32)
+        self.nearest(xy, xy, xy, xy)
+        cells = np.zeros(2, dtype=np.int64)
+        self.obstacle_avoidance(xy, xy, cells, np.array([0, 1, 1]), np.zeros(1, dtype=np.intp),
+                                xy[:1], xy[:1], xy[:1] + 1, xy[:1], xy[:1] + 1)
+        self.within_radius(xy, xy, xy, xy, 1.0)
+        self.match_pairs(np.zeros(2, dtype=np.intp), np.zeros(2, dtype=np.intp), np.ones(1, dtype=np.int64), 1)
+
+    @staticmethod
+    def nearest(px, py, tx, ty):
+        """Index of and distance to the nearest target for each point."""
+        best = np.empty(len(px), dtype=np.intp)
+        dist = np.empty(len(px), dtype=np.float32)
+        for start in range(0, len(px), NEAREST_CHUNK):
+            stop = start + NEAREST_CHUNK
+            d = np.hypot(px[start:stop, None] - tx[None, :], py[start:stop, None] - ty[None, :])
+            best[start:stop] = np.argmin(d, axis=1)
+            dist[start:stop] = d[np.arange(len(d)), best[start:stop]]
+        return best, dist
+
+    @staticmethod
+    def obstacle_avoidance(nx, ny, cells, starts, items, ax, ay, bx, by, reach):
+        """Summed avoidance vectors from the obstacle segments listed in each position's cell.
+
+        Every (position, segment) pair of the batch is evaluated at once. The
+        pushes are then added per position in segment order (np.add.at is
+        unbuffered), so the float32 sums match the compiled kernel bit for bit.
+        """
+        first = starts[cells]
+        counts = starts[cells + 1] - first
+        point = np.repeat(np.arange(len(nx)), counts)
+        k = items[np.repeat(first - (np.cumsum(counts) - counts), counts) + np.arange(int(counts.sum()))]
+
+        px, py = nx[point], ny[point]
+        ex, ey = bx[k] - ax[k], by[k] - ay[k]
+        len2 = ex * ex + ey * ey
+        along = (px - ax[k]) * ex + (py - ay[k]) * ey
+        t = np.divide(along, len2, out=np.zeros_like(along), where=len2 > F32_ZERO)
+        t = np.minimum(F32_ONE, np.maximum(F32_ZERO, t))
+        vx = px - (ax[k] + t * ex)
+        vy = py - (ay[k] + t * ey)
+        d = np.hypot(vx, vy)
+        near = d < reach[k]
+        r = reach[k][near]
+        d = d[near]
+        scale = (F32_ONE - np.minimum(F32_ONE, d / r)) * F32_TWO / np.maximum(F32_MIN_DIST, d)
+
+        sx = np.zeros(len(nx), dtype=np.float32)
+        sy = np.zeros(len(nx), dtype=np.float32)
+        np.add.at(sx, point[near], vx[near] * scale)
+        np.add.at(sy, point[near], vy[near] * scale)
+        return sx, sy
+
+    @staticmethod
+    def within_radius(x, y, cx, cy, radius):
+        """Mask of points within `radius` of any of the centres."""
+        r2 = np.float32(radius) * np.float32(radius)
+        hit = np.zeros(len(x), dtype=bool)
+        for j in range(len(cx)):
+            hit |= (x - cx[j]) ** 2 + (y - cy[j]) ** 2 <= r2
+        return hit
+
+    @staticmethod
+    def match_pairs(source, target, capacity, sources):
+        """Greedy capacity-constrained matching over pairs listed in priority order.
+
+        A pair is accepted when its source is still unmatched and its target
+        has capacity left, as if the pairs were taken one at a time. Because
+        both sides rank pairs by the same order, that greedy result is the
+        unique stable matching. It is found here with vectorized
+        deferred-acceptance rounds: every unmatched source proposes its best
+        remaining pair, and each target keeps its best proposals up to
+        capacity.
+        """
+        alive = np.ones(len(source), dtype=bool)
+        while True:
+            pairs = np.flatnonzero(alive)
+            # Each source's best remaining pair (pairs are in priority order)
+            _, first = np.unique(source[pairs], return_index=True)
+            proposals = pairs[first]
+            # Within each target, rank the proposals by priority
+            ranked = proposals[np.lexsort((proposals, target[proposals]))]
+            groups = target[ranked]
+            rank = np.arange(len(ranked)) - np.searchsorted(groups, groups, side="left")
+            keep = rank < capacity[groups]
+            if keep.all():
+                accepted = np.zeros(len(source), dtype=bool)
+                accepted[ranked] = True
+                return accepted
+            alive[ranked[~keep]] = False
+
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _nearest(px, py, tx, ty):
+        n = len(px)
+        best = np.empty(n, dtype=np.intp)
+        dist = np.empty(n, dtype=np.float32)
+        for i in range(n):
+            b = 0
+            bd = np.float32(np.inf)
+            for j in range(len(tx)):
+                d = np.hypot(px[i] - tx[j], py[i] - ty[j])
+                if d < bd:
+                    bd = d
+                    b = j
+            best[i] = b
+            dist[i] = bd
+        return best, dist
+
+    @numba.njit(cache=True)
+    def _obstacle_avoidance(nx, ny, cells, starts, items, ax, ay, bx, by, reach):
+        n = len(nx)
+        out_x = np.zeros(n, dtype=np.float32)
+        out_y = np.zeros(n, dtype=np.float32)
+        for i in range(n):
+            sx = F32_ZERO
+            sy = F32_ZERO
+            c = cells[i]
+            for s in range(starts[c], starts[c + 1]):
+                k = items[s]
+                ex = bx[k] - ax[k]
+                ey = by[k] - ay[k]
+                len2 = ex * ex + ey * ey
+                t = F32_ZERO
+                if len2 > F32_ZERO:
+                    t = ((nx[i] - ax[k]) * ex + (ny[i] - ay[k]) * ey) / len2
+                    t = min(F32_ONE, max(F32_ZERO, t))
+                vx = nx[i] - (ax[k] + t * ex)
+                vy = ny[i] - (ay[k] + t * ey)
+                d = np.hypot(vx, vy)
+                if d < reach[k]:
+                    scale = (F32_ONE - min(F32_ONE, d / reach[k])) * F32_TWO / max(F32_MIN_DIST, d)
+                    sx += vx * scale
+                    sy += vy * scale
+            out_x[i] = sx
+            out_y[i] = sy
+        return out_x, out_y
+
+    @numba.njit(cache=True)
+    def _within_radius(x, y, cx, cy, radius):
+        r2 = radius * radius
+        hit = np.zeros(len(x), dtype=np.bool_)
+        for i in range(len(x)):
+            for j in range(len(cx)):
+                dx = x[i] - cx[j]
+                dy = y[i] - cy[j]
+                if dx * dx + dy * dy <= r2:
+                    hit[i] = True
+                    break
+        return hit
+
+    @numba.njit(cache=True)
+    def _match_pairs(source, target, capacity, sources):
+        left = capacity.copy()
+        matched = np.zeros(sources, dtype=np.bool_)
+        accepted = np.zeros(len(source), dtype=np.bool_)
+        for p in range(len(source)):
+            s = source[p]
+            t = target[p]
+            if not matched[s] and left[t] > 0:
+                matched[s] = True
+                left[t] -= 1
+                accepted[p] = True
+        return accepted
+
+
+class NumbaKernels(NumpyKernels):
+    """The same kernels compiled with Numba; inputs are float32 arrays."""
+
+    name = "numba"
+
+    @staticmethod
+    def nearest(px, py, tx, ty):
+        return _nearest(np.ascontiguousarray(px, dtype=np.float32), np.ascontiguousarray(py, dtype=np.float32),
+                        np.ascontiguousarray(tx, dtype=np.float32), np.ascontiguousarray(ty, dtype=np.float32))
+
+    @staticmethod
+    def obstacle_avoidance(nx, ny, cells, starts, items, ax, ay, bx, by, reach):
+        f32 = [np.ascontiguousarray(a, dtype=np.float32) for a in (nx, ny, ax, ay, bx, by, reach)]
+        return _obstacle_avoidance(f32[0], f32[1], np.ascontiguousarray(cells, dtype=np.int64),
+                                   np.ascontiguousarray(starts, dtype=np.int64),
+                                   np.ascontiguousarray(items, dtype=np.intp), *f32[2:])
+
+    @staticmethod
+    def within_radius(x, y, cx, cy, radius):
+        return _within_radius(np.ascontiguousarray(x, dtype=np.float32), np.ascontiguousarray(y, dtype=np.float32),
+                              np.ascontiguousarray(cx, dtype=np.float32), np.ascontiguousarray(cy, dtype=np.float32),
+                              np.float32(radius))
+
+    @staticmethod
+    def match_pairs(source, target, capacity, sources):
+        return _match_pairs(np.ascontiguousarray(source, dtype=np.intp), np.ascontiguousarray(target, dtype=np.intp),
+                            np.ascontiguousarray(capacity, dtype=np.int64), int(sources))
+
+
+BACKENDS = {"numpy": NumpyKernels, "numba": NumbaKernels}
+
+
+def available_backends():
+    return ["numpy", "numba"] if numba is not None else ["numpy"]
+
+
+def load_backend(name=None):
+    """Kernels for a backend name ("auto" picks Numba when it is installed)."""
+    name = (name or os.environ.get("ANT_ENGINE_BACKEND", "auto")).lower()
+    if name == "auto":
+        name = "numba" if numba is not None else "numpy"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown engine backend: {name} (choose from auto, {', '.join(BACKENDS)})")
+    if name == "numba" and numba is None:
+        raise ValueError("The numba backend needs numba (pip install numba)")
+    return BACKENDS[name]()
+
+
+# Backend chosen at startup for colonies that do not ask for one
+default_kernels = load_backend()
@@ -0,0 +1,145 @@
+"""
+Static collision index for obstacles.
+
+Every obstacle is broken into line-segment primitives, each with a reach.
+Rocks, sticks and leaves are one zero-length segment at their centre,
+which gives the radial push of Ant.moveToward. Polygon obstacles get one
+segment per edge, so ants slide along the outline. Each primitive is
+registered in every grid cell its reach overlaps. The cell -> primitives
+lists are stored as one CSR array (the same counting-sort layout as
+SpatialGrid), so a batch of ants finds its candidate primitives with a
+handful of array operations. Obstacles are static between edits and the
+colony rebuilds the index only after place_obstacle or remove_obstacle_at.
+"""
+
+import numpy as np
+
+from . import constants as C
+
+OBSTACLE_CELL = 50
+POLYGON_REACH = 10  # Avoidance distance from a polygon's edges
+
+
+def point_in_polygon(x, y, vertices):
+    """Even-odd test of one point against a closed polygon."""
+    vx, vy = vertices[:, 0], vertices[:, 1]
+    wx, wy = np.roll(vx, -1), np.roll(vy, -1)
+    crosses = (vy > y) != (wy > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        at = vx + (y - vy) * (wx - vx) / (wy - vy)
+    return bool(np.count_nonzero(crosses & (x < at)) % 2)
+
+
+class ObstacleIndex:
+    """Obstacle segments bucketed into square cells covering the world."""
+
+    def __init__(self, x, y, types, polygons=None, width=C.WORLD_WIDTH, height=C.WORLD_HEIGHT,
+                 cell_size=OBSTACLE_CELL):
+        self.cell_size = float(cell_size)
+        self.cols = max(1, int(np.ceil(width / self.cell_size)))
+        self.rows = max(1, int(np.ceil(height / self.cell_size)))
+
+        # Primitives in obstacle order (edges in vertex order), so sums are reproducible
+        ax, ay, bx, by, reach, owner = [], [], [], [], [], []
+        for j in range(len(x)):
+            polygon = polygons[j] if polygons is not None else None
+            if polygon is None:
+                ax.append([x[j]])
+                ay.append([y[j]])
+                bx.append([x[j]])
+                by.append([y[j]])
+                reach.append([C.OBSTACLE_RADIUS[types[j]] + C.OBSTACLE_BUFFER])
+                owner.append([j])
+            else:
+                px, py = x[j] + polygon[:, 0], y[j] + polygon[:, 1]
+                ax.append(px)
+                ay.append(py)
+                bx.append(np.roll(px, -1))
+                by.append(np.roll(py, -1))
+                reach.append(np.full(len(polygon), POLYGON_REACH))
+                owner.append(np.full(len(polygon), j))
+
+        def column(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+
+        self.ax = column(ax, np.float32)
+        self.ay = column(ay, np.float32)
+        self.bx = column(bx, np.float32)
+        self.by = column(by, np.float32)
+        self.reach = column(reach, np.float32)
+        self.owner = column(owner, np.intp)
+
+        # Every cell touched by a primitive's bounding box grown by its reach
+        cx0 = self._col(np.minimum(self.ax, self.bx) - self.reach)
+        cx1 = self._col(np.maximum(self.ax, self.bx) + self.reach)
+        cy0 = self._row(np.minimum(self.ay, self.by) - self.reach)
+        cy1 = self._row(np.maximum(self.ay, self.by) + self.reach)
+        ncx, ncy = cx1 - cx0 + 1, cy1 - cy0 + 1
+        span = ncx * ncy
+        primitive = np.repeat(np.arange(len(self.ax)), span)
+        k = np.arange(int(span.sum())) - np.repeat(np.cumsum(span) - span, span)
+        cell = (cy0[primitive] + k // ncx[primitive]) * self.cols + cx0[primitive] + k % ncx[primitive]
+
+        order = np.lexsort((primitive, cell))
+        self.items = primitive[order]
+        counts = np.bincount(cell, minlength=self.rows * self.cols)
+        self.starts = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.starts[1:])
+
+    def __len__(self):
+        return len(self.ax)
+
+    def _col(self, x):
+        return np.clip(np.floor(x / self.cell_size).astype(np.int64), 0, self.cols - 1)
+
+    def _row(self, y):
+        return np.clip(np.floor(y / self.cell_size).astype(np.int64), 0, self.rows - 1)
+
+    def cells(self, x, y):
+        """Cell id of each point (points outside the world use the nearest edge cell)."""
+        return self._row(y) * self.cols + self._col(x)
+
+    def avoidance(self, kernels, nx, ny):
+        """Summed avoidance vectors for a batch of positions, in one kernel call."""
+        if not len(self.ax) or not len(nx):
+            return np.zeros(len(nx), dtype=np.float32), np.zeros(len(nx), dtype=np.float32)
+        return kernels.obstacle_avoidance(nx, ny, self.cells(nx, ny), self.starts, self.items,
+                                          self.ax, self.ay, self.bx, self.by, self.reach)
+
+
+class StackedObstacleIndex:
+    """Obstacle indexes of several worlds (an Ensemble's colonies) laid end to end.
+
+    World k's cells are numbered after those of worlds 0..k-1 and its
+    segments likewise, so one kernel call serves every world while each
+    position only meets its own world's segments, in the same order as that
+    world's own ObstacleIndex. All indexes must share one grid.
+    """
+
+    def __init__(self, indexes):
+        self.grid = indexes[0]
+        self.cells_per_world = self.grid.rows * self.grid.cols
+        segments = np.cumsum([0] + [len(index) for index in indexes])
+        items = np.cumsum([0] + [len(index.items) for index in indexes])
+
+        def column(name):
+            return np.concatenate([getattr(index, name) for index in indexes])
+
+        self.ax, self.ay, self.bx, self.by = column("ax"), column("ay"), column("bx"), column("by")
+        self.reach = column("reach")
+        self.items = np.concatenate([index.items + segments[k] for k, index in enumerate(indexes)])
+        self.starts = np.concatenate([index.starts[:-1] + items[k] for k, index in enumerate(indexes)]
+                                     + [items[-1:]])
+
+    def __len__(self):
+        return len(self.ax)
+
+    def cells(self, worlds, x, y):
+        return worlds * self.cells_per_world + self.grid.cells(x, y)
+
+    def avoidance(self, kernels, worlds, nx, ny):
+        """Summed avoidance vectors for positions in the given worlds, in one kernel call."""
+        if not len(self.ax) or not len(nx):
+            return np.zeros(len(nx), dtype=np.float32), np.zeros(len(nx), dtype=np.float32)
+        return kernels.obstacle_avoidance(nx, ny, self.cells(worlds, nx, ny), self.starts, self.items,
+                                          self.ax, self.ay, self.bx, self.by, self.reach)
@@ -0,0 +1,146 @@
+"""
+Adaptive quality control driven by measured tick cost.
+
+The browser's performance.js settings (gridSize, batchSize, maxFrameSkip)
+are fixed flags, and animate() only reacts to FPS. Here every quality
+setting is a Knob: a ladder of values running from best quality to
+cheapest, tied to the subsystem whose cost it controls. A
+QualityController keeps a smoothed cost per subsystem. When the total goes
+over the latency target, it steps the knob of the most expensive subsystem
+one rung down, provided that subsystem's cost is a meaningful share of the
+overage: when the overage comes from work no knob controls (updating the
+ants, say), lowering knobs would not bring the tick back under target, so
+nothing changes and the log notes it once. Once there is comfortable
+headroom, it restores the most recently lowered knob. Every change is
+appended to an audit log with the measurements that caused it.
+
+The same controller runs once per colony (engine settings, fed by the
+colony's tick timings) and once per streamed client (frame detail and
+rate, fed by how long that client's frames take to send).
+"""
+
+from collections import deque
+
+from . import constants as C
+
+LOG_SIZE = 200
+MIN_SHARE = 0.25  # Least fraction of the overage a subsystem must cost for its knob to be lowered
+
+# Colony knobs: (name, subsystem, ladder from best to cheapest)
+COLONY_KNOBS = (
+    ("predator_interval", "predators", (1, 2, 3, 5)),  # Ticks between predator updates
+    ("grid_size", "index", (C.GRID_SIZE, 2 * C.GRID_SIZE, 4 * C.GRID_SIZE)),  # Ant index cell size
+    ("stream_every", "stream", (1, 2, 3, 4)),  # Ticks between broadcasts
+)
+
+# Client knobs: level of detail (max ants per frame) first, then frame rate
+CLIENT_KNOBS = (
+    ("max_ants", "send", (None, 20000, 5000, 1000)),
+    ("stream_every", "send", (1, 2, 3, 4)),
+)
+
+COLONY_TARGET_MS = C.FRAME_INTERVAL_MS / 2
+CLIENT_TARGET_MS = 20.0
+
+
+class Knob:
+    """One adjustable setting."""
+
+    def __init__(self, name, subsystem, levels):
+        self.name = name
+        self.subsystem = subsystem
+        self.levels = tuple(levels)
+        self.level = 0
+
+    @property
+    def value(self):
+        return self.levels[self.level]
+
+    @property
+    def lowest(self):
+        return self.level == len(self.levels) - 1
+
+
+class QualityController:
+    """Hold a latency target by trading quality settings against measured cost."""
+
+    def __init__(self, knobs=COLONY_KNOBS, target_ms=COLONY_TARGET_MS, smoothing=0.1,
+                 headroom=0.6, cooldown=15, min_share=MIN_SHARE):
+        self.knobs = {name: Knob(name, subsystem, levels) for name, subsystem, levels in knobs}
+        self.target_ms = target_ms
+        self.smoothing = smoothing  # Weight of the newest sample in the moving averages
+        self.headroom = headroom    # Restore quality below this fraction of the target
+        self.cooldown = cooldown    # Samples to wait after a change before the next one
+        self.min_share = min_share  # Least share of the overage a knob's subsystem must cost
+        self.cost = {}              # Smoothed ms per subsystem
+        self.lowered = []           # Knob names in the order they were lowered
+        self.wait = cooldown
+        self.stuck = False          # Over target with no knob to blame, already logged
+        self.log = deque(maxlen=LOG_SIZE)
+
+    def __getitem__(self, name):
+        return self.knobs[name].value
+
+    @property
+    def total_ms(self):
+        return sum(self.cost.values())
+
+    def observe(self, tick, timings):
+        """Feed one sample of {subsystem: ms}; return the adjustment made, if any."""
+        for name, ms in timings.items():
+            previous = self.cost.get(name)
+            self.cost[name] = ms if previous is None else previous + self.smoothing * (ms - previous)
+
+        if self.wait > 0:
+            self.wait -= 1
+            return None
+        total = self.total_ms
+        if total > self.target_ms:
+            # Lower the knob tied to the most expensive subsystem that can still give,
+            # if that subsystem is behind a meaningful part of the overage
+            floor = self.min_share * (total - self.target_ms)
+            knobs = [k for k in self.knobs.values()
+                     if not k.lowest and self.cost.get(k.subsystem, 0.0) >= floor]
+            if not knobs:
+                if not self.stuck:
+                    self.stuck = True
+                    self.log.append(self._entry(tick, None, None, None, "over target, no knob"))
+                return None
+            knob = max(knobs, key=lambda k: self.cost.get(k.subsystem, 0.0))
+            self.lowered.append(knob.name)
+            return self._set(knob, knob.level + 1, tick, "over target")
+        self.stuck = False
+        if total < self.target_ms * self.headroom and self.lowered:
+            knob = self.knobs[self.lowered.pop()]
+            return self._set(knob, knob.level - 1, tick, "headroom")
+        return None
+
+    def _set(self, knob, level, tick, reason):
+        old = knob.value
+        knob.level = level
+        self.wait = self.cooldown
+        self.stuck = False
+        entry = self._entry(tick, knob.name, old, knob.value, reason)
+        self.log.append(entry)
+        return entry
+
+    def _entry(self, tick, knob, old, new, reason):
+        return {
+            "tick": tick,
+            "knob": knob,
+            "from": old,
+            "to": new,
+            "reason": reason,
+            "totalMs": round(self.total_ms, 3),
+            "targetMs": round(self.target_ms, 3),
+            "costMs": {name: round(ms, 3) for name, ms in self.cost.items()},
+        }
+
+    def to_dict(self):
+        return {
+            "targetMs": self.target_ms,
+            "totalMs": round(self.total_ms, 3),
+            "costMs": {name: round(ms, 3) for name, ms in self.cost.items()},
+            "settings": {name: knob.value for name, knob in self.knobs.items()},
+            "log": list(self.log),
+        }
@@ -0,0 +1,416 @@
+"""
+On-disk trajectory recording for long runs.
+
+A recording is a directory of column files (ant id, x, y, state) plus a
+per-sample index and a log of deaths, each a growable memory-mapped array,
+and a small meta.json. Every recorded tick appends one row per active ant,
+and every ant that died since the previous call one (tick, ant id, cause)
+row to the deaths log, so an ant that vanishes can be told apart as eaten,
+dead of old age or burned. Positions
+are stored as float32 ("raw"), as uint16 fixed point ("quantized"), or as
+int16 deltas against the same ant's previous sample ("delta", which
+compresses far better when archived). Delta recordings write a keyframe of
+absolute positions every `keyframe` samples, so any tick range decodes from
+the keyframe before it.
+
+TrajectoryReader slices a recording by tick range or by ant id through the
+memory maps. It only touches the rows it needs, never the whole file.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from . import constants as C
+
+VERSION = 2  # 2: deaths log
+ENCODINGS = ("raw", "quantized", "delta")
+INITIAL_ROWS = 1 << 16
+INITIAL_SAMPLES = 1 << 12
+SCAN_CHUNK = 1 << 20  # Rows scanned at once when searching by ant id
+CHUNK_ROWS = 1 << 22  # Rows per slice when streaming a whole recording
+PAGE_ROWS = 1 << 16   # Rows per page served by the trajectory endpoint
+
+# State byte: kind * 8 + phase, plus flags
+FLEEING = 0x40
+ABSOLUTE = 0x80  # Delta encoding: this row holds an absolute position
+CODE_MASK = 0x3F
+
+POSITION_DTYPES = {"raw": np.float32, "quantized": np.uint16, "delta": np.uint16}
+
+
+class MappedColumn:
+    """A memory-mapped 1-D (or fixed-width 2-D) array that grows by doubling."""
+
+    def __init__(self, path, dtype, capacity, width=None, mode="w+"):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.capacity = capacity
+        self.array = np.memmap(path, dtype=self.dtype, mode=mode, shape=self.shape(capacity))
+
+    def shape(self, rows):
+        return (rows,) if self.width is None else (rows, self.width)
+
+    def reserve(self, rows):
+        if rows <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < rows:
+            capacity *= 2
+        self.array.flush()
+        del self.array
+        row_bytes = self.dtype.itemsize * (self.width or 1)
+        with open(self.path, "r+b") as f:
+            f.truncate(capacity * row_bytes)
+        self.array = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=self.shape(capacity))
+        self.capacity = capacity
+
+    def flush(self):
+        self.array.flush()
+
+
+class TrajectoryRecorder:
+    """Append per-tick ant positions and states of a colony to disk.
+
+    `every` records one tick in N, `ant_stride` keeps only ants whose id is
+    a multiple of it, and `encoding` picks how positions are stored.
+    """
+
+    def __init__(self, path, width=C.WORLD_WIDTH, height=C.WORLD_HEIGHT, encoding="delta",
+                 every=1, ant_stride=1, keyframe=64, tick_ms=C.FRAME_INTERVAL_MS):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding: {encoding} (choose from {', '.join(ENCODINGS)})")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.width = float(width)
+        self.height = float(height)
+        self.encoding = encoding
+        self.every = max(1, int(every))
+        self.ant_stride = max(1, int(ant_stride))
+        self.keyframe = max(1, int(keyframe))
+        self.tick_ms = float(tick_ms)  # Simulated time per tick, for converting ticks to seconds
+        # Fixed point: the world is mapped onto 0..65535
+        self.scale = (65535 / self.width, 65535 / self.height)
+
+        position_dtype = POSITION_DTYPES[encoding]
+        self.columns = {
+            "ant_id": MappedColumn(os.path.join(path, "ant_id.bin"), np.int32, INITIAL_ROWS),
+            "x": MappedColumn(os.path.join(path, "x.bin"), position_dtype, INITIAL_ROWS),
+            "y": MappedColumn(os.path.join(path, "y.bin"), position_dtype, INITIAL_ROWS),
+            "state": MappedColumn(os.path.join(path, "state.bin"), np.uint8, INITIAL_ROWS),
+        }
+        # One entry per sample: (tick, first row, row count)
+        self.index = MappedColumn(os.path.join(path, "index.bin"), np.int64, INITIAL_SAMPLES, width=3)
+        # One entry per dead ant: (tick it was first missing at, ant id, cause)
+        self.deaths = MappedColumn(os.path.join(path, "deaths.bin"), np.int64, INITIAL_SAMPLES, width=3)
+        self.rows = 0
+        self.samples = 0
+        self.dead = 0
+        self.last_qx = np.zeros(0, dtype=np.int32)  # Previous quantized position by ant id
+        self.last_qy = np.zeros(0, dtype=np.int32)
+        self.write_meta()
+
+    def meta(self):
+        return {
+            "version": VERSION,
+            "encoding": self.encoding,
+            "width": self.width,
+            "height": self.height,
+            "every": self.every,
+            "antStride": self.ant_stride,
+            "keyframe": self.keyframe,
+            "tickMs": self.tick_ms,
+            "rows": self.rows,
+            "samples": self.samples,
+            "deaths": self.dead,
+            "columns": {name: column.dtype.str for name, column in self.columns.items()},
+        }
+
+    def write_meta(self):
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta(), f, indent=2)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def record(self, colony):
+        """Log the deaths since the last call, then append the colony's
+        current tick if it is due for sampling.
+
+        Deaths are only logged once colony.track_deaths() has been called.
+        """
+        ids, causes = colony.drain_deaths()
+        if self.ant_stride > 1:
+            kept = ids % self.ant_stride == 0
+            ids, causes = ids[kept], causes[kept]
+        self.append_deaths(colony.tick, ids, causes)
+        if colony.tick % self.every:
+            return False
+        active = colony.ant_active
+        if self.ant_stride > 1:
+            active = active & (colony.ant_id % self.ant_stride == 0)
+        slots = np.flatnonzero(active)
+        self.append(colony.tick, colony.ant_id[slots], colony.ant_x[slots], colony.ant_y[slots],
+                    colony.ant_kind[slots] * 8 + colony.ant_phase[slots]
+                    + np.where(colony.ant_fleeing[slots], FLEEING, 0))
+        return True
+
+    def append(self, tick, ids, x, y, state):
+        """Append one sample of rows."""
+        n = len(ids)
+        start, stop = self.rows, self.rows + n
+        for column in self.columns.values():
+            column.reserve(stop)
+        self.index.reserve(self.samples + 1)
+
+        state = state.astype(np.uint8)
+        if self.encoding == "raw":
+            px, py = x.astype(np.float32), y.astype(np.float32)
+        else:
+            qx = np.clip(np.rint(x * self.scale[0]), 0, 65535).astype(np.int32)
+            qy = np.clip(np.rint(y * self.scale[1]), 0, 65535).astype(np.int32)
+            px, py = qx, qy
+            if self.encoding == "delta":
+                px, py, absolute = self.delta(ids, qx, qy)
+                state = state | np.where(absolute, ABSOLUTE, 0).astype(np.uint8)
+            px = px.astype(np.uint16)  # Deltas are stored as int16 bit patterns
+            py = py.astype(np.uint16)
+
+        self.columns["ant_id"].array[start:stop] = ids
+        self.columns["x"].array[start:stop] = px
+        self.columns["y"].array[start:stop] = py
+        self.columns["state"].array[start:stop] = state
+        self.index.array[self.samples] = (tick, start, n)
+        self.rows = stop
+        self.samples += 1
+        if self.samples % self.keyframe == 0:
+            self.flush()
+
+    def append_deaths(self, tick, ids, causes):
+        n = len(ids)
+        if not n:
+            return
+        self.deaths.reserve(self.dead + n)
+        self.deaths.array[self.dead:self.dead + n] = np.column_stack([np.full(n, tick), ids, causes])
+        self.dead += n
+
+    def delta(self, ids, qx, qy):
+        """Deltas against each ant's previous sample (absolute on keyframes and new ants)."""
+        if len(ids) and ids.max() >= len(self.last_qx):
+            size = max(int(ids.max()) + 1, 2 * len(self.last_qx))
+            self.last_qx = np.concatenate([self.last_qx, np.full(size - len(self.last_qx), -1, np.int32)])
+            self.last_qy = np.concatenate([self.last_qy, np.full(size - len(self.last_qy), -1, np.int32)])
+        prev_x, prev_y = self.last_qx[ids], self.last_qy[ids]
+        dx, dy = qx - prev_x, qy - prev_y
+        absolute = ((self.samples % self.keyframe == 0) | (prev_x < 0)
+                    | (np.abs(dx) > 32767) | (np.abs(dy) > 32767))
+        self.last_qx[ids] = qx
+        self.last_qy[ids] = qy
+        return np.where(absolute, qx, dx), np.where(absolute, qy, dy), absolute
+
+    def flush(self):
+        for column in self.columns.values():
+            column.flush()
+        self.index.flush()
+        self.deaths.flush()
+        self.write_meta()
+
+    def close(self):
+        """Flush and trim the files to the recorded size."""
+        self.flush()
+        sizes = [(column, self.rows) for column in self.columns.values()]
+        for column, rows in sizes + [(self.index, self.samples), (self.deaths, self.dead)]:
+            row_bytes = column.dtype.itemsize * (column.width or 1)
+            del column.array
+            with open(column.path, "r+b") as f:
+                f.truncate(max(rows, 1) * row_bytes)
+
+
+class Trajectories:
+    """Decoded rows: tick, ant id, x, y, kind, phase and fleeing flag."""
+
+    def __init__(self, tick, ant_id, x, y, state):
+        self.tick = tick
+        self.ant_id = ant_id
+        self.x = x
+        self.y = y
+        code = state & CODE_MASK
+        self.kind = code // 8
+        self.phase = code % 8
+        self.fleeing = (state & FLEEING) != 0
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0, np.int64), np.zeros(0, np.int32), np.zeros(0), np.zeros(0), np.zeros(0, np.uint8))
+
+    def __len__(self):
+        return len(self.ant_id)
+
+    def to_dict(self):
+        return {
+            "tick": self.tick.tolist(),
+            "antId": self.ant_id.tolist(),
+            "x": np.round(self.x, 2).tolist(),
+            "y": np.round(self.y, 2).tolist(),
+            "kind": self.kind.tolist(),
+            "phase": self.phase.tolist(),
+            "fleeing": self.fleeing.tolist(),
+        }
+
+
+class TrajectoryReader:
+    """Read-only, memory-mapped view of a recording.
+
+    `meta` is a live recorder's meta(), used instead of meta.json: rows the
+    recorder has written are already visible through the shared mappings,
+    so a recording can be read while it grows without flushing it first.
+    """
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        if meta is None:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+        self.meta = meta
+        self.encoding = self.meta["encoding"]
+        self.rows = self.meta["rows"]
+        self.samples = self.meta["samples"]
+        self.scale = (65535 / self.meta["width"], 65535 / self.meta["height"])
+        self.tick_ms = self.meta.get("tickMs", C.FRAME_INTERVAL_MS)
+        self.columns = {name: self._map(name + ".bin", np.dtype(dtype), (self.rows,))
+                        for name, dtype in self.meta["columns"].items()}
+        self.index = self._map("index.bin", np.dtype(np.int64), (self.samples, 3))
+        # Version 1 recordings have no deaths log
+        self.deaths = self._map("deaths.bin", np.dtype(np.int64), (self.meta["deaths"], 3)) \
+            if "deaths" in self.meta else None
+
+    def _map(self, name, dtype, shape):
+        if not shape[0]:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r", shape=shape)
+
+    @property
+    def ticks(self):
+        """Recorded tick numbers."""
+        return np.asarray(self.index[:, 0])
+
+    def death_causes(self):
+        """(ant ids, causes) of every logged death, or None if the recording has no deaths log."""
+        if self.deaths is None:
+            return None
+        return np.asarray(self.deaths[:, 1]), np.asarray(self.deaths[:, 2])
+
+    def _rows(self, start, stop):
+        """Decoded rows [start, stop) as (ant id, x, y, state), decoding deltas."""
+        ids = np.asarray(self.columns["ant_id"][start:stop])
+        state = np.asarray(self.columns["state"][start:stop])
+        x = np.asarray(self.columns["x"][start:stop])
+        y = np.asarray(self.columns["y"][start:stop])
+        if self.encoding == "raw":
+            return ids, x, y, state
+        if self.encoding == "delta":
+            absolute = (state & ABSOLUTE) != 0
+            x = self._integrate(ids, x.view(np.int16), absolute)
+            y = self._integrate(ids, y.view(np.int16), absolute)
+        return ids, x / self.scale[0], y / self.scale[1], state & ~np.uint8(ABSOLUTE)
+
+    @staticmethod
+    def _integrate(ids, values, absolute):
+        """Per-ant running sums that restart at every absolute row.
+
+        Rows are in time order; every ant's first row in the window must be
+        absolute (guaranteed when decoding starts at a keyframe).
+        """
+        values = np.where(absolute, values.astype(np.int64) & 0xFFFF, values.astype(np.int64))
+        order = np.argsort(ids, kind="stable")
+        v = values[order]
+        total = np.cumsum(v)
+        segment = np.cumsum(absolute[order]) - 1
+        starts = np.flatnonzero(absolute[order])
+        decoded = np.empty(len(values), dtype=np.int64)
+        decoded[order] = total - (total[starts] - v[starts])[np.maximum(segment, 0)]
+        return decoded
+
+    def _sample_range(self, start_tick, stop_tick):
+        ticks = self.ticks
+        first = int(np.searchsorted(ticks, start_tick, side="left")) if start_tick is not None else 0
+        last = int(np.searchsorted(ticks, stop_tick, side="left")) if stop_tick is not None else self.samples
+        return first, last
+
+    def page_stop(self, start_tick=None, stop_tick=None, max_rows=PAGE_ROWS):
+        """Tick that ends the first page of [start_tick, stop_tick): whole samples
+        of about max_rows rows (at least one sample). None if the range fits."""
+        first, last = self._sample_range(start_tick, stop_tick)
+        if first >= last:
+            return None
+        ends = np.asarray(self.index[first:last, 1] + self.index[first:last, 2])
+        count = max(1, int(np.searchsorted(ends, self.index[first, 1] + max_rows, side="right")))
+        return int(self.index[first + count, 0]) if first + count < last else None
+
+    def range(self, start_tick=None, stop_tick=None):
+        """All rows with start_tick <= tick < stop_tick."""
+        first, last = self._sample_range(start_tick, stop_tick)
+        if first >= last:
+            return Trajectories.empty()
+        decode_from = first
+        if self.encoding == "delta":
+            decode_from -= first % self.meta["keyframe"]  # Back to the keyframe
+        row_start = int(self.index[decode_from, 1])
+        row_skip = int(self.index[first, 1]) - row_start
+        row_stop = int(self.index[last - 1, 1] + self.index[last - 1, 2])
+
+        ids, x, y, state = self._rows(row_start, row_stop)
+        counts = np.asarray(self.index[first:last, 2])
+        tick = np.repeat(np.asarray(self.index[first:last, 0]), counts)
+        return Trajectories(tick, ids[row_skip:], x[row_skip:], y[row_skip:], state[row_skip:])
+
+    def chunks(self, max_rows=CHUNK_ROWS):
+        """The whole recording as consecutive slices of whole samples, about max_rows rows each."""
+        ticks = self.ticks
+        ends = np.asarray(self.index[:, 1] + self.index[:, 2])
+        first = 0
+        while first < self.samples:
+            last = int(np.searchsorted(ends, self.index[first, 1] + max_rows, side="right"))
+            last = max(first + 1, last)
+            yield self.range(ticks[first], ticks[last - 1] + 1)
+            first = last
+
+    def frame(self, tick):
+        """Rows of one recorded tick."""
+        return self.range(tick, tick + 1)
+
+    def ant(self, ant_id, start_tick=None, stop_tick=None):
+        """One ant's trajectory, found by scanning the id column in chunks."""
+        first, last = self._sample_range(start_tick, stop_tick)
+        if first >= last:
+            return Trajectories.empty()
+        row_stop = int(self.index[last - 1, 1] + self.index[last - 1, 2])
+        # Delta chains start at the ant's last absolute row before the range
+        decode_from = first - first % self.meta["keyframe"] if self.encoding == "delta" else first
+        row_start = int(self.index[decode_from, 1])
+
+        rows = []
+        for chunk in range(row_start, row_stop, SCAN_CHUNK):
+            ids = np.asarray(self.columns["ant_id"][chunk:min(chunk + SCAN_CHUNK, row_stop)])
+            rows.append(chunk + np.flatnonzero(ids == ant_id))
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+
+        state = np.asarray(self.columns["state"][rows])
+        x = np.asarray(self.columns["x"][rows])
+        y = np.asarray(self.columns["y"][rows])
+        if self.encoding != "raw":
+            if self.encoding == "delta":
+                absolute = (state & ABSOLUTE) != 0
+                ids = np.full(len(rows), ant_id)
+                x = self._integrate(ids, x.view(np.int16), absolute)
+                y = self._integrate(ids, y.view(np.int16), absolute)
+                state = state & ~np.uint8(ABSOLUTE)
+            x, y = x / self.scale[0], y / self.scale[1]
+
+        # Map rows back to ticks through the index, dropping the rows before the range
+        starts = np.asarray(self.index[decode_from:last, 1])
+        tick = np.asarray(self.index[decode_from:last, 0])[np.searchsorted(starts, rows, side="right") - 1]
+        keep = rows >= self.index[first, 1]
+        return Trajectories(tick[keep], np.full(int(keep.sum()), ant_id, dtype=np.int32),
+                            x[keep], y[keep], state[keep])
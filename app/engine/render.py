@@ -0,0 +1,202 @@
+"""
+Server-side rasterization of colony state to PNG.
+
+Layers are built straight from the colony's column arrays: terrain is
+resampled from the environment grid, and ants, food and predators are
+binned into a 2D histogram with np.bincount and mapped through a colour
+lookup table. No per-entity drawing calls are made, so a frame of a
+million-ant colony costs a few array passes.
+"""
+
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+LAYERS = ('terrain', 'ants', 'food', 'predators')
+MAX_SIZE = 2048
+BACKGROUND = np.array([34, 34, 34], dtype=np.float32)
+
+# Terrain colours: the fallback fills of Environment.drawTerrain
+TERRAIN_COLORS = np.array([
+    [34, 34, 34],     # normal
+    [255, 235, 153],  # sand
+    [139, 69, 19],    # mud
+    [124, 252, 0],    # grass
+], dtype=np.float32)
+TERRAIN_ALPHA = 0.3
+
+FOOD_COLOR = np.array([255, 204, 0], dtype=np.float32)
+PREDATOR_COLOR = np.array([204, 0, 0], dtype=np.float32)
+QUEEN_COLOR = np.array([0, 204, 0], dtype=np.float32)
+
+
+def _colormap(stops):
+    """256-entry RGB lookup table interpolated between (position, colour) stops."""
+    positions = [p for p, _ in stops]
+    channels = [np.interp(np.linspace(0, 1, 256), positions, [c[i] for _, c in stops]) for i in range(3)]
+    return np.stack(channels, axis=1).astype(np.float32)
+
+
+# Dark red -> orange -> pale yellow, like a "hot" heatmap
+DENSITY_COLORMAP = _colormap([
+    (0.0, (80, 0, 0)),
+    (0.4, (220, 60, 0)),
+    (0.75, (255, 190, 40)),
+    (1.0, (255, 255, 220)),
+])
+
+
+class View:
+    """Pixel grid over a window of the world (centre, zoom and output size)."""
+
+    def __init__(self, colony, width=256, height=None, zoom=1.0, x=None, y=None):
+        self.width = int(np.clip(width, 1, MAX_SIZE))
+        if height is None:
+            height = self.width * colony.height / colony.width
+        self.height = int(np.clip(round(height), 1, MAX_SIZE))
+        zoom = max(float(zoom), 0.01)
+
+        # World units per pixel so the whole world fits at zoom 1
+        self.scale = max(colony.width / self.width, colony.height / self.height) / zoom
+        cx = colony.width / 2 if x is None else float(x)
+        cy = colony.height / 2 if y is None else float(y)
+        self.x0 = cx - self.width * self.scale / 2
+        self.y0 = cy - self.height * self.scale / 2
+
+    def histogram(self, x, y, weights=None):
+        """2D histogram of world points over the pixel grid."""
+        px = np.floor((x - self.x0) / self.scale).astype(np.int64)
+        py = np.floor((y - self.y0) / self.scale).astype(np.int64)
+        inside = (px >= 0) & (px < self.width) & (py >= 0) & (py < self.height)
+        cells = py[inside] * self.width + px[inside]
+        if weights is not None:
+            weights = weights[inside]
+        counts = np.bincount(cells, weights=weights, minlength=self.width * self.height)
+        return counts.reshape(self.height, self.width)
+
+    def pixel_centers(self):
+        """World coordinates of pixel centres along each axis."""
+        xs = self.x0 + (np.arange(self.width) + 0.5) * self.scale
+        ys = self.y0 + (np.arange(self.height) + 0.5) * self.scale
+        return xs, ys
+
+
+def _dilate(mask, radius):
+    """Grow a boolean mask by `radius` pixels (square structuring element)."""
+    if radius <= 0:
+        return mask
+    padded = np.pad(mask, radius)
+    out = np.zeros_like(mask)
+    h, w = mask.shape
+    for dy in range(2 * radius + 1):
+        for dx in range(2 * radius + 1):
+            out |= padded[dy:dy + h, dx:dx + w]
+    return out
+
+
+def _blend(image, mask, color, alpha=1.0):
+    image[mask] = image[mask] * (1 - alpha) + color * alpha
+
+
+def rasterize(colony, width=256, height=None, zoom=1.0, x=None, y=None, layers=LAYERS):
+    """Render the colony to an (height, width, 3) uint8 RGB array."""
+    view = View(colony, width, height, zoom, x, y)
+    image = np.empty((view.height, view.width, 3), dtype=np.float32)
+    image[:] = BACKGROUND
+
+    if 'terrain' in layers:
+        xs, ys = view.pixel_centers()
+        terrain = colony.environment.terrain_at(xs[None, :], ys[:, None])
+        in_world = ((xs[None, :] >= 0) & (xs[None, :] < colony.width) &
+                    (ys[:, None] >= 0) & (ys[:, None] < colony.height))
+        patch = in_world & (terrain > 0)
+        image[patch] = (image[patch] * (1 - TERRAIN_ALPHA) +
+                        TERRAIN_COLORS[terrain[patch]] * TERRAIN_ALPHA)
+
+    if 'ants' in layers:
+        active = colony.ant_active
+        density = view.histogram(colony.ant_x[active], colony.ant_y[active])
+        occupied = density > 0
+        if occupied.any():
+            # Log scaling keeps sparse trails visible next to the crowded nest
+            level = np.log1p(density[occupied])
+            level = (level / level.max() * 255).astype(np.uint8)
+            image[occupied] = DENSITY_COLORMAP[level]
+
+    marker = max(1, int(round(3 / view.scale)))
+    if 'food' in layers:
+        alive = colony.food_alive
+        food = view.histogram(colony.food_x[alive], colony.food_y[alive]) > 0
+        _blend(image, _dilate(food, marker), FOOD_COLOR)
+
+    if 'predators' in layers:
+        predators = view.histogram(colony.predator_x, colony.predator_y) > 0
+        _blend(image, _dilate(predators, marker * 2), PREDATOR_COLOR)
+
+    qx, qy = colony.queen
+    queen = view.histogram(np.array([qx]), np.array([qy])) > 0
+    _blend(image, _dilate(queen, marker * 2), QUEEN_COLOR)
+
+    return image.astype(np.uint8)
+
+
+def _png_chunk(kind, data):
+    body = kind + data
+    return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+
+def encode_png(rgb, level=6):
+    """Encode an (h, w, 3) uint8 array as a PNG file."""
+    h, w, _ = rgb.shape
+    # Filter type 0 (None) prepended to every scanline
+    raw = np.zeros((h, w * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(h, w * 3)
+    header = struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0)
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', header),
+        _png_chunk(b'IDAT', zlib.compress(raw.tobytes(), level)),
+        _png_chunk(b'IEND', b''),
+    ])
+
+
+class RenderCache:
+    """Small LRU cache of encoded PNGs keyed by colony, tick and view parameters."""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # Renders run in worker threads
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        with self.lock:
+            self.entries[key] = data
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def render(self, colony_id, colony, **params):
+        """Cached PNG of the colony (or a Snapshot of it) at its current tick."""
+        layers = tuple(layer for layer in LAYERS if layer in params.get('layers', LAYERS))
+        params['layers'] = layers
+        key = (colony_id, colony.tick) + tuple(sorted(params.items()))
+        data = self.get(key)
+        if data is None:
+            data = encode_png(rasterize(colony, **params))
+            self.put(key, data)
+        return data
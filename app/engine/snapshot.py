@@ -0,0 +1,138 @@
+"""
+Double-buffered colony state for readers outside the tick loop.
+
+Rendering a large colony to PNG takes far longer than a tick, so it cannot
+run on the event loop without delaying the next tick. It cannot simply
+move to a worker thread either: the tick rewrites the columns in place, and
+a reader running meanwhile would see a mix of two ticks.
+
+A StateBuffer publishes the columns readers need into one of two buffers
+and swaps it to the front with a single reference assignment; each swap is
+a new epoch. Readers pin the front Snapshot while they use it, so the next
+publish writes into the other buffer. If a slow reader still holds that
+one too, the publisher allocates a fresh buffer instead of waiting, so the
+writer never blocks on a reader, and a reader never sees a partial tick or
+copies anything. The lock only guards the pin counts and is never held
+while copying or reading.
+
+The engine mutates its columns from many kernels, so the tick itself is
+not double-buffered. Publishing copies the read columns instead, once per
+tick and only while someone reads them (see ColonyRunner.publish_state).
+"""
+
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+# Columns read by render.rasterize and the other snapshot readers
+READ_COLUMNS = ("ant_x", "ant_y", "ant_active", "food_x", "food_y", "food_alive", "predator_x", "predator_y")
+
+
+class _Buffer:
+    """Arrays behind one side of the double buffer and the readers pinning them."""
+
+    def __init__(self):
+        self.arrays = {}
+        self.pins = 0
+
+
+class Snapshot:
+    """The colony as one tick left it, with read-only columns.
+
+    Has the attributes render.rasterize uses, so it can stand in for the
+    Colony there.
+    """
+
+    def __init__(self, colony, columns, epoch, buffer):
+        self.epoch = epoch
+        self.buffer = buffer
+        self.tick = colony.tick
+        self.width = colony.width
+        self.height = colony.height
+        self.queen = tuple(colony.queen)
+        self.environment = colony.environment  # Only its terrain is read, and terrain never changes
+        self.summary = colony.to_dict()
+        for name, array in columns.items():
+            setattr(self, name, array)
+
+    def to_dict(self):
+        return self.summary
+
+
+class StateBuffer:
+    """Front and back buffers of a colony's read columns, swapped once per publish."""
+
+    def __init__(self, colony, columns=READ_COLUMNS):
+        self.colony = colony
+        self.columns = columns
+        self.front = None        # Snapshot readers get
+        self.back = _Buffer()    # Buffer the next publish writes into
+        self.epoch = 0
+        self.lock = threading.Lock()  # Guards pin counts only
+        self.allocations = 0     # Fresh buffers allocated because a reader held the back one
+
+    def publish(self):
+        """Copy the colony's current state into the back buffer and swap it to the front.
+
+        Call it from the thread that ticks the colony, between ticks.
+        """
+        buffer = self.back
+        with self.lock:
+            pinned = buffer.pins > 0
+        if pinned:
+            buffer = _Buffer()  # The old one stays with its readers until they let go
+            self.allocations += 1
+
+        columns = {}
+        for name in self.columns:
+            source = getattr(self.colony, name)
+            target = buffer.arrays.get(name)
+            if target is None or target.shape != source.shape or target.dtype != source.dtype:
+                target = buffer.arrays[name] = np.empty_like(source)
+            np.copyto(target, source)
+            view = target.view()
+            view.flags.writeable = False
+            columns[name] = view
+
+        self.epoch += 1
+        snapshot = Snapshot(self.colony, columns, self.epoch, buffer)
+        self.back = self.front.buffer if self.front is not None else _Buffer()
+        self.front = snapshot
+        return snapshot
+
+    @property
+    def stale(self):
+        """Whether the colony has ticked since the last publish."""
+        return self.front is None or self.front.tick != self.colony.tick
+
+    @contextmanager
+    def read(self):
+        """Pin the front snapshot for the duration of a `with` block.
+
+        Safe from any thread. A snapshot swapped out between being looked
+        up and being pinned may already be getting overwritten, so the pin
+        is retried on the new front.
+        """
+        while True:
+            snapshot = self.front
+            if snapshot is None:
+                raise LookupError("No state has been published yet")
+            with self.lock:
+                snapshot.buffer.pins += 1
+            if self.front is snapshot:
+                break
+            with self.lock:
+                snapshot.buffer.pins -= 1
+        try:
+            yield snapshot
+        finally:
+            with self.lock:
+                snapshot.buffer.pins -= 1
+
+    def to_dict(self):
+        return {
+            "epoch": self.epoch,
+            "tick": self.front.tick if self.front is not None else None,
+            "allocations": self.allocations,
+        }
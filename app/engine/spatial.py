@@ -0,0 +1,125 @@
+"""
+Uniform-grid spatial index for the headless engine.
+
+Server-side counterpart of updateSpatialGrid/getNearbyObjects in
+modules/performance.js. Instead of a dict of per-cell lists, points are
+counting-sorted by cell id so every cell is a contiguous slice of one
+index array and the whole index is rebuilt with a handful of array ops.
+"""
+
+import numpy as np
+
+from . import constants as C
+
+
+class SpatialGrid:
+    """Points bucketed into square cells of `cell_size` world units."""
+
+    def __init__(self, x, y, cell_size=C.GRID_SIZE, ids=None):
+        self.cell_size = float(cell_size)
+        x = np.asarray(x, dtype=np.float32)
+        y = np.asarray(y, dtype=np.float32)
+        self.x = x
+        self.y = y
+        self.ids = np.arange(len(x)) if ids is None else np.asarray(ids)
+
+        if len(x):
+            gx = np.floor(x / self.cell_size).astype(np.int64)
+            gy = np.floor(y / self.cell_size).astype(np.int64)
+            self.gx0, self.gy0 = int(gx.min()), int(gy.min())
+            self.cols = int(gx.max()) - self.gx0 + 1
+            self.rows = int(gy.max()) - self.gy0 + 1
+            cell = (gy - self.gy0) * self.cols + (gx - self.gx0)
+        else:
+            self.gx0 = self.gy0 = 0
+            self.cols = self.rows = 1
+            cell = np.zeros(0, dtype=np.int64)
+
+        self.order = np.argsort(cell, kind="stable")
+        counts = np.bincount(cell, minlength=self.rows * self.cols)
+        self.starts = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.starts[1:])
+
+    def __len__(self):
+        return len(self.x)
+
+    def _cell_range(self, x0, y0, x1, y1):
+        """Clamp a world rectangle to the occupied cell range."""
+        cx0 = max(int(np.floor(x0 / self.cell_size)) - self.gx0, 0)
+        cy0 = max(int(np.floor(y0 / self.cell_size)) - self.gy0, 0)
+        cx1 = min(int(np.floor(x1 / self.cell_size)) - self.gx0, self.cols - 1)
+        cy1 = min(int(np.floor(y1 / self.cell_size)) - self.gy0, self.rows - 1)
+        return cx0, cy0, cx1, cy1
+
+    def candidates(self, x0, y0, x1, y1):
+        """Point indices in all cells touching the rectangle (unfiltered)."""
+        cx0, cy0, cx1, cy1 = self._cell_range(x0, y0, x1, y1)
+        if cx0 > cx1 or cy0 > cy1 or not len(self.x):
+            return np.zeros(0, dtype=np.intp)
+
+        # Each row of cells is one contiguous run in the sorted order
+        slices = []
+        for cy in range(cy0, cy1 + 1):
+            base = cy * self.cols
+            start, stop = self.starts[base + cx0], self.starts[base + cx1 + 1]
+            if stop > start:
+                slices.append(self.order[start:stop])
+        if not slices:
+            return np.zeros(0, dtype=np.intp)
+        return np.concatenate(slices)
+
+    def query_rect(self, x0, y0, x1, y1):
+        """Indices of points inside the rectangle, in ascending order."""
+        idx = self.candidates(x0, y0, x1, y1)
+        px, py = self.x[idx], self.y[idx]
+        inside = (px >= x0) & (px <= x1) & (py >= y0) & (py <= y1)
+        return np.sort(idx[inside])
+
+    def query_radius(self, x, y, radius):
+        """Indices of points within `radius` of (x, y)."""
+        idx = self.candidates(x - radius, y - radius, x + radius, y + radius)
+        d2 = (self.x[idx] - x) ** 2 + (self.y[idx] - y) ** 2
+        return idx[d2 <= radius * radius]
+
+    def _query_cells(self, qx, qy):
+        gx = np.floor(np.asarray(qx, dtype=np.float32) / self.cell_size).astype(np.int64) - self.gx0
+        gy = np.floor(np.asarray(qy, dtype=np.float32) / self.cell_size).astype(np.int64) - self.gy0
+        return gx, gy
+
+    def ring_bounds(self, qx, qy):
+        """Rings each query needs to first touch, and to cover, the occupied cells."""
+        gx, gy = self._query_cells(qx, qy)
+        near = np.maximum(np.maximum(-gx, gx - (self.cols - 1)), np.maximum(-gy, gy - (self.rows - 1)))
+        far = np.maximum(np.maximum(gx, self.cols - 1 - gx), np.maximum(gy, self.rows - 1 - gy))
+        return np.maximum(near, 0), far
+
+    def neighbours(self, qx, qy, rings=1, limit=None):
+        """(query, point) index pairs for the cells within `rings` cells of each query.
+
+        Like candidates() the points are unfiltered, but all queries are
+        expanded at once without a Python loop. `rings` and `limit` may be
+        per query; with `limit`, at most that many points (the first by
+        index) are taken from each cell.
+        """
+        if not len(qx) or not len(self.x):
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        gx, gy = self._query_cells(qx, qy)
+        rings = np.broadcast_to(np.asarray(rings, dtype=np.int64), gx.shape)
+
+        # Each query's box clipped to the grid, enumerated cell by cell
+        cx0 = np.maximum(gx - rings, 0)
+        cy0 = np.maximum(gy - rings, 0)
+        ncx = np.maximum(np.minimum(gx + rings, self.cols - 1) - cx0 + 1, 0)
+        ncy = np.maximum(np.minimum(gy + rings, self.rows - 1) - cy0 + 1, 0)
+        span = ncx * ncy
+        query = np.repeat(np.arange(len(gx)), span)
+        k = np.arange(int(span.sum())) - np.repeat(np.cumsum(span) - span, span)
+        cell = (cy0[query] + k // ncx[query]) * self.cols + cx0[query] + k % ncx[query]
+
+        first = self.starts[cell]
+        counts = self.starts[cell + 1] - first
+        if limit is not None:
+            counts = np.minimum(counts, np.broadcast_to(limit, gx.shape)[query])
+        query = np.repeat(query, counts)
+        k = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        return query, self.order[np.repeat(first, counts) + k]
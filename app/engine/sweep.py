@@ -0,0 +1,442 @@
+"""
+Parameter sweeps over headless colonies.
+
+Every configuration is run as an independent, seeded colony in a worker
+process. A feeder drops random food at a fixed interval in place of the
+player's clicks, and a run stops as soon as its score rate (points per
+simulated minute) has converged. Results are kept column by column and
+saved as one compressed .npz file, which summarize() turns into per-parameter
+tables.
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import constants as C
+from .colony import Colony
+from .ensemble import Ensemble
+
+# Parameters passed straight to Colony
+COLONY_PARAMETERS = {
+    'scouts': int,
+    'workers': int,
+    'scout_ratio': float,
+    'predator_spawn_interval': float,
+    'max_predators': int,
+}
+
+# Per-type parameters: prefix -> (names, default values, Colony argument)
+TABLE_PARAMETERS = {
+    'needed_': (C.FOOD_TYPES, C.FOOD_ANTS_NEEDED, 'food_ants_needed'),
+    'weight_': (C.PREDATOR_TYPES, np.ones(len(C.PREDATOR_TYPES)), 'predator_weights'),
+    'speed_': (C.WEATHER_TYPES, C.ANT_SPEED_WEATHER, 'ANT_SPEED_WEATHER'),
+    'decay_': (C.WEATHER_TYPES, C.FOOD_DECAY_WEATHER, 'FOOD_DECAY_WEATHER'),
+}
+MULTIPLIER_TABLES = ('ANT_SPEED_WEATHER', 'FOOD_DECAY_WEATHER')
+
+# Result columns recorded for every run (parameters are added after these)
+RESULT_COLUMNS = ('run', 'seed', 'ticks', 'seconds', 'score', 'score_rate', 'converged',
+                  'extinct', 'ants', 'kills', 'wall_time')
+
+# Colony arguments stacked per colony when a batch runs as one Ensemble
+ENSEMBLE_DEFAULTS = {
+    'scouts': C.INITIAL_SCOUTS,
+    'workers': C.INITIAL_WORKERS,
+    'scout_ratio': C.SCOUT_RATIO,
+    'food_ants_needed': C.FOOD_ANTS_NEEDED,
+    'predator_spawn_interval': C.PREDATOR_SPAWN_INTERVAL,
+    'max_predators': C.MAX_PREDATORS,
+    'predator_weights': np.ones(len(C.PREDATOR_TYPES)),
+}
+
+# Result columns compared by parity(), and the difference (in standard errors) that fails it
+PARITY_METRICS = ('score_rate', 'ants', 'kills')
+PARITY_LIMIT = 3.0
+
+DEFAULT_OPTIONS = {
+    'max_seconds': 600.0,   # Simulated time limit per run
+    'min_seconds': 120.0,   # Never stop before this
+    'window': 20.0,         # Seconds between score-rate samples
+    'patience': 3,          # Samples that must agree before stopping
+    'tolerance': 0.05,      # Relative score-rate change counted as converged
+    'food_interval': 5.0,   # Seconds between food drops
+    'max_food': 6,          # Food items on the ground at once
+}
+
+
+def parameter_names():
+    """Every parameter name a sweep accepts."""
+    names = list(COLONY_PARAMETERS)
+    for prefix, (types, _, _) in TABLE_PARAMETERS.items():
+        names.extend(prefix + name for name in types)
+    return names
+
+
+def is_integer(name):
+    """Whether a parameter only takes whole numbers."""
+    return COLONY_PARAMETERS.get(name) is int or name.startswith('needed_')
+
+
+def colony_kwargs(params):
+    """Translate a flat parameter dict into Colony keyword arguments."""
+    kwargs = {}
+    tables = {}
+    for name, value in params.items():
+        if name in COLONY_PARAMETERS:
+            kwargs[name] = COLONY_PARAMETERS[name](value)
+            continue
+        for prefix, (types, defaults, argument) in TABLE_PARAMETERS.items():
+            if name.startswith(prefix) and name[len(prefix):] in types:
+                table = tables.setdefault(argument, np.array(defaults, dtype=np.float64))
+                table[types.index(name[len(prefix):])] = value
+                break
+        else:
+            raise ValueError(f"Unknown sweep parameter: {name}")
+
+    multipliers = {name: tables.pop(name) for name in MULTIPLIER_TABLES if name in tables}
+    if multipliers:
+        kwargs['multipliers'] = multipliers
+    if 'food_ants_needed' in tables:
+        kwargs['food_ants_needed'] = np.maximum(1, np.round(tables.pop('food_ants_needed')))
+    kwargs.update(tables)
+    return kwargs
+
+
+def ensemble_kwargs(kwargs_list):
+    """Stack per-configuration Colony arguments into Ensemble arguments."""
+    stacked = {name: np.array([kwargs.get(name, default) for kwargs in kwargs_list])
+               for name, default in ENSEMBLE_DEFAULTS.items()}
+    stacked['multipliers'] = [kwargs.get('multipliers') for kwargs in kwargs_list]
+    return stacked
+
+
+def grid(space):
+    """All combinations of {name: [values]}."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_configs(space, samples, seed=None):
+    """`samples` configurations drawn uniformly from {name: (low, high)}.
+
+    Integer parameters are drawn from the inclusive integer range.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, (low, high) in space.items():
+        if is_integer(name):
+            columns[name] = rng.integers(int(low), int(high) + 1, samples).tolist()
+        else:
+            columns[name] = rng.uniform(low, high, samples).tolist()
+    return [{name: columns[name][i] for name in space} for i in range(samples)]
+
+
+def drop_food(colony, rng, max_food):
+    """Feeder: place one random food item if there is room."""
+    if colony.food_count >= max_food:
+        return
+    margin = 20
+    x = rng.uniform(margin, colony.width - margin)
+    y = rng.uniform(margin, colony.height - C.QUEEN_OFFSET - margin)
+    colony.place_food(x, y, C.FOOD_TYPES[int(rng.integers(len(C.FOOD_TYPES)))])
+
+
+def run_config(job):
+    """Run one configuration until its score rate converges; return its row."""
+    run_id, params, seed, options = job
+    options = {**DEFAULT_OPTIONS, **options}
+    started = time.perf_counter()
+
+    colony = Colony(seed=seed, **colony_kwargs(params))
+    feeder = np.random.default_rng([seed, 1])  # Independent of the colony's stream
+    dt = C.FRAME_INTERVAL_MS / 1000
+    ticks_per_window = max(1, int(round(options['window'] / dt)))
+    ticks_per_drop = max(1, int(round(options['food_interval'] / dt)))
+    max_ticks = int(options['max_seconds'] / dt)
+    min_ticks = int(options['min_seconds'] / dt)
+
+    rates = []
+    converged = extinct = False
+    tick = 0
+    while tick < max_ticks:
+        if tick % ticks_per_drop == 0:
+            drop_food(colony, feeder, options['max_food'])
+        colony.step(C.FRAME_INTERVAL_MS)
+        tick += 1
+
+        if tick % ticks_per_window:
+            continue
+        if colony.ant_count == 0:
+            extinct = True
+            break
+        rates.append(colony.score / (tick * dt) * 60)
+        recent = rates[-(options['patience'] + 1):]
+        if tick >= min_ticks and len(recent) > options['patience']:
+            scale = max(abs(recent[-1]), 1e-9)
+            if max(recent) - min(recent) <= options['tolerance'] * scale:
+                converged = True
+                break
+
+    seconds = tick * dt
+    row = {
+        'run': run_id,
+        'seed': seed,
+        'ticks': tick,
+        'seconds': seconds,
+        'score': colony.score,
+        'score_rate': colony.score / seconds * 60 if seconds else 0.0,
+        'converged': converged,
+        'extinct': extinct,
+        'ants': colony.ant_count,
+        'kills': colony.kills,
+        'wall_time': time.perf_counter() - started,
+    }
+    row.update(params)
+    return row
+
+
+def run_batch(jobs):
+    """Run a batch of jobs as one Ensemble; return a row per job.
+
+    Same stopping rule as run_config, applied per colony. The batch keeps
+    stepping until its last colony stops. Each colony gets the terrain and
+    weather of its seed, and the same feeder drops as a single run.
+    """
+    options = {**DEFAULT_OPTIONS, **jobs[0][3]}
+    started = time.perf_counter()
+    seeds = [seed for _, _, seed, _ in jobs]
+    ensemble = Ensemble(len(jobs), seed=seeds,
+                        **ensemble_kwargs([colony_kwargs(params) for _, params, _, _ in jobs]))
+    feeders = [np.random.default_rng([seed, 1]) for seed in seeds]
+    dt = C.FRAME_INTERVAL_MS / 1000
+    ticks_per_window = max(1, int(round(options['window'] / dt)))
+    ticks_per_drop = max(1, int(round(options['food_interval'] / dt)))
+    max_ticks = int(options['max_seconds'] / dt)
+    min_ticks = int(options['min_seconds'] / dt)
+    margin = 20
+
+    k = len(jobs)
+    running = np.ones(k, dtype=bool)
+    converged = np.zeros(k, dtype=bool)
+    extinct = np.zeros(k, dtype=bool)
+    ticks = np.zeros(k, dtype=np.int64)
+    score, ants, kills = np.zeros(k, dtype=np.int64), np.zeros(k, dtype=np.int64), np.zeros(k, dtype=np.int64)
+
+    def finish(done, tick):
+        ticks[done] = tick
+        score[done] = ensemble.score[done]
+        ants[done] = ensemble.ant_count[done]
+        kills[done] = ensemble.kills[done]
+
+    rates = []
+    tick = 0
+    while tick < max_ticks and running.any():
+        if tick % ticks_per_drop == 0:
+            room = np.flatnonzero(running & (ensemble.food_count < options['max_food']))
+            if len(room):
+                drops = [(feeders[b].uniform(margin, ensemble.width - margin),
+                          feeders[b].uniform(margin, ensemble.height - C.QUEEN_OFFSET - margin),
+                          C.FOOD_TYPES[int(feeders[b].integers(len(C.FOOD_TYPES)))]) for b in room]
+                x, y, types = zip(*drops)
+                ensemble.place_food(room, x, y, list(types))
+        ensemble.step(C.FRAME_INTERVAL_MS)
+        tick += 1
+
+        if tick % ticks_per_window:
+            continue
+        dead = running & (ensemble.ant_count == 0)
+        rates.append(ensemble.score / (tick * dt) * 60)
+        settled = np.zeros(k, dtype=bool)
+        if tick >= min_ticks and len(rates) > options['patience']:
+            recent = np.array(rates[-(options['patience'] + 1):])
+            scale = np.maximum(np.abs(recent[-1]), 1e-9)
+            settled = running & ~dead & (recent.max(axis=0) - recent.min(axis=0) <= options['tolerance'] * scale)
+        extinct |= dead
+        converged |= settled
+        finish(dead | settled, tick)
+        running &= ~(dead | settled)
+    finish(running, tick)
+
+    wall_time = (time.perf_counter() - started) / k
+    rows = []
+    for b, (run_id, params, seed, _) in enumerate(jobs):
+        seconds = ticks[b] * dt
+        row = {
+            'run': run_id,
+            'seed': seed,
+            'ticks': int(ticks[b]),
+            'seconds': seconds,
+            'score': int(score[b]),
+            'score_rate': score[b] / seconds * 60 if seconds else 0.0,
+            'converged': bool(converged[b]),
+            'extinct': bool(extinct[b]),
+            'ants': int(ants[b]),
+            'kills': int(kills[b]),
+            'wall_time': wall_time,
+        }
+        row.update(params)
+        rows.append(row)
+    return rows
+
+
+def run_sweep(configs, seeds=1, workers=None, options=None, base_seed=0, progress=None, ensemble=0):
+    """Run every configuration `seeds` times across a process pool.
+
+    With `ensemble` > 0, runs are grouped into batches of that many colonies
+    and each batch is advanced as one Ensemble. Returns the results as
+    columns ({name: array}). `progress(done, total)` is called as runs
+    complete.
+    """
+    options = options or {}
+    jobs = []
+    for params in configs:
+        for replicate in range(seeds):
+            jobs.append((len(jobs), params, base_seed + replicate, options))
+    workers = workers or os.cpu_count() or 1
+
+    if ensemble > 0:
+        tasks = [jobs[start:start + ensemble] for start in range(0, len(jobs), ensemble)]
+        run, chunksize = run_batch, 1
+    else:
+        tasks = jobs
+        run, chunksize = run_config, max(1, len(jobs) // (workers * 8))
+
+    rows = []
+    if workers == 1:
+        results = map(run, tasks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(run, tasks, chunksize=chunksize)
+    try:
+        for result in results:
+            rows.extend(result if ensemble > 0 else [result])
+            if progress is not None:
+                progress(len(rows), len(jobs))
+    finally:
+        if workers != 1:
+            executor.shutdown(cancel_futures=True)
+    return to_columns(rows)
+
+
+def parity(configs, seeds, ensemble, workers=None, options=None, base_seed=0, progress=None):
+    """Run the same configurations one colony at a time and as ensembles, and compare.
+
+    An ensemble draws movement jitter and predator rolls from one shared
+    stream, so its runs are not replays of the single runs; what has to
+    agree is each configuration's results over its seeds. For every metric
+    the two means are compared in standard errors of their difference (z),
+    per configuration and over all runs. Returns {metric: {single, ensemble,
+    z, configs: [(config, single mean, ensemble mean, z), ...]}}.
+    """
+    single = run_sweep(configs, seeds, workers, options, base_seed, progress)
+    batched = run_sweep(configs, seeds, workers, options, base_seed, progress, ensemble=ensemble)
+    config = single['run'] // seeds  # Runs are numbered configuration by configuration
+
+    def compare(a, b):
+        se = np.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b)) if len(a) > 1 else 0.0
+        diff = b.mean() - a.mean()
+        return float(a.mean()), float(b.mean()), float(diff / se) if se > 0 else (0.0 if diff == 0 else np.inf)
+
+    report = {}
+    for metric in PARITY_METRICS:
+        a, b = single[metric].astype(np.float64), batched[metric].astype(np.float64)
+        mean_single, mean_ensemble, z = compare(a, b)
+        report[metric] = {
+            'single': mean_single,
+            'ensemble': mean_ensemble,
+            'z': z,
+            'configs': [(c,) + compare(a[config == c], b[config == c]) for c in range(len(configs))],
+        }
+    return report
+
+
+def format_parity(report, limit=PARITY_LIMIT):
+    """Text table of parity()'s results, marking differences over `limit` standard errors."""
+    lines = [f"  {'metric':<12} {'single':>9} {'ensemble':>9} {'z':>7}  configs over {limit:g} SE"]
+    for metric, result in report.items():
+        over = sum(abs(z) > limit for _, _, _, z in result['configs'])
+        lines.append(f"  {metric:<12} {result['single']:>9.3f} {result['ensemble']:>9.3f} {result['z']:>7.2f}  "
+                     f"{over}/{len(result['configs'])}")
+    return "\n".join(lines)
+
+
+def to_columns(rows):
+    """Convert result rows to columns; missing parameters become NaN."""
+    names = list(RESULT_COLUMNS)
+    for row in rows:
+        names.extend(name for name in row if name not in names)
+    columns = {}
+    for name in names:
+        values = [row.get(name, np.nan) for row in rows]
+        columns[name] = np.asarray(values)
+    return columns
+
+
+def save_results(path, columns):
+    """Write result columns to one compressed .npz file."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    np.savez_compressed(path, **columns)
+
+
+def load_results(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def summarize(columns, by, metric='score_rate', bins=5):
+    """Per-value table of `metric` for one parameter.
+
+    Parameters with more than `bins` distinct values (random sweeps) are
+    grouped into quantile bins. Returns rows of
+    (label, runs, mean, std, min, max, converged fraction).
+    """
+    values = columns[by].astype(np.float64)
+    target = columns[metric].astype(np.float64)
+    present = ~np.isnan(values)
+    values, target = values[present], target[present]
+    converged = columns['converged'][present].astype(np.float64)
+    if not len(values):
+        return []
+
+    unique = np.unique(values)
+    if len(unique) <= bins:
+        groups = np.searchsorted(unique, values)
+        labels = [f"{value:g}" for value in unique]
+    else:
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)))
+        groups = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+        labels = [f"{edges[i]:.3g}-{edges[i + 1]:.3g}" for i in range(len(edges) - 1)]
+
+    n = len(labels)
+    counts = np.bincount(groups, minlength=n)
+    sums = np.bincount(groups, weights=target, minlength=n)
+    squares = np.bincount(groups, weights=target * target, minlength=n)
+    done = np.bincount(groups, weights=converged, minlength=n)
+    table = []
+    for i in range(n):
+        if not counts[i]:
+            continue
+        mean = sums[i] / counts[i]
+        std = np.sqrt(max(squares[i] / counts[i] - mean * mean, 0.0))
+        in_group = target[groups == i]
+        table.append((labels[i], int(counts[i]), mean, std, in_group.min(), in_group.max(),
+                      done[i] / counts[i]))
+    return table
+
+
+def format_summary(columns, metric='score_rate', bins=5):
+    """Text tables of `metric` for every swept parameter."""
+    known = set(RESULT_COLUMNS)
+    lines = []
+    for name in columns:
+        if name in known:
+            continue
+        lines.append(f"\n{name}")
+        lines.append(f"  {'value':>15} {'runs':>6} {'mean':>9} {'std':>8} {'min':>8} {'max':>8} {'conv':>5}")
+        for label, runs, mean, std, low, high, conv in summarize(columns, name, metric, bins):
+            lines.append(f"  {label:>15} {runs:>6} {mean:>9.2f} {std:>8.2f} {low:>8.2f} {high:>8.2f} {conv:>5.0%}")
+    return "\n".join(lines)
@@ -0,0 +1,98 @@
+"""
+Hierarchical timer wheel for countdown events.
+
+updateFoodDecay in modules/food.js decrements every item's decayTimer each
+frame. Here a countdown is turned into the tick it expires on, and that
+tick is filed in a timer wheel. Level 0 has one bucket per tick for the
+next `slots` ticks. Each level above covers `slots` times as much time per
+bucket, and its buckets are split into the level below when time reaches
+them. Advancing one tick touches only the bucket for that tick, so the
+cost follows the number of timers that fire rather than the number that
+are pending.
+
+Entries are (id, due tick) pairs, stored as array chunks so that whole
+batches are scheduled at once. Nothing is removed on cancel: the owner
+checks fired ids against its own due ticks and ignores stale ones.
+"""
+
+import numpy as np
+
+WHEEL_BITS = 8   # 256 buckets per level
+WHEEL_LEVELS = 4  # Levels cover 2**32 ticks; anything later waits in overflow
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+class TimerWheel:
+    """Ids filed by the tick they are due on."""
+
+    def __init__(self, now=0, bits=WHEEL_BITS, levels=WHEEL_LEVELS):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.levels = levels
+        self.now = int(now)  # Next tick to be processed
+        self.buckets = [[[] for _ in range(1 << bits)] for _ in range(levels)]
+        self.overflow = []
+        self.pending = 0  # Entries filed, including stale ones
+
+    def schedule(self, ids, due):
+        """File ids under their due ticks (ticks already past fire on the next advance)."""
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        due = np.maximum(np.asarray(due, dtype=np.int64).ravel(), self.now)
+        if not len(ids):
+            return
+        self.pending += len(ids)
+
+        # Lowest level whose higher-order digits agree with now
+        level = np.full(len(ids), self.levels, dtype=np.int64)
+        for lvl in range(self.levels - 1, -1, -1):
+            shift = self.bits * (lvl + 1)
+            level[(due >> shift) == (self.now >> shift)] = lvl
+        far = level == self.levels
+        if far.any():
+            self.overflow.append((ids[far], due[far]))
+            ids, due, level = ids[~far], due[~far], level[~far]
+            if not len(ids):
+                return
+
+        bucket = (due >> (self.bits * level)) & self.mask
+        key = level * (self.mask + 1) + bucket
+        order = np.argsort(key, kind="stable")
+        ids, due, key = ids[order], due[order], key[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        for start, stop in zip(starts, np.r_[starts[1:], len(key)]):
+            lvl, b = divmod(int(key[start]), self.mask + 1)
+            self.buckets[lvl][b].append((ids[start:stop], due[start:stop]))
+
+    def _take(self, chunks):
+        if not chunks:
+            return _EMPTY, _EMPTY
+        ids = np.concatenate([c[0] for c in chunks])
+        due = np.concatenate([c[1] for c in chunks])
+        chunks.clear()
+        self.pending -= len(ids)
+        return ids, due
+
+    def advance(self, tick):
+        """Process every tick up to and including `tick`; return the ids that fired, in due order."""
+        fired = []
+        while self.now <= tick:
+            t = self.now
+            # Overflow, then higher levels, are split down as time reaches them
+            if t and t & ((1 << (self.bits * self.levels)) - 1) == 0:
+                self.schedule(*self._take(self.overflow))
+            for lvl in range(self.levels - 1, 0, -1):
+                if t & ((1 << (self.bits * lvl)) - 1) == 0:
+                    self.schedule(*self._take(self.buckets[lvl][(t >> (self.bits * lvl)) & self.mask]))
+            ids, _ = self._take(self.buckets[0][t & self.mask])
+            if len(ids):
+                fired.append(ids)
+            self.now = t + 1
+        return np.concatenate(fired) if fired else _EMPTY
+
+    def clear(self):
+        for level in self.buckets:
+            for chunks in level:
+                chunks.clear()
+        self.overflow.clear()
+        self.pending = 0
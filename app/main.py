@@ -1,14 +1,30 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+import asyncio
 import json
 import os
+import uuid
 from datetime import datetime
 
-app = FastAPI(title="Ant Hole Simulation")
+from app.assets import AssetManifest, PrecompressedStaticFiles
+from app import downsample, metrics, monitoring, telemetry
+from app.colonies import registry
+from app.engine import RenderCache, TrajectoryReader, recorder
+from app.pages import PageCache
+from app.sprites import SCALES, SpriteAtlas
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop all colony tick loops on shutdown
+    await registry.shutdown()
+
+app = FastAPI(title="Ant Hole Simulation", lifespan=lifespan)
 
 # Mount static files directory
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -16,90 +32,192 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 # Mount images directory
 app.mount("/img", StaticFiles(directory="img"), name="images")
 
+# Mount fingerprinted, precompressed build output (python build_assets.py)
+app.mount("/dist", PrecompressedStaticFiles(directory="app/dist", check_dir=False), name="dist")
+
 # Set up Jinja2 templates
 templates = Jinja2Templates(directory="app/templates")
 
+# Templates resolve asset URLs through the build manifest
+asset = AssetManifest("app/dist/manifest.json")
+templates.env.globals["asset"] = asset
+
+# Pages without per-request context are rendered once and served with ETags
+pages = PageCache(templates, "app/templates", dependencies=[asset.path])
+
+# Rendered colony images, keyed by colony tick
+render_cache = RenderCache()
+
+# Per-session debug logs, stored as deltas between reports
+debug_sessions = telemetry.SessionStore("logs")
+
+# Streaming frame time / memory anomaly detection per debug session
+debug_monitor = monitoring.TelemetryMonitor()
+
+# Downsampling pyramids of each log's fps/frameTime series, for the debug viewer charts
+log_series = downsample.SeriesCache(telemetry.read_series)
+
+# Rolling aggregates pushed to /dashboard (in memory, never read from the logs)
+dashboard = metrics.Dashboard(registry, debug_monitor)
+
+# Packed sprite atlas, built on first request
+sprite_atlas = None
+
 # Create logs directory if it doesn't exist
 os.makedirs("logs", exist_ok=True)
 
-# Debug log model
-class DebugLogEntry(BaseModel):
-    timestamp: int
-    metrics: Dict[str, Any]
-    longFrames: List[Dict[str, Any]]
-    errors: List[Dict[str, Any]]
-    warnings: List[Dict[str, Any]]
-    functionTimings: Dict[str, Any]
+# Colony creation model
+class ColonyConfig(BaseModel):
+    seed: Optional[int] = None
+    width: float = 800
+    height: float = 600
+    scouts: int = 3
+    workers: int = 7
+    record: bool = False
+    record_every: int = 1
+
+# Batch of edit commands for a colony (see app/engine/commands.py)
+class CommandBatch(BaseModel):
+    key: Optional[str] = None
+    commands: List[Dict[str, Any]]
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
-    return templates.TemplateResponse("new_index.html", {"request": request})
+    return pages.response(request, "new_index.html")
 
 @app.get("/debug", response_class=HTMLResponse)
 async def debug_mode(request: Request):
-    return templates.TemplateResponse("debug_launcher.html", {"request": request})
+    return pages.response(request, "debug_launcher.html")
 
 @app.get("/simple-debug", response_class=HTMLResponse)
 async def simple_debug_mode(request: Request):
-    return templates.TemplateResponse("simple_debug.html", {"request": request})
+    return pages.response(request, "simple_debug.html")
 
 @app.get("/standalone", response_class=HTMLResponse)
 async def standalone_debug_mode(request: Request):
-    return templates.TemplateResponse("standalone_debug.html", {"request": request})
+    return pages.response(request, "standalone_debug.html")
 
 @app.get("/fixed", response_class=HTMLResponse)
 async def fixed_debug_mode(request: Request):
-    return templates.TemplateResponse("standalone_debug_fixed.html", {"request": request})
+    return pages.response(request, "standalone_debug_fixed.html")
 
 @app.get("/performance", response_class=HTMLResponse)
 async def performance_test(request: Request):
-    return templates.TemplateResponse("performance_test.html", {"request": request})
+    return pages.response(request, "performance_test.html")
 
 @app.get("/performance-index", response_class=HTMLResponse)
 async def performance_index(request: Request):
-    return templates.TemplateResponse("performance_index.html", {"request": request})
+    return pages.response(request, "performance_index.html")
+
+@app.get("/dashboard", response_class=HTMLResponse)
+async def dashboard_page(request: Request):
+    return pages.response(request, "dashboard.html")
+
+@app.get("/api/dashboard/stream")
+async def dashboard_stream(request: Request):
+    # Server-Sent Events: rolling 1s/10s/1m aggregates once a second
+    return StreamingResponse(dashboard.events(request), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/dashboard/history")
+async def dashboard_history(resolution: str = "1m"):
+    # One summary per bucket of a ring: the last minute, 10 minutes or hour
+    if resolution not in metrics.LEVELS:
+        return JSONResponse(content={"error": f"resolution must be one of {', '.join(metrics.LEVELS)}"},
+                            status_code=400)
+    return JSONResponse(content=dashboard.history(metrics.LEVELS[resolution]))
 
 @app.get("/api/debug-log", response_class=HTMLResponse)
 async def simple_debug_index(request: Request):
-    return templates.TemplateResponse("simple_debug_index.html", {"request": request})
+    return pages.response(request, "simple_debug_index.html")
+
+def list_log_files():
+    """List log files, most recent first."""
+    log_files = []
+    if os.path.exists("logs"):
+        log_files = [f for f in os.listdir("logs") if f.endswith((".json", ".jsonl"))]
+        log_files.sort(reverse=True)  # Most recent first
+    return log_files
+
+def write_log_file(filename, data):
+    """Write a log entry as indented JSON."""
+    with open(filename, "wb") as f:
+        f.write(telemetry.dumps(data))
+
+def read_log_chart(file_path, points, start, end):
+    """A log with its fps/frameTime series downsampled to `points` between `start` and `end`."""
+    if file_path.endswith(".jsonl"):
+        data = telemetry.read_session(file_path)
+    else:
+        with open(file_path, "rb") as f:
+            data = json.loads(f.read())
+    series, info = log_series.query(file_path, points, start, end)
+    data["metrics"] = dict(data.get("metrics") or {}, **series)
+    data["series"] = info
+    data.pop("intervals", None)  # Grows with the session; the plain request still returns it
+    return data
 
 @app.post("/api/debug-log")
-async def save_debug_log(log_entry: DebugLogEntry):
+async def save_debug_log(request: Request):
+    # JSON, msgpack or CBOR, optionally gzip-compressed (see app/telemetry.py)
+    body = await request.body()
+    try:
+        log_entry = telemetry.decode_entry(body, request.headers.get("content-type"),
+                                           request.headers.get("content-encoding"))
+    except telemetry.UnsupportedPayload as e:
+        return JSONResponse(content={"error": str(e), "accepted": telemetry.media_types()}, status_code=415)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    dashboard.ingest.add(len(body))
+
+    # Reports from a session are appended to its file as deltas
+    if "session" in log_entry:
+        session = log_entry.pop("session")
+        alerts = debug_monitor.observe(session, log_entry)
+        fps = debug_monitor.sessions[session].fps.value
+        if fps is not None:
+            dashboard.client_fps.add(fps)
+        filename = await asyncio.to_thread(debug_sessions.append, session, log_entry)
+        return JSONResponse(content={"status": "success", "filename": filename, "alerts": alerts})
+
     # Create a filename with timestamp
-    timestamp = datetime.fromtimestamp(log_entry.timestamp / 1000)
+    timestamp = datetime.fromtimestamp(log_entry["timestamp"] / 1000)
     filename = f"logs/debug_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
 
-    # Save the log to a file
-    with open(filename, "w") as f:
-        json.dump(log_entry.model_dump(), f, indent=2)
+    # Save the log to a file without blocking the event loop
+    await asyncio.to_thread(write_log_file, filename, log_entry)
 
     return JSONResponse(content={"status": "success", "filename": filename})
 
 @app.get("/debug-viewer", response_class=HTMLResponse)
 async def debug_viewer(request: Request):
     # Get list of log files
-    log_files = []
-    if os.path.exists("logs"):
-        log_files = [f for f in os.listdir("logs") if f.endswith(".json")]
-        log_files.sort(reverse=True)  # Most recent first
+    log_files = await asyncio.to_thread(list_log_files)
 
-    return templates.TemplateResponse("debug_viewer.html", {
-        "request": request,
+    return templates.TemplateResponse(request, "debug_viewer.html", {
         "log_files": log_files
     })
 
 @app.get("/api/debug-logs")
 async def get_debug_logs():
     # Get list of log files
-    log_files = []
-    if os.path.exists("logs"):
-        log_files = [f for f in os.listdir("logs") if f.endswith(".json")]
-        log_files.sort(reverse=True)  # Most recent first
+    log_files = await asyncio.to_thread(list_log_files)
 
     return JSONResponse(content={"log_files": log_files})
 
+@app.get("/api/debug-alerts")
+async def get_debug_alerts():
+    # Alerts raised by sessions that are still reporting
+    return JSONResponse(content={"alerts": debug_monitor.alerts()})
+
+@app.get("/api/debug-sessions")
+async def get_debug_sessions():
+    # Streaming frame time, FPS, long frame and memory summaries per session
+    return JSONResponse(content=debug_monitor.to_dict())
+
 @app.get("/api/debug-log/{filename}")
-async def get_debug_log(filename: str):
+async def get_debug_log(filename: str, points: Optional[int] = None,
+                        start: Optional[int] = Query(None, alias="from"), end: Optional[int] = Query(None, alias="to")):
     # Validate filename to prevent directory traversal
     if ".." in filename or "/" in filename or "\\" in filename:
         return JSONResponse(content={"error": "Invalid filename"}, status_code=400)
@@ -109,11 +227,172 @@ async def get_debug_log(filename: str):
     if not os.path.exists(file_path):
         return JSONResponse(content={"error": "File not found"}, status_code=404)
 
-    # Read and return the log file
-    with open(file_path, "r") as f:
-        log_data = json.load(f)
+    # Chart series downsampled with LTTB, optionally to a time range (see app/downsample.py)
+    if points is not None or start is not None or end is not None:
+        points = downsample.DEFAULT_POINTS if points is None else points
+        if not 3 <= points <= downsample.MAX_POINTS:
+            return JSONResponse(content={"error": f"points must be between 3 and {downsample.MAX_POINTS}"},
+                                status_code=400)
+        try:
+            return JSONResponse(content=await asyncio.to_thread(read_log_chart, file_path, points, start, end))
+        except ValueError as e:
+            return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    # Session logs are rebuilt into cumulative and per-window timings
+    if filename.endswith(".jsonl"):
+        return JSONResponse(content=await asyncio.to_thread(telemetry.read_session, file_path))
+
+    # Stream the log file from disk in chunks (read in a worker thread)
+    return FileResponse(file_path, media_type="application/json")
+
+@app.post("/api/colonies")
+async def create_colony(config: ColonyConfig):
+    runner = registry.create(**config.model_dump())
+    return JSONResponse(content=runner.to_dict())
+
+@app.get("/api/colonies")
+async def list_colonies():
+    return JSONResponse(content={"colonies": [runner.to_dict() for runner in registry.runners.values()]})
+
+@app.get("/api/colonies/{colony_id}")
+async def get_colony(colony_id: str):
+    runner = registry.get(colony_id)
+    if runner is None:
+        return JSONResponse(content={"error": "Colony not found"}, status_code=404)
+    return JSONResponse(content=runner.to_dict())
+
+@app.post("/api/colonies/{colony_id}/commands")
+async def colony_commands(colony_id: str, batch: CommandBatch, wait: bool = False):
+    runner = registry.get(colony_id)
+    if runner is None:
+        return JSONResponse(content={"error": "Colony not found"}, status_code=404)
+    try:
+        status, applied = runner.submit(batch.commands, batch.key)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    # Without wait the batch is acknowledged as soon as it is queued
+    if wait:
+        status = await asyncio.shield(applied)
+    return JSONResponse(content=status, status_code=200 if status["status"] != "queued" else 202)
+
+@app.get("/api/colonies/{colony_id}/quality")
+async def colony_quality(colony_id: str):
+    runner = registry.get(colony_id)
+    if runner is None:
+        return JSONResponse(content={"error": "Colony not found"}, status_code=404)
+    return JSONResponse(content=runner.quality_dict())
+
+@app.get("/api/colonies/{colony_id}/clients")
+async def colony_clients(colony_id: str):
+    runner = registry.get(colony_id)
+    if runner is None:
+        return JSONResponse(content={"error": "Colony not found"}, status_code=404)
+    return JSONResponse(content=runner.streams_dict())
+
+def render_snapshot(state, colony_id, **params):
+    """PNG of the state's front snapshot and the tick it shows."""
+    with state.read() as snapshot:
+        return render_cache.render(colony_id, snapshot, **params), snapshot.tick
+
+@app.get("/api/colonies/{colony_id}/render.png")
+async def render_colony(colony_id: str, width: int = 256, height: Optional[int] = None,
+                        zoom: float = 1.0, x: Optional[float] = None, y: Optional[float] = None,
+                        layers: str = "terrain,ants,food,predators"):
+    runner = registry.get(colony_id)
+    if runner is None:
+        return JSONResponse(content={"error": "Colony not found"}, status_code=404)
+
+    # Rendered from a published snapshot in a worker thread, so the colony keeps ticking meanwhile
+    png, tick = await asyncio.to_thread(render_snapshot, runner.publish_state(), colony_id, width=width,
+                                        height=height, zoom=zoom, x=x, y=y, layers=layers.split(","))
+    return Response(content=png, media_type="image/png", headers={"X-Colony-Tick": str(tick)})
+
+def read_trajectory(path, meta, start, stop, ant):
+    """One page of a recording's rows, with the start tick of the next page (None on the last)."""
+    reader = TrajectoryReader(path, meta)
+    next_start = reader.page_stop(start, stop, recorder.PAGE_ROWS)
+    if next_start is not None:
+        stop = next_start
+    rows = reader.ant(ant, start, stop) if ant is not None else reader.range(start, stop)
+    return dict(rows.to_dict(), next=next_start)
+
+@app.get("/api/colonies/{colony_id}/trajectory")
+async def colony_trajectory(colony_id: str, start: Optional[int] = None, stop: Optional[int] = None,
+                            ant: Optional[int] = None):
+    runner = registry.get(colony_id)
+    if runner is None:
+        return JSONResponse(content={"error": "Colony not found"}, status_code=404)
+    if runner.recorder is None:
+        return JSONResponse(content={"error": "Colony is not being recorded"}, status_code=404)
+
+    # The recorder's counts are taken between ticks; the rows they cover are read and
+    # serialized in a worker thread, at most one page (recorder.PAGE_ROWS rows) per request
+    content = await asyncio.to_thread(read_trajectory, runner.recorder.path, runner.recorder.meta(),
+                                      start, stop, ant)
+    return JSONResponse(content=content)
+
+def get_sprite_atlas():
+    global sprite_atlas
+    if sprite_atlas is None:
+        sprite_atlas = SpriteAtlas()
+    return sprite_atlas
+
+def sprite_response(request, content, media_type, version):
+    etag = f'"{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if PageCache.not_modified(request, etag, 0):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+@app.get("/api/sprites/atlas.json")
+async def sprite_atlas_map(request: Request):
+    atlas = get_sprite_atlas()
+    # Prefer the fingerprinted build outputs, fall back to the endpoints below
+    names = {"svg": "atlas.svg"}
+    if atlas.can_rasterize:
+        names.update({scale: f"atlas@{scale}x.png" for scale in SCALES})
+    images = {}
+    for key, name in names.items():
+        built = asset(f"/sprites/{name}")
+        images[key] = built if built.startswith("/dist/") else f"/api/sprites/{name}"
+    return sprite_response(request, atlas.to_json(images), "application/json", atlas.version)
+
+@app.get("/api/sprites/atlas.svg")
+async def sprite_atlas_svg(request: Request):
+    atlas = get_sprite_atlas()
+    return sprite_response(request, atlas.svg, "image/svg+xml", atlas.version)
+
+@app.get("/api/sprites/atlas@{scale}x.png")
+async def sprite_atlas_png(request: Request, scale: int):
+    atlas = get_sprite_atlas()
+    if scale not in SCALES:
+        return JSONResponse(content={"error": f"Scale must be one of {list(SCALES)}"}, status_code=404)
+    if not atlas.can_rasterize:
+        return JSONResponse(content={"error": "PNG atlases need cairosvg; use atlas.svg"}, status_code=503)
+    png = await asyncio.to_thread(atlas.png, scale)
+    return sprite_response(request, png, "image/png", f"{atlas.version}-{scale}")
+
+@app.websocket("/ws/colonies/{colony_id}")
+async def stream_colony(websocket: WebSocket, colony_id: str):
+    runner = registry.get(colony_id)
+    if runner is None:
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    client_id = uuid.uuid4().hex
+    runner.connect(client_id, websocket)
 
-    return JSONResponse(content=log_data)
+    # Clients start as spectators of the shared frame. They send {"type": "viewport",
+    # "x", "y", "width", "height", "zoom"} on pan/zoom and {"type": "spectate"} to go back
+    try:
+        while True:
+            runner.handle_message(client_id, await websocket.receive_json())
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        runner.disconnect(client_id)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,207 @@
+"""
+Rolling in-memory aggregates for the live dashboard.
+
+A Rollup counts values (tick times, FPS, bytes) into fixed-size buckets at
+three resolutions: 1 second, 10 seconds and 1 minute, each kept in a ring
+of 60. A value goes only into the open 1s bucket. When a bucket closes it
+is folded into the open bucket one level up, so coarser windows are
+downsampled as data arrives and never rebuilt from raw samples. Buckets
+that take quantiles carry a log-binned histogram (8 bins per octave, about
+4% error), which adds up across buckets like the counts do.
+
+Reading a window merges at most ten closed buckets. The cost of a
+dashboard update therefore depends on how many series there are, never
+on how long the server has been running, and the log files are never read.
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+RESOLUTIONS = (1, 10, 60)  # Bucket seconds per level
+LEVELS = {"1s": 0, "10s": 1, "1m": 2}
+RING = 60                  # Closed buckets kept per level
+# Windows reported to the dashboard: name -> (level, closed buckets merged)
+WINDOWS = {"1s": (0, 1), "10s": (0, 10), "1m": (1, 6)}
+QUANTILES = {"p5": 0.05, "p50": 0.5, "p95": 0.95, "p99": 0.99}
+BINS_PER_OCTAVE = 8
+LOW_OCTAVE = -10  # Smallest binned value is 2**-10; smaller ones land in bin 0
+BINS = 40 * BINS_PER_OCTAVE  # Up to 2**30
+FPS_BANDS = (15, 30, 45, 60)
+
+
+def _bin(value):
+    if value <= 0:
+        return 0
+    k = math.floor((math.log2(value) - LOW_OCTAVE) * BINS_PER_OCTAVE)
+    return min(max(k, 0), BINS - 1)
+
+
+# Representative value of each bin (geometric midpoint)
+BIN_VALUES = 2.0 ** (LOW_OCTAVE + (np.arange(BINS) + 0.5) / BINS_PER_OCTAVE)
+
+
+class Bucket:
+    """Count, sum, range and optionally a histogram of the values in one interval."""
+
+    __slots__ = ("count", "total", "low", "high", "hist")
+
+    def __init__(self, quantiles=True):
+        self.count = 0
+        self.total = 0.0
+        self.low = math.inf
+        self.high = -math.inf
+        self.hist = np.zeros(BINS, dtype=np.int64) if quantiles else None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.low = min(self.low, value)
+        self.high = max(self.high, value)
+        if self.hist is not None:
+            self.hist[_bin(value)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.low = min(self.low, other.low)
+        self.high = max(self.high, other.high)
+        if self.hist is not None:
+            self.hist += other.hist
+
+
+class Rollup:
+    """One series, rolled up into 1s, 10s and 1m ring buffers."""
+
+    def __init__(self, quantiles=True, bands=None, clock=time.monotonic):
+        self.quantiles = quantiles
+        self.bands = bands  # Band edges reported as fractions of the values
+        self.clock = clock
+        self.rings = [deque(maxlen=RING) for _ in RESOLUTIONS]  # (index, Bucket), oldest first
+        self.open = [None] * len(RESOLUTIONS)                 # (index, Bucket) being filled
+
+    def add(self, value, now=None):
+        now = self.clock() if now is None else now
+        self._advance(0, int(now // RESOLUTIONS[0])).add(value)
+
+    def _advance(self, level, index):
+        """The open bucket of `level` for bucket `index`, closing the previous one."""
+        current = self.open[level]
+        if current is not None and current[0] >= index:
+            return current[1]
+        if current is not None:
+            self.rings[level].append(current)
+            if level + 1 < len(RESOLUTIONS):
+                start = current[0] * RESOLUTIONS[level]
+                self._advance(level + 1, start // RESOLUTIONS[level + 1]).merge(current[1])
+        bucket = Bucket(self.quantiles)
+        self.open[level] = (index, bucket)
+        return bucket
+
+    def _close(self, now):
+        """Close buckets whose interval is over, even if no value arrived since."""
+        for level, seconds in enumerate(RESOLUTIONS):
+            index = int(now // seconds)
+            current = self.open[level]
+            if current is not None and current[0] < index:
+                self._advance(level, index)
+
+    def window(self, level, buckets, now=None):
+        """Merge the closed buckets of the last `buckets` intervals at `level`."""
+        now = self.clock() if now is None else now
+        self._close(now)
+        index = int(now // RESOLUTIONS[level])
+        merged = Bucket(self.quantiles)
+        for start, bucket in reversed(self.rings[level]):
+            if start < index - buckets:
+                break
+            merged.merge(bucket)
+        return merged
+
+    def summary(self, level, buckets, now=None):
+        return self._summarize(self.window(level, buckets, now), RESOLUTIONS[level] * buckets)
+
+    def _summarize(self, bucket, seconds):
+        info = {
+            "count": bucket.count,
+            "perSecond": round(bucket.count / seconds, 3),
+            "sumPerSecond": round(bucket.total / seconds, 3),
+        }
+        if not bucket.count:
+            return info
+        info.update(mean=round(bucket.total / bucket.count, 3), min=round(bucket.low, 3), max=round(bucket.high, 3))
+        if bucket.hist is not None:
+            ranks = np.cumsum(bucket.hist)
+            for name, q in QUANTILES.items():
+                k = int(np.searchsorted(ranks, q * (bucket.count - 1), side="right"))
+                info[name] = round(float(np.clip(BIN_VALUES[k], bucket.low, bucket.high)), 3)
+            if self.bands:
+                edges = [0] + [int(ranks[_bin(edge) - 1]) for edge in self.bands] + [bucket.count]
+                info["bands"] = [round((b - a) / bucket.count, 3) for a, b in zip(edges, edges[1:])]
+        return info
+
+    def summaries(self, now=None):
+        now = self.clock() if now is None else now
+        return {name: self.summary(level, buckets, now) for name, (level, buckets) in WINDOWS.items()}
+
+    def history(self, level, now=None):
+        """Summaries of each closed bucket in the level's ring, oldest first, with its age in seconds."""
+        now = self.clock() if now is None else now
+        self._close(now)
+        seconds = RESOLUTIONS[level]
+        return [dict(self._summarize(bucket, seconds), ago=round(now - start * seconds))
+                for start, bucket in self.rings[level]]
+
+
+class Dashboard:
+    """Fleet-wide rollups plus each colony's, pushed to dashboard viewers."""
+
+    def __init__(self, registry, monitor, clock=time.monotonic):
+        self.registry = registry  # ColonyRegistry: tick time and stream bytes per colony
+        self.monitor = monitor    # TelemetryMonitor: connected debug sessions
+        self.clock = clock
+        self.client_fps = Rollup(bands=FPS_BANDS, clock=clock)  # Each session's smoothed FPS per report
+        self.ingest = Rollup(quantiles=False, clock=clock)       # Bytes per debug report
+        self.cached = (None, None)  # (second, JSON) shared by every viewer
+
+    def snapshot(self, view=None):
+        """Every series summarised by `view(rollup, now)`: the dashboard windows by default."""
+        now = self.clock()
+        view = view or Rollup.summaries
+        colonies = {}
+        for colony_id, runner in self.registry.runners.items():
+            colonies[colony_id] = {
+                "tick": runner.colony.tick,
+                "clients": len(runner.streams),
+                "tickMs": view(runner.tick_ms, now),
+                "stream": view(runner.stream_bytes, now),
+            }
+        return {
+            "clients": {
+                "sessions": sum(session.active for session in self.monitor.sessions.values()),
+                "fps": view(self.client_fps, now),
+            },
+            "ingest": view(self.ingest, now),
+            "colonies": colonies,
+        }
+
+    def history(self, level):
+        """Every series' ring at one resolution, one summary per bucket."""
+        return self.snapshot(lambda rollup, now: rollup.history(level, now))
+
+    def message(self):
+        """The current snapshot as JSON, built at most once per second."""
+        second = int(self.clock())
+        if self.cached[0] != second:
+            self.cached = (second, json.dumps(self.snapshot()))
+        return self.cached[1]
+
+    async def events(self, request, interval=1.0):
+        """Server-Sent Events: one snapshot per interval until the viewer disconnects."""
+        while not await request.is_disconnected():
+            yield f"event: snapshot\ndata: {self.message()}\n\n"
+            await asyncio.sleep(interval)
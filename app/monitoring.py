@@ -0,0 +1,268 @@
+"""
+Streaming anomaly detection on debug telemetry.
+
+Freezing clients used to be found after the fact with analyze_logs.py
+--long-frames. Here every report posted with a session id updates that
+session's constant-size summaries as it arrives:
+
+- frame time goes into a DDSketch (log-spaced buckets, 1% relative error).
+  Reports are grouped into windows; when a window's p99 is well above the
+  p99 of the session's earlier windows, a frameTimeRegression alert is
+  raised. Windows that regressed are not merged into the baseline, so the
+  alert stays until frame times recover.
+- FPS is smoothed with an EWMA.
+- long frames feed a running correlation between their duration and the
+  ant count at the time.
+- memory that keeps rising without ever dropping, by a meaningful fraction,
+  raises a memoryGrowth alert; the first drop (a garbage collection) clears it.
+
+Reports repeat their most recent samples, so each summary only takes
+samples newer than the last one it has seen. Work per report is bounded by
+the number of samples in it and the sketch's bucket limit.
+"""
+
+import math
+import time
+from collections import OrderedDict
+
+MAX_SESSIONS = 1024       # Sessions tracked at once (least recently seen dropped)
+SESSION_TIMEOUT = 300     # Seconds without reports before a session's alerts are inactive
+WINDOW_REPORTS = 30       # Reports per frame time window
+MIN_BASELINE = 200        # Frame time samples needed before regressions are judged
+REGRESSION_RATIO = 1.5    # Window p99 over baseline p99 that counts as a regression
+MIN_REGRESSED_MS = 1000 / 30  # ...and only when the window's p99 misses 30 FPS
+MEMORY_STREAK = 30        # Rises in reported memory, with no drop between them, that count as growth
+MEMORY_GROWTH = 0.2       # ...and only if it grew by this fraction over them
+FPS_SMOOTHING = 0.1
+
+
+class DDSketch:
+    """Quantile sketch with bounded relative error (Masson et al., VLDB 2019)."""
+
+    def __init__(self, relative_accuracy=0.01, max_bins=512):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.bins = {}  # bucket index -> count; bucket k holds (gamma**(k-1), gamma**k]
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value, weight=1):
+        if value <= 0:
+            self.zeros += weight
+        else:
+            k = math.ceil(math.log(value) / self.log_gamma)
+            self.bins[k] = self.bins.get(k, 0) + weight
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += weight
+
+    def _collapse(self):
+        # Fold the lowest bucket into the next one; high quantiles stay exact
+        low = sorted(self.bins)[:2]
+        self.bins[low[1]] += self.bins.pop(low[0])
+
+    def merge(self, other):
+        for k, n in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + n
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+
+class Ewma:
+    """Exponentially weighted moving average."""
+
+    def __init__(self, alpha=FPS_SMOOTHING):
+        self.alpha = alpha
+        self.value = None
+
+    def add(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+
+
+class RunningCorrelation:
+    """Pearson correlation of a stream of (x, y) pairs (Welford updates)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = self.mean_y = 0.0
+        self.m2_x = self.m2_y = self.c_xy = 0.0
+
+    def add(self, x, y):
+        self.n += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.n
+        dy = y - self.mean_y
+        self.mean_y += dy / self.n
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+
+    @property
+    def value(self):
+        if self.n < 2 or self.m2_x <= 0 or self.m2_y <= 0:
+            return None
+        return self.c_xy / math.sqrt(self.m2_x * self.m2_y)
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _samples(series, after):
+    """(time, value) samples of a metric series newer than `after`."""
+    if not isinstance(series, list):
+        return []
+    return [(s["time"], s["value"]) for s in series
+            if isinstance(s, dict) and _number(s.get("time")) and _number(s.get("value")) and s["time"] > after]
+
+
+class SessionMonitor:
+    """Streaming summaries and active alerts of one client session."""
+
+    def __init__(self, session):
+        self.session = session
+        self.reports = 0
+        self.seen = time.monotonic()
+        self.frame_time = DDSketch()  # Baseline: earlier windows
+        self.window = DDSketch()      # Current window
+        self.window_reports = 0
+        self.fps = Ewma()
+        self.long_frames = RunningCorrelation()
+        self.memory = None
+        self.memory_streak = 0
+        self.memory_start = None
+        self.last_time = {"fps": -math.inf, "frameTime": -math.inf, "longFrames": -math.inf}
+        self.alerts = {}  # kind -> alert
+
+    def observe(self, entry):
+        """Fold one report in; return the alerts it raised."""
+        self.reports += 1
+        self.seen = time.monotonic()
+        metrics = entry["metrics"]
+        raised = []
+
+        for name in ("fps", "frameTime"):
+            samples = _samples(metrics.get(name), self.last_time[name])
+            if samples:
+                self.last_time[name] = samples[-1][0]
+            for _, value in samples:
+                if name == "fps":
+                    self.fps.add(value)
+                else:
+                    self.window.add(value)
+
+        for frame in entry["longFrames"]:
+            at = frame.get("time")
+            if _number(at) and at > self.last_time["longFrames"] and _number(frame.get("duration")) \
+                    and _number(frame.get("antCount")):
+                self.last_time["longFrames"] = at
+                self.long_frames.add(frame["antCount"], frame["duration"])
+
+        self.window_reports += 1
+        if self.window_reports >= WINDOW_REPORTS:
+            raised += self._close_window(entry["timestamp"])
+
+        memory = metrics.get("memoryUsage")
+        if _number(memory) and memory > 0:
+            raised += self._observe_memory(memory, entry["timestamp"])
+        return raised
+
+    def _close_window(self, timestamp):
+        baseline, current = self.frame_time.quantile(0.99), self.window.quantile(0.99)
+        regressed = (baseline is not None and self.frame_time.count >= MIN_BASELINE and current is not None
+                     and current > baseline * REGRESSION_RATIO and current > MIN_REGRESSED_MS)
+        raised = []
+        if regressed:
+            if "frameTimeRegression" not in self.alerts:
+                raised.append(self._raise("frameTimeRegression", timestamp,
+                                          f"p99 frame time {current:.1f}ms vs {baseline:.1f}ms before",
+                                          p99Ms=round(current, 2), baselineP99Ms=round(baseline, 2)))
+        else:
+            self.alerts.pop("frameTimeRegression", None)
+            self.frame_time.merge(self.window)
+        self.window = DDSketch()
+        self.window_reports = 0
+        return raised
+
+    def _observe_memory(self, memory, timestamp):
+        raised = []
+        if self.memory is not None and memory < self.memory:
+            self.memory_streak = 0
+            self.memory_start = memory
+            self.alerts.pop("memoryGrowth", None)
+        else:
+            if self.memory_start is None:
+                self.memory_start = memory
+            elif memory > self.memory:
+                self.memory_streak += 1
+            growth = (memory - self.memory_start) / self.memory_start
+            if self.memory_streak >= MEMORY_STREAK and growth >= MEMORY_GROWTH and "memoryGrowth" not in self.alerts:
+                raised.append(self._raise("memoryGrowth", timestamp,
+                                          f"memory rose from {self.memory_start} to {memory} MB "
+                                          f"in {self.memory_streak} rises without dropping",
+                                          fromMb=self.memory_start, toMb=memory, rises=self.memory_streak))
+        self.memory = memory
+        return raised
+
+    def _raise(self, kind, timestamp, message, **values):
+        alert = {"session": self.session, "kind": kind, "since": timestamp, "message": message, **values}
+        self.alerts[kind] = alert
+        return alert
+
+    @property
+    def active(self):
+        return time.monotonic() - self.seen < SESSION_TIMEOUT
+
+    def to_dict(self):
+        p50, p99 = self.frame_time.quantile(0.5), self.frame_time.quantile(0.99)
+        correlation = self.long_frames.value
+        return {
+            "session": self.session,
+            "reports": self.reports,
+            "active": self.active,
+            "frameTimeP50Ms": round(p50, 2) if p50 is not None else None,
+            "frameTimeP99Ms": round(p99, 2) if p99 is not None else None,
+            "fpsEwma": round(self.fps.value, 2) if self.fps.value is not None else None,
+            "longFrames": self.long_frames.n,
+            "longFrameAntCorrelation": round(correlation, 3) if correlation is not None else None,
+            "memoryMb": self.memory,
+            "alerts": list(self.alerts.values()),
+        }
+
+
+class TelemetryMonitor:
+    """Session monitors for every client reporting with a session id."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()  # session -> SessionMonitor, least recently seen first
+
+    def observe(self, session, entry):
+        monitor = self.sessions.pop(session, None) or SessionMonitor(session)
+        self.sessions[session] = monitor
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return monitor.observe(entry)
+
+    def alerts(self):
+        """Alerts of sessions that are still reporting."""
+        return [alert for monitor in self.sessions.values() if monitor.active for alert in monitor.alerts.values()]
+
+    def to_dict(self):
+        return {"sessions": [monitor.to_dict() for monitor in reversed(self.sessions.values())]}
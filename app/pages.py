@@ -0,0 +1,59 @@
+"""
+In-memory cache for pages whose templates take no per-request context.
+
+Each template is rendered once and kept with an ETag and Last-Modified
+header; it is re-rendered only when the template file (or one of the extra
+files it depends on, such as the asset manifest) changes on disk.
+Conditional requests (If-None-Match / If-Modified-Since) get a bodiless 304.
+"""
+
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi.responses import HTMLResponse, Response
+
+
+class PageCache:
+    """Rendered static templates with validators for conditional GETs."""
+
+    def __init__(self, templates, directory, dependencies=()):
+        self.templates = templates
+        self.directory = directory
+        self.dependencies = dependencies
+        self.pages = {}  # name -> (mtime, body, etag, last_modified)
+
+    def get(self, name):
+        mtime = os.stat(os.path.join(self.directory, name)).st_mtime
+        for path in self.dependencies:
+            if os.path.exists(path):
+                mtime = max(mtime, os.stat(path).st_mtime)
+        entry = self.pages.get(name)
+        if entry is None or entry[0] != mtime:
+            body = self.templates.get_template(name).render().encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            entry = (mtime, body, etag, formatdate(mtime, usegmt=True))
+            self.pages[name] = entry
+        return entry
+
+    @staticmethod
+    def not_modified(request, etag, mtime):
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or "W/" + etag in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def response(self, request, name):
+        mtime, body, etag, last_modified = self.get(name)
+        headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
+        if self.not_modified(request, etag, mtime):
+            return Response(status_code=304, headers=headers)
+        return HTMLResponse(content=body, headers=headers)
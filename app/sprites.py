@@ -0,0 +1,149 @@
+"""
+Sprite atlas for the game's predator, food, obstacle, terrain and weather images.
+
+All sprites are packed into one atlas so the canvas code can draw every
+image from a single source with sub-rectangle drawImage calls. The atlas is
+assembled as one SVG document (each sprite nested at its packed position)
+and, when cairosvg is installed, rasterized to PNG at several resolutions.
+The frame map is in 1x units; multiply by the resolution for PNG atlases.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+try:
+    import cairosvg
+except (ImportError, OSError):  # cairosvg is optional (needs the cairo library)
+    cairosvg = None
+
+IMG_DIR = "img"
+SCALES = (1, 2, 4)
+PADDING = 2  # Gap between sprites so filtering never bleeds into a neighbour
+MAX_ROW_WIDTH = 256
+
+SPRITES = (
+    # Predators
+    "spider", "beetle", "lizard",
+    # Food
+    "apple", "bread", "cheese", "sugar",
+    # Obstacles
+    "rock", "stick", "leaf",
+    # Terrain
+    "sand", "mud", "grass",
+    # Weather and time of day
+    "rain", "fog", "heat", "sun", "moon",
+    # Ants and tools
+    "ant", "better-ant", "simple-ant", "magnifying-glass",
+)
+
+SVG_OPEN_RE = re.compile(r"<svg\b([^>]*)>", re.S)
+ATTR_RE = re.compile(r'([\w:-]+)\s*=\s*"([^"]*)"')
+ID_RE = re.compile(r'\bid="([^"]+)"')
+
+
+class Sprite:
+    """One SVG image: its size, viewBox and inner markup."""
+
+    def __init__(self, name, source):
+        self.name = name
+        match = SVG_OPEN_RE.search(source)
+        if match is None:
+            raise ValueError(f"{name}: not an SVG document")
+        attrs = dict(ATTR_RE.findall(match.group(1)))
+        end = source.rindex("</svg>")
+        body = source[match.end():end]
+
+        view_box = attrs.get("viewBox")
+        width = self._length(attrs.get("width"))
+        height = self._length(attrs.get("height"))
+        if view_box is None:
+            view_box = f"0 0 {width} {height}"
+        if width is None or height is None:
+            _, _, width, height = (float(v) for v in view_box.replace(",", " ").split())
+
+        self.width = int(round(width))
+        self.height = int(round(height))
+        self.view_box = view_box
+        self.body = self._prefix_ids(body)
+
+    @staticmethod
+    def _length(value):
+        if value is None:
+            return None
+        match = re.match(r"\s*([\d.]+)", value)
+        return float(match.group(1)) if match else None
+
+    def _prefix_ids(self, body):
+        """Namespace element ids so sprites cannot clash inside one document."""
+        for element_id in set(ID_RE.findall(body)):
+            new_id = f"{self.name}-{element_id}"
+            body = body.replace(f'id="{element_id}"', f'id="{new_id}"')
+            body = body.replace(f"url(#{element_id})", f"url(#{new_id})")
+            body = body.replace(f'href="#{element_id}"', f'href="#{new_id}"')
+        return body
+
+
+def pack(sprites, padding=PADDING, max_row_width=MAX_ROW_WIDTH):
+    """Shelf-pack sprites (tallest first); return frames and atlas size."""
+    frames = {}
+    x = y = shelf_height = width = 0
+    for sprite in sorted(sprites, key=lambda s: (-s.height, -s.width, s.name)):
+        if x and x + sprite.width + padding > max_row_width:
+            y += shelf_height + padding
+            x = shelf_height = 0
+        frames[sprite.name] = {"x": x, "y": y, "w": sprite.width, "h": sprite.height}
+        x += sprite.width + padding
+        shelf_height = max(shelf_height, sprite.height)
+        width = max(width, x - padding)
+    return frames, width, y + shelf_height
+
+
+class SpriteAtlas:
+    """Packed atlas of the game sprites with lazily rasterized resolutions."""
+
+    def __init__(self, names=SPRITES, img_dir=IMG_DIR):
+        sprites = []
+        for name in names:
+            path = os.path.join(img_dir, f"{name}.svg")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    sprites.append(Sprite(name, f.read()))
+
+        self.frames, self.width, self.height = pack(sprites)
+        parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}" '
+                 f'viewBox="0 0 {self.width} {self.height}">']
+        for sprite in sprites:
+            frame = self.frames[sprite.name]
+            parts.append(f'<svg x="{frame["x"]}" y="{frame["y"]}" width="{frame["w"]}" height="{frame["h"]}" '
+                         f'viewBox="{sprite.view_box}">{sprite.body}</svg>')
+        parts.append("</svg>\n")
+        self.svg = "".join(parts).encode("utf-8")
+        self.version = hashlib.sha256(self.svg).hexdigest()[:10]
+        self._png = {}
+
+    @property
+    def can_rasterize(self):
+        return cairosvg is not None
+
+    def png(self, scale):
+        """The atlas rasterized at an integer resolution multiplier."""
+        if cairosvg is None:
+            raise RuntimeError("PNG atlases need cairosvg (pip install cairosvg)")
+        if scale not in self._png:
+            self._png[scale] = cairosvg.svg2png(bytestring=self.svg, scale=scale)
+        return self._png[scale]
+
+    def to_dict(self, images):
+        """Coordinate map; `images` maps "svg" or a scale to an image URL."""
+        return {
+            "version": self.version,
+            "width": self.width,
+            "height": self.height,
+            "images": {str(key): url for key, url in images.items()},
+            "frames": self.frames,
+        }
+
+    def to_json(self, images):
+        return json.dumps(self.to_dict(images), indent=2, sort_keys=True)
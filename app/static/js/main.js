@@ -7,6 +7,7 @@ import { settings, updateSpatialGrid, getNearbyObjects, isOnScreen } from './mod
 import { Environment } from './modules/environment.js';
 import { PredatorManager } from './modules/predators.js';
 import { Tutorial } from './modules/tutorial.js';
+import { loadSpriteAtlas } from './modules/sprites.js';
 
 // Global variables
 const canvas = document.getElementById('antCanvas');
@@ -120,6 +121,15 @@ let lastAntAddedScore = 0;
 const environment = new Environment();
 const predatorManager = new PredatorManager();
 
+// Sprite atlas: food, obstacles, predators, terrain and weather are drawn from
+// it once loaded, and from their own images until then or if it fails
+let spriteAtlas = null;
+loadSpriteAtlas().then(atlas => {
+  spriteAtlas = atlas;
+  environment.spriteAtlas = atlas;
+  predatorManager.spriteAtlas = atlas;
+});
+
 // Tutorial system
 const tutorial = new Tutorial();
 
@@ -683,10 +693,10 @@ function animate(timestamp) {
     // Only draw obstacles that are on screen
     if (settings.cullOffscreenObjects) {
       obstacles.filter(o => isOnScreen(o)).forEach(o => {
-        drawObstacle(o, ctx, obstacleImages, lastMouseX, lastMouseY, currentMode, isPointInObstacle);
+        drawObstacle(o, ctx, obstacleImages, lastMouseX, lastMouseY, currentMode, isPointInObstacle, spriteAtlas);
       });
     } else {
-      drawObstacles(obstacles, ctx, obstacleImages, lastMouseX, lastMouseY, currentMode, isPointInObstacle);
+      drawObstacles(obstacles, ctx, obstacleImages, lastMouseX, lastMouseY, currentMode, isPointInObstacle, spriteAtlas);
     }
 
     drawQueen();
@@ -694,10 +704,10 @@ function animate(timestamp) {
     // Only draw food that is on screen
     if (settings.cullOffscreenObjects) {
       food.filter(f => isOnScreen(f)).forEach(f => {
-        drawFoodItem(f, ctx, foodImages);
+        drawFoodItem(f, ctx, foodImages, spriteAtlas);
       });
     } else {
-      drawFood(food, ctx, foodImages);
+      drawFood(food, ctx, foodImages, spriteAtlas);
     }
 
     // Draw predators
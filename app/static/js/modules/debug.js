@@ -33,6 +33,10 @@ export class DebugMonitor {
     // Timing data for functions
     this.functionTimings = {};
 
+    // Reports from one page load are stored together on the server. The id
+    // starts with the time in base 36, so sessions sort chronologically.
+    this.sessionId = Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 10);
+
     // Last log time
     this.lastLogTime = 0;
 
@@ -496,6 +500,7 @@ export class DebugMonitor {
 
     // Prepare data to send
     const data = {
+      session: this.sessionId,
       timestamp: Date.now(),
       metrics: {
         fps: this.metrics.fps.slice(-10),
@@ -512,14 +517,18 @@ export class DebugMonitor {
       functionTimings: this.functionTimings
     };
 
-    // Send to server
-    fetch(this.config.serverEndpoint, {
+    // Send to server, gzip-compressed where the browser supports CompressionStream
+    const json = JSON.stringify(data);
+    const send = (body, headers) => fetch(this.config.serverEndpoint, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json'
-      },
-      body: JSON.stringify(data)
-    }).catch(error => {
+      headers: { 'Content-Type': 'application/json', ...headers },
+      body
+    });
+    const request = typeof CompressionStream === 'function'
+      ? new Response(new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'))).arrayBuffer()
+          .then(body => send(body, { 'Content-Encoding': 'gzip' }))
+      : send(json, {});
+    request.catch(error => {
       console.error('Error sending debug data to server:', error);
     });
   }
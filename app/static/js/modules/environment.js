@@ -1,4 +1,6 @@
 // Environment system for day/night cycle and weather effects
+import { drawSprite } from './sprites.js';
+
 export class Environment {
   constructor() {
     // Time is measured in game hours (0-24)
@@ -61,6 +63,9 @@ export class Environment {
     // Create terrain patches
     this.generateTerrain();
     
+    // Sprite atlas, set once it has loaded; the images below are the fallback
+    this.spriteAtlas = null;
+
     // Load images
     this.images = {
       sun: new Image(),
@@ -250,7 +255,9 @@ export class Environment {
         
         if (terrain !== 'normal') {
           const terrainImage = this.images[terrain];
-          if (terrainImage.complete) {
+          if (drawSprite(ctx, this.spriteAtlas, terrain, x + gridSize/2, y + gridSize/2, gridSize)) {
+            // Drawn from the sprite atlas
+          } else if (terrainImage.complete) {
             ctx.drawImage(terrainImage, x, y, gridSize, gridSize);
           } else {
             // Fallback if image isn't loaded
@@ -282,7 +289,11 @@ export class Environment {
     ctx.save();
     
     // Draw sun or moon based on time
-    if (this.isNight) {
+    const iconX = ctx.canvas.width - size/2 - padding;
+    const iconY = size/2 + padding;
+    if (drawSprite(ctx, this.spriteAtlas, this.isNight ? 'moon' : 'sun', iconX, iconY, size)) {
+      // Drawn from the sprite atlas
+    } else if (this.isNight) {
       if (this.images.moon.complete) {
         ctx.drawImage(this.images.moon, ctx.canvas.width - size - padding, padding, size, size);
       } else {
@@ -346,8 +357,9 @@ export class Environment {
     const padding = 20;
     const weatherImage = this.images[weatherType];
     
-    if (weatherImage && weatherImage.complete) {
-      ctx.globalAlpha = intensity;
+    ctx.globalAlpha = intensity;
+    if (!drawSprite(ctx, this.spriteAtlas, weatherType, ctx.canvas.width - size/2 - padding,
+                    padding * 3 + size * 1.5, size) && weatherImage && weatherImage.complete) {
       ctx.drawImage(weatherImage, ctx.canvas.width - size - padding, padding * 3 + size, size, size);
     }
     
@@ -1,12 +1,16 @@
+import { drawSprite } from './sprites.js';
+
 // Draw a single food item (for optimization)
-export function drawFoodItem(f, ctx, foodImages) {
+export function drawFoodItem(f, ctx, foodImages, atlas = null) {
   const foodImage = foodImages[f.type];
   const size = 30; // Increased food size
 
   ctx.save();
 
-  // Draw the food image
-  ctx.drawImage(foodImage, f.x - size/2, f.y - size/2, size, size);
+  // Draw the food from the sprite atlas, or its own image until it has loaded
+  if (!drawSprite(ctx, atlas, f.type, f.x, f.y, size)) {
+    ctx.drawImage(foodImage, f.x - size/2, f.y - size/2, size, size);
+  }
 
   // Draw decay bar
   const decayPercentage = f.decayTimer / f.decayTime;
@@ -46,8 +50,8 @@ export function drawFoodItem(f, ctx, foodImages) {
 }
 
 // Draw all food items
-export function drawFood(food, ctx, foodImages) {
-  food.forEach(f => drawFoodItem(f, ctx, foodImages));
+export function drawFood(food, ctx, foodImages, atlas = null) {
+  food.forEach(f => drawFoodItem(f, ctx, foodImages, atlas));
 }
 
 // Handle food decay
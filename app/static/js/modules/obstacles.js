@@ -1,16 +1,22 @@
+import { drawSprite } from './sprites.js';
+
+// Drawn size of each obstacle type
+const obstacleSizes = {
+  rock: { width: 40, height: 30 },
+  stick: { width: 60, height: 20 },
+  leaf: { width: 40, height: 40 }
+};
+
 // Draw a single obstacle (for optimization)
-export function drawObstacle(o, ctx, obstacleImages, lastMouseX, lastMouseY, currentMode, isPointInObstacle) {
+export function drawObstacle(o, ctx, obstacleImages, lastMouseX, lastMouseY, currentMode, isPointInObstacle, atlas = null) {
   const obstacleImage = obstacleImages[o.type];
+  const size = obstacleSizes[o.type];
   
   ctx.save();
   
-  // Draw the obstacle image with appropriate size based on type
-  if (o.type === 'rock') {
-    ctx.drawImage(obstacleImage, o.x - 20, o.y - 15, 40, 30);
-  } else if (o.type === 'stick') {
-    ctx.drawImage(obstacleImage, o.x - 30, o.y - 10, 60, 20);
-  } else if (o.type === 'leaf') {
-    ctx.drawImage(obstacleImage, o.x - 20, o.y - 20, 40, 40);
+  // Draw from the sprite atlas, or the obstacle's own image until it has loaded
+  if (size && !drawSprite(ctx, atlas, o.type, o.x, o.y, size.width, size.height)) {
+    ctx.drawImage(obstacleImage, o.x - size.width/2, o.y - size.height/2, size.width, size.height);
   }
   
   // Add a subtle highlight when hovering
@@ -40,8 +46,8 @@ export function drawObstacle(o, ctx, obstacleImages, lastMouseX, lastMouseY, cur
 }
 
 // Draw all obstacles
-export function drawObstacles(obstacles, ctx, obstacleImages, lastMouseX, lastMouseY, currentMode, isPointInObstacle) {
-  obstacles.forEach(o => drawObstacle(o, ctx, obstacleImages, lastMouseX, lastMouseY, currentMode, isPointInObstacle));
+export function drawObstacles(obstacles, ctx, obstacleImages, lastMouseX, lastMouseY, currentMode, isPointInObstacle, atlas = null) {
+  obstacles.forEach(o => drawObstacle(o, ctx, obstacleImages, lastMouseX, lastMouseY, currentMode, isPointInObstacle, atlas));
 }
 
 // Function to check if a point is inside an obstacle
@@ -1,4 +1,6 @@
 // Predator system for the ant simulation
+import { drawSprite, hasSprite } from './sprites.js';
+
 export class Predator {
   constructor(type, x, y) {
     this.type = type; // 'spider', 'beetle', or 'lizard'
@@ -202,7 +204,7 @@ export class Predator {
     }
   }
 
-  draw(ctx) {
+  draw(ctx, atlas = null) {
     if (!this.active) return;
 
     ctx.save();
@@ -212,7 +214,7 @@ export class Predator {
     ctx.rotate(this.direction);
 
     // Draw the predator using the appropriate method
-    this.drawPredatorShape(ctx);
+    this.drawPredatorShape(ctx, atlas);
 
     // Draw health bar if damaged
     if (this.health < this.maxHealth) {
@@ -243,7 +245,12 @@ export class Predator {
   }
 
   // Helper method to draw the predator shape
-  drawPredatorShape(ctx) {
+  drawPredatorShape(ctx, atlas = null) {
+    // Prefer the sprite atlas
+    if (drawSprite(ctx, atlas, this.type, 0, 0, this.size)) {
+      return;
+    }
+
     // If image is loaded successfully, use it
     if (this.imageLoaded && !this.imageError && this.image.complete) {
       try {
@@ -401,6 +408,7 @@ export class PredatorManager {
 
     // Load images
     this.predatorTypes = ['spider', 'beetle', 'lizard'];
+    this.spriteAtlas = null; // Set once the sprite atlas has loaded
     this.images = {};
     this.imageLoadStatus = {};
 
@@ -503,9 +511,11 @@ export class PredatorManager {
   selectPredatorType() {
     // First try to find a predator type with a successfully loaded image
     const workingTypes = this.predatorTypes.filter(type =>
-      this.imageLoadStatus[type] &&
-      this.imageLoadStatus[type].loaded &&
-      !this.imageLoadStatus[type].error
+      hasSprite(this.spriteAtlas, type) || (
+        this.imageLoadStatus[type] &&
+        this.imageLoadStatus[type].loaded &&
+        !this.imageLoadStatus[type].error
+      )
     );
 
     if (workingTypes.length > 0) {
@@ -538,7 +548,7 @@ export class PredatorManager {
 
   draw(ctx) {
     this.predators.forEach(predator => {
-      predator.draw(ctx);
+      predator.draw(ctx, this.spriteAtlas);
     });
   }
 }
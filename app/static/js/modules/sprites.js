@@ -0,0 +1,51 @@
+// Sprite atlas: every game image packed into one texture
+//
+// The server packs the predator, food, obstacle, terrain and weather SVGs
+// into a single atlas (see app/sprites.py). Loading it costs one request and
+// one decode, and drawing is a sub-rectangle drawImage from the same source.
+
+// Pick the PNG resolution that matches the display, or the SVG when no PNGs exist
+function chooseImageUrl(images) {
+  const scales = Object.keys(images).filter(key => key !== 'svg').map(Number).sort((a, b) => a - b);
+  const wanted = window.devicePixelRatio || 1;
+  const scale = scales.find(s => s >= wanted) || scales[scales.length - 1];
+  return scale ? { url: images[scale], scale: scale } : { url: images.svg, scale: 1 };
+}
+
+// Load the coordinate map and the atlas image; resolves to null on failure
+export async function loadSpriteAtlas(url = '/api/sprites/atlas.json') {
+  try {
+    const response = await fetch(url);
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}`);
+    }
+    const map = await response.json();
+    const { url: imageUrl, scale } = chooseImageUrl(map.images);
+
+    const image = new Image();
+    image.src = imageUrl;
+    await image.decode();
+
+    return { image: image, scale: scale, frames: map.frames };
+  } catch (e) {
+    console.error('Error loading sprite atlas:', e);
+    return null;
+  }
+}
+
+// Whether the atlas has a frame for a sprite
+export function hasSprite(atlas, name) {
+  return atlas !== null && atlas.frames[name] !== undefined;
+}
+
+// Draw a sprite centred at (x, y) with the given size; returns false if missing
+export function drawSprite(ctx, atlas, name, x, y, width, height = width) {
+  if (!hasSprite(atlas, name)) {
+    return false;
+  }
+  const frame = atlas.frames[name];
+  const s = atlas.scale;
+  ctx.drawImage(atlas.image, frame.x * s, frame.y * s, frame.w * s, frame.h * s,
+                x - width / 2, y - height / 2, width, height);
+  return true;
+}
@@ -0,0 +1,327 @@
+"""
+Fast decoding of debug telemetry posted to /api/debug-log.
+
+DebugMonitor.logToServer posts one entry per logInterval from every open
+game. Validating each one through a pydantic model and re-serializing it
+dominated the cost of ingesting them. This module decodes the raw body
+according to its Content-Encoding (identity or gzip) and Content-Type (JSON,
+msgpack or CBOR), checks the handful of top-level fields directly, and
+writes the log file through orjson when it is installed. msgpack, cbor2
+and orjson are all optional. A body in a format whose codec is missing
+gets a 415.
+
+Reports that name a session go to one SessionStore file per session.
+functionTimings in a report is cumulative over the whole page load, so
+storing every report in full grows quadratically. The store keeps each
+session's last counters and appends one line per report holding only the
+window's deltas: calls, time spent and, when it rose, the new maximum.
+read_session rebuilds the cumulative and per-window views when a session
+is read, and read_series collects its fps and frameTime samples for
+charting (see app/downsample.py).
+"""
+
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the json module is always available
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # cbor2 is optional
+    cbor2 = None
+
+MAX_ENTRY_BYTES = 8 * 1024 * 1024  # Decompressed size limit for one entry
+
+# Fields of a log entry and their types
+ENTRY_FIELDS = (
+    ("timestamp", int),
+    ("metrics", dict),
+    ("longFrames", list),
+    ("errors", list),
+    ("warnings", list),
+    ("functionTimings", dict),
+)
+LIST_FIELDS = ("longFrames", "errors", "warnings")  # Lists of objects
+SESSION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+MAX_SESSIONS = 1024  # Sessions whose last counters are kept in memory
+TIME_DIGITS = 3      # Decimals (of a millisecond) kept for per-window time deltas
+SERIES = ("fps", "frameTime")  # Metrics sent as lists of {time, value} samples
+
+
+class UnsupportedPayload(ValueError):
+    """The body's content type or encoding cannot be decoded here."""
+
+
+def _loads_json(body):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def _loads_msgpack(body):
+    if msgpack is None:
+        raise UnsupportedPayload("msgpack bodies need the msgpack package")
+    return msgpack.unpackb(body, raw=False, strict_map_key=False)
+
+
+def _loads_cbor(body):
+    if cbor2 is None:
+        raise UnsupportedPayload("CBOR bodies need the cbor2 package")
+    return cbor2.loads(body)
+
+
+DECODERS = {
+    "application/json": _loads_json,
+    "application/msgpack": _loads_msgpack,
+    "application/x-msgpack": _loads_msgpack,
+    "application/vnd.msgpack": _loads_msgpack,
+    "application/cbor": _loads_cbor,
+}
+
+
+def media_types():
+    """Content types that can be decoded with the installed codecs."""
+    available = {_loads_json: True, _loads_msgpack: msgpack is not None, _loads_cbor: cbor2 is not None}
+    return [name for name, decoder in DECODERS.items() if available[decoder]]
+
+
+def decompress(body, content_encoding=None):
+    """Undo a gzip Content-Encoding, refusing output over MAX_ENTRY_BYTES."""
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return body
+    if encoding not in ("gzip", "x-gzip"):
+        raise UnsupportedPayload(f"Unsupported Content-Encoding: {encoding}")
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = inflater.decompress(body, MAX_ENTRY_BYTES)
+    except zlib.error as e:
+        raise ValueError(f"Invalid gzip body: {e}") from None
+    if inflater.unconsumed_tail:
+        raise ValueError(f"Entry is larger than {MAX_ENTRY_BYTES} bytes")
+    return data
+
+
+def decode(body, content_type=None, content_encoding=None):
+    """Decode a request body by its Content-Encoding and Content-Type."""
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    decoder = DECODERS.get(media_type)
+    if decoder is None:
+        raise UnsupportedPayload(f"Unsupported Content-Type: {media_type}")
+    body = decompress(body, content_encoding)
+    try:
+        return decoder(body)
+    except UnsupportedPayload:
+        raise
+    except Exception as e:
+        raise ValueError(f"Invalid {media_type} body: {e}") from None
+
+
+def validate_entry(data):
+    """Check a decoded entry against ENTRY_FIELDS; return just those fields."""
+    if not isinstance(data, dict):
+        raise ValueError("A log entry must be an object")
+    entry = {}
+    for name, kind in ENTRY_FIELDS:
+        if name not in data:
+            raise ValueError(f"'{name}' is required")
+        value = data[name]
+        if kind is int and isinstance(value, float) and value.is_integer():
+            value = int(value)  # JavaScript numbers may arrive as floats
+        if not isinstance(value, kind) or isinstance(value, bool):
+            raise ValueError(f"'{name}' must be {'an integer' if kind is int else f'a {kind.__name__}'}")
+        entry[name] = value
+    for name in LIST_FIELDS:
+        if not all(isinstance(item, dict) for item in entry[name]):
+            raise ValueError(f"'{name}' must be a list of objects")
+    for name in ("metrics", "functionTimings"):
+        if not all(isinstance(key, str) for key in entry[name]):
+            raise ValueError(f"'{name}' keys must be strings")
+    session = data.get("session")
+    if session is not None:
+        if not isinstance(session, str) or not SESSION_ID.fullmatch(session):
+            raise ValueError("'session' must be 1-64 letters, digits, '-' or '_'")
+        entry["session"] = session
+    return entry
+
+
+def decode_entry(body, content_type=None, content_encoding=None):
+    """Decode and validate one posted log entry."""
+    return validate_entry(decode(body, content_type, content_encoding))
+
+
+def dumps(data):
+    """Serialize an entry as indented JSON bytes for the log file."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str)
+    return json.dumps(data, indent=2, default=str).encode("utf-8")
+
+
+# ----------------------------------------------------------------------
+# Session logs
+# ----------------------------------------------------------------------
+
+def _counters(timing):
+    """(calls, totalTime, maxTime) of one functionTimings value, or None if malformed."""
+    if not isinstance(timing, dict):
+        return None
+    values = tuple(timing.get(name, 0) for name in ("calls", "totalTime", "maxTime"))
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return None
+    return values
+
+
+class SessionStore:
+    """Session log files holding per-window deltas of functionTimings.
+
+    Each line of logs/session_<id>.jsonl is one report with its metrics,
+    long frames, errors and warnings as sent, and "timings": {name: [calls,
+    time, max]} for the functions called in that window. max is null unless
+    the function's maximum rose in the window. A line has "keyframe": true
+    when its timings are the cumulative values: the first report the store
+    sees for a session (including after a server restart), or one where the
+    client's counters went backwards.
+    """
+
+    def __init__(self, directory="logs", max_sessions=MAX_SESSIONS):
+        self.directory = directory
+        self.max_sessions = max_sessions
+        self.last = OrderedDict()  # session -> {name: (calls, totalTime, maxTime)}
+        self.lock = threading.Lock()  # Appends run in worker threads
+
+    def path(self, session):
+        return os.path.join(self.directory, f"session_{session}.jsonl")
+
+    def record(self, session, entry):
+        """The line stored for a report, updating the session's last counters."""
+        current = {}
+        for name, timing in entry["functionTimings"].items():
+            counters = _counters(timing)
+            if counters is not None:
+                current[name] = counters
+
+        previous = self.last.pop(session, None)
+        keyframe = previous is None or any(
+            counters[0] < previous.get(name, (0, 0, 0))[0] for name, counters in current.items())
+        if keyframe:
+            timings = {name: list(counters) for name, counters in current.items()}
+        else:
+            timings = {}
+            for name, (calls, total, peak) in current.items():
+                last_calls, last_total, last_peak = previous.get(name, (0, 0, 0))
+                if calls > last_calls:
+                    # Times to the microsecond, about what performance.now() resolves.
+                    # Differences of rounded totals, so rounding errors do not add up.
+                    time = round(round(total, TIME_DIGITS) - round(last_total, TIME_DIGITS), TIME_DIGITS)
+                    timings[name] = [calls - last_calls, time,
+                                     peak if peak > last_peak else None]
+
+        self.last[session] = current
+        while len(self.last) > self.max_sessions:
+            self.last.popitem(last=False)
+
+        line = {name: entry[name] for name, _ in ENTRY_FIELDS if name != "functionTimings"}
+        line["timings"] = timings
+        if keyframe:
+            line["keyframe"] = True
+        return line
+
+    def append(self, session, entry):
+        """Append one report to its session file and return the file name."""
+        path = self.path(session)
+        with self.lock:
+            line = self.record(session, entry)
+            with open(path, "ab") as f:
+                f.write(_dumps_line(line))
+        return path
+
+
+def _dumps_line(data):
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE, default=str)
+    return (json.dumps(data, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+
+
+def read_session(path):
+    """Rebuild a session: the latest report with cumulative functionTimings, plus every window.
+
+    The result has the fields of a single-report log (so existing readers
+    work), plus "session", "reports" and "intervals": one entry per report
+    with its timestamp and that window's functionTimings.
+    """
+    cumulative = {}
+    intervals = []
+    last = None
+    with open(path, "rb") as f:
+        for raw in f:
+            if not raw.strip():
+                continue
+            line = _loads_json(raw)
+            window = {}
+            for name, (calls, total, peak) in line["timings"].items():
+                before = cumulative.get(name, {"calls": 0, "totalTime": 0, "maxTime": 0})
+                if line.get("keyframe"):
+                    # Absolute values; the window is what changed since the last line
+                    grew = calls >= before["calls"]
+                    window[name] = {"calls": calls - before["calls"] if grew else calls,
+                                    "totalTime": total - before["totalTime"] if grew else total,
+                                    "maxTime": peak if peak > before["maxTime"] or not grew else None}
+                    cumulative[name] = {"calls": calls, "totalTime": total, "maxTime": peak}
+                else:
+                    window[name] = {"calls": calls, "totalTime": total, "maxTime": peak}
+                    cumulative[name] = {"calls": before["calls"] + calls, "totalTime": before["totalTime"] + total,
+                                        "maxTime": max(before["maxTime"], peak if peak is not None else 0)}
+            intervals.append({"timestamp": line["timestamp"], "functionTimings": window})
+            last = line
+    if last is None:
+        raise ValueError(f"{path} holds no reports")
+
+    name = os.path.basename(path)
+    view = {field: last[field] for field, _ in ENTRY_FIELDS if field != "functionTimings"}
+    view["functionTimings"] = cumulative
+    view["session"] = name[len("session_"):-len(".jsonl")]
+    view["reports"] = len(intervals)
+    view["intervals"] = intervals
+    return view
+
+
+def _series_samples(metrics, series, last):
+    """Add a report's samples newer than the last ones seen to `series`."""
+    for name in SERIES:
+        samples = metrics.get(name) if isinstance(metrics, dict) else None
+        for sample in samples if isinstance(samples, list) else ():
+            if not isinstance(sample, dict):
+                continue
+            at, value = sample.get("time"), sample.get("value")
+            if isinstance(at, (int, float)) and isinstance(value, (int, float)) and at > last[name]:
+                series[name].append((at, value))
+                last[name] = at
+
+
+def read_series(path):
+    """Every fps and frameTime sample in a log as {name: [(time, value), ...]}.
+
+    A session's reports each repeat their latest samples, so only samples
+    newer than the previous report's are taken.
+    """
+    series = {name: [] for name in SERIES}
+    last = {name: float("-inf") for name in SERIES}
+    with open(path, "rb") as f:
+        if path.endswith(".jsonl"):
+            for raw in f:
+                if raw.strip():
+                    _series_samples(_loads_json(raw).get("metrics"), series, last)
+        else:
+            data = _loads_json(f.read())
+            _series_samples(data.get("metrics") if isinstance(data, dict) else None, series, last)
+    return series
@@ -0,0 +1,88 @@
+"""
+Ant Simulation Engine Benchmark
+
+Times the headless engine's tick on each available kernel backend (NumPy and,
+when installed, Numba) for several colony sizes, and checks that the
+backends produce identical colonies from the same seed.
+
+    python benchmark.py
+    python benchmark.py --ants 1000 100000 --ticks 50
+"""
+
+import argparse
+import hashlib
+import sys
+import time
+
+import numpy as np
+
+from app.engine import Colony
+from app.engine import constants as C
+from app.engine.kernels import available_backends
+
+# Columns compared between backends
+STATE_COLUMNS = ('ant_x', 'ant_y', 'ant_phase', 'ant_active', 'ant_food', 'ant_follow',
+                 'food_alive', 'food_assigned', 'food_decay_timer', 'predator_x', 'predator_y')
+
+
+def make_colony(ants, backend, seed=1):
+    """A seeded colony with food, obstacles and predators so every rule runs."""
+    scouts = max(1, int(ants * C.SCOUT_RATIO))
+    colony = Colony(seed=seed, scouts=scouts, workers=ants - scouts, backend=backend)
+    rng = np.random.default_rng(seed)
+    for _ in range(20):
+        colony.place_food(rng.uniform(20, colony.width - 20), rng.uniform(20, colony.height - 100),
+                          C.FOOD_TYPES[int(rng.integers(len(C.FOOD_TYPES)))])
+    for _ in range(10):
+        colony.place_obstacle(rng.uniform(50, colony.width - 50), rng.uniform(50, colony.height - 100),
+                              C.OBSTACLE_TYPES[int(rng.integers(len(C.OBSTACLE_TYPES)))])
+    for _ in range(C.MAX_PREDATORS):
+        colony.spawn_predator()
+    return colony
+
+
+def state_digest(colony):
+    digest = hashlib.sha256()
+    for name in STATE_COLUMNS:
+        digest.update(np.ascontiguousarray(getattr(colony, name)).tobytes())
+    digest.update(np.int64([colony.score, colony.kills]).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def run(ants, backend, ticks):
+    colony = make_colony(ants, backend)
+    colony.kernels.warm_up()  # Compile (or load cached) Numba kernels before timing
+    colony.step()
+    started = time.perf_counter()
+    for _ in range(ticks):
+        colony.step()
+    elapsed = (time.perf_counter() - started) / ticks
+    return elapsed, state_digest(colony)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the engine tick on each kernel backend')
+    parser.add_argument('--ants', type=int, nargs='+', default=[100, 10000, 100000], help='Colony sizes')
+    parser.add_argument('--ticks', type=int, default=30, help='Timed ticks per run')
+
+    args = parser.parse_args()
+    backends = available_backends()
+    if len(backends) == 1:
+        print("numba is not installed; only the numpy backend is benchmarked (pip install numba)")
+
+    print(f"{'ants':>8} " + " ".join(f"{name + ' ms/tick':>16}" for name in backends) + "  identical")
+    mismatch = False
+    for ants in args.ants:
+        results = [run(ants, backend, args.ticks) for backend in backends]
+        identical = len({digest for _, digest in results}) == 1
+        mismatch |= not identical
+        times = " ".join(f"{elapsed * 1000:>16.2f}" for elapsed, _ in results)
+        speedup = f"  ({results[0][0] / results[-1][0]:.1f}x)" if len(results) > 1 else ""
+        print(f"{ants:>8} {times}  {'yes' if identical else 'NO'}{speedup}")
+
+    if mismatch:
+        print("Error: backends diverged under the same seed")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
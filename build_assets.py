@@ -0,0 +1,414 @@
+"""
+Ant Simulation Asset Builder
+
+This script builds the static assets served under /dist:
+- bundles the ES module graph of each entry script into one file
+- minifies JavaScript and CSS
+- fingerprints every file name with a content hash
+- precompresses text assets with gzip (and brotli when installed)
+- packs the game sprites into one atlas (SVG, plus PNGs when cairosvg is installed)
+- writes a manifest.json that the templates use to find the built files
+
+Run it after changing anything in app/static or img:
+
+    python build_assets.py
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always produced
+    brotli = None
+
+from app.sprites import SCALES, SpriteAtlas
+
+STATIC_DIR = "app/static"
+IMG_DIR = "img"
+OUTPUT_DIR = "app/dist"
+OUTPUT_URL = "/dist"
+MANIFEST_NAME = "manifest.json"
+
+# ES module entry points bundled with their imports
+MODULE_ENTRIES = ["js/main.js", "js/debug-script.js"]
+
+# Classic scripts and stylesheets that are minified on their own
+STANDALONE_SCRIPTS = ["js/performance-monitor.js", "js/simple-debug.js", "js/add-performance-monitor.js"]
+STYLESHEETS = ["css/styles.css"]
+
+IMAGE_EXTENSIONS = (".svg", ".png", ".jpg", ".jpeg")
+COMPRESSIBLE_EXTENSIONS = (".js", ".css", ".svg", ".json")
+MIN_COMPRESS_SIZE = 256
+
+IMPORT_RE = re.compile(r"^import\s*\{([^}]*)\}\s*from\s*['\"]([^'\"]+)['\"];?\s*$", re.M)
+EXPORT_DECL_RE = re.compile(r"^export\s+((?:async\s+)?function\*?|class|const|let|var)\s+([\w$]+)", re.M)
+EXPORT_LIST_RE = re.compile(r"^export\s*\{([^}]*)\};?\s*$", re.M)
+DYNAMIC_IMPORT_RE = re.compile(r"\bimport\s*\(")
+IMG_LITERAL_RE = re.compile(r"(['\"])(/img/[\w./-]+)\1")
+
+# Tokens after which a "/" starts a regular expression rather than a division
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw"}
+
+
+class BuildError(Exception):
+    """Raised when an asset cannot be bundled."""
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+# ----------------------------------------------------------------------
+# Minification
+# ----------------------------------------------------------------------
+
+def _skip_string(src, i):
+    """Return the index just past the quoted string starting at i."""
+    quote = src[i]
+    i += 1
+    while i < len(src):
+        if src[i] == "\\":
+            i += 2
+            continue
+        if src[i] == quote:
+            return i + 1
+        if src[i] == "\n":
+            break
+        i += 1
+    raise BuildError("Unterminated string literal")
+
+
+def _skip_regex(src, i):
+    """Return the index just past the regex literal (and flags) starting at i."""
+    i += 1
+    in_class = False
+    while i < len(src):
+        c = src[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            i += 1
+            while i < len(src) and (src[i].isalnum() or src[i] == "_"):
+                i += 1
+            return i
+        elif c == "\n":
+            break
+        i += 1
+    raise BuildError("Unterminated regular expression")
+
+
+def _skip_template(src, i):
+    """Scan template literal text from i; return (index, opened_substitution)."""
+    while i < len(src):
+        c = src[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "`":
+            return i + 1, False
+        if c == "$" and src[i + 1:i + 2] == "{":
+            return i + 2, True
+        i += 1
+    raise BuildError("Unterminated template literal")
+
+
+def _last_word(out):
+    text = "".join(out[-12:])
+    match = re.search(r"([\w$]+)\s*$", text)
+    return match.group(1) if match else ""
+
+
+def minify_js(src):
+    """Strip comments, indentation and blank lines from JavaScript.
+
+    Newlines between statements are kept so automatic semicolon insertion
+    behaves exactly as in the source; strings, template literals and regex
+    literals are copied untouched.
+    """
+    out = []
+    i, n = 0, len(src)
+    braces = 0
+    templates = []  # brace depth at which each open ${ ... } returns to its template
+    last = ""
+
+    while i < n:
+        c = src[i]
+
+        if c in " \t":
+            if out and out[-1] not in " \n":
+                out.append(" ")
+            i += 1
+            continue
+        if c in "\r\n":
+            while out and out[-1] == " ":
+                out.pop()
+            if out and out[-1] != "\n":
+                out.append("\n")
+            i += 1
+            continue
+
+        if c == "/" and src[i + 1:i + 2] == "/":
+            end = src.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        if c == "/" and src[i + 1:i + 2] == "*":
+            end = src.find("*/", i + 2)
+            if end == -1:
+                raise BuildError("Unterminated block comment")
+            if "\n" in src[i:end]:
+                out.append("\n")
+            i = end + 2
+            continue
+
+        if c in "'\"":
+            end = _skip_string(src, i)
+            out.append(src[i:end])
+            i, last = end, c
+            continue
+        if c == "`":
+            end, opened = _skip_template(src, i + 1)
+            out.append(src[i:end])
+            i, last = end, "`"
+            if opened:
+                templates.append(braces)
+            continue
+        if c == "/":
+            word = _last_word(out)
+            if not last or last in REGEX_PRECEDERS or (word and word in REGEX_KEYWORDS and last == word[-1]):
+                end = _skip_regex(src, i)
+                out.append(src[i:end])
+                i, last = end, "/"
+                continue
+
+        if c == "{":
+            braces += 1
+        elif c == "}":
+            if templates and braces == templates[-1]:
+                # End of a ${ ... } substitution: continue the template literal
+                templates.pop()
+                end, opened = _skip_template(src, i + 1)
+                out.append(src[i:end])
+                i, last = end, "`"
+                if opened:
+                    templates.append(braces)
+                continue
+            braces -= 1
+
+        out.append(c)
+        last = c
+        i += 1
+
+    return "".join(out).strip() + "\n"
+
+
+def minify_css(src):
+    """Strip comments and collapse whitespace in a stylesheet."""
+    parts = re.split(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')", src)
+    for k in range(0, len(parts), 2):
+        text = re.sub(r"/\*.*?\*/", "", parts[k], flags=re.S)
+        text = re.sub(r"\s+", " ", text)
+        parts[k] = re.sub(r"\s*([{};,])\s*", r"\1", text)
+    return "".join(parts).strip() + "\n"
+
+
+# ----------------------------------------------------------------------
+# Bundling
+# ----------------------------------------------------------------------
+
+def _module_var(path):
+    return "__module_" + re.sub(r"\W", "_", os.path.splitext(path)[0])
+
+
+def _parse_imports(source, path):
+    imports = []
+    for names, spec in IMPORT_RE.findall(source):
+        if not spec.startswith("."):
+            raise BuildError(f"{path}: only relative imports can be bundled ({spec})")
+        target = os.path.normpath(os.path.join(os.path.dirname(path), spec)).replace(os.sep, "/")
+        bindings = []
+        for name in filter(None, (n.strip() for n in names.split(","))):
+            original, _, alias = name.partition(" as ")
+            bindings.append((original.strip(), (alias or original).strip()))
+        imports.append((target, bindings))
+    remaining = IMPORT_RE.sub("", source)
+    if re.search(r"^import\s", remaining, re.M):
+        raise BuildError(f"{path}: unsupported import statement")
+    return imports, remaining
+
+
+def _strip_exports(source, path):
+    """Remove export keywords; return (source, exported names)."""
+    names = [name for _, name in EXPORT_DECL_RE.findall(source)]
+    source = EXPORT_DECL_RE.sub(lambda m: f"{m.group(1)} {m.group(2)}", source)
+    for listed in EXPORT_LIST_RE.findall(source):
+        names.extend(n.strip() for n in listed.split(",") if n.strip())
+    source = EXPORT_LIST_RE.sub("", source)
+    if re.search(r"^export\s", source, re.M):
+        raise BuildError(f"{path}: unsupported export statement")
+    return source, names
+
+
+def _destructure(target, bindings):
+    fields = ", ".join(original if original == alias else f"{original}: {alias}"
+                       for original, alias in bindings)
+    return f"const {{ {fields} }} = {_module_var(target)};"
+
+
+def bundle_module(entry, root=STATIC_DIR):
+    """Inline the static import graph of an ES module entry into one module.
+
+    Each dependency runs inside its own function scope and hands its
+    exports to importers, so module-private names cannot collide. The entry
+    itself stays at the top level and keeps its own exports.
+    """
+    order, visiting, sources = [], set(), {}
+
+    def visit(path):
+        if path in sources:
+            return
+        if path in visiting:
+            raise BuildError(f"Circular import involving {path}")
+        visiting.add(path)
+        imports, body = _parse_imports(read_text(os.path.join(root, path)), path)
+        for target, _ in imports:
+            visit(target)
+        visiting.discard(path)
+        sources[path] = (imports, body)
+        order.append(path)
+
+    visit(entry)
+
+    chunks = []
+    for path in order:
+        imports, body = sources[path]
+        header = "\n".join(_destructure(target, bindings) for target, bindings in imports)
+        if path == entry:
+            chunks.append(f"// {path}\n{header}\n{body}")
+            continue
+        body, exported = _strip_exports(body, path)
+        chunks.append(f"// {path}\nconst {_module_var(path)} = (() => {{\n{header}\n{body}\n"
+                      f"return {{ {', '.join(exported)} }};\n}})();")
+    return "\n".join(chunks)
+
+
+# ----------------------------------------------------------------------
+# Output
+# ----------------------------------------------------------------------
+
+def fingerprint(relative_path, data):
+    """Content-hashed output path, e.g. js/main.3f2a1b9c0d.js."""
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    stem, ext = os.path.splitext(relative_path)
+    return f"{stem}.{digest}{ext}"
+
+
+def write_asset(out_dir, relative_path, data, use_brotli=True):
+    """Write an asset and its precompressed variants; return the hashed path."""
+    hashed = fingerprint(relative_path, data)
+    target = os.path.join(out_dir, hashed)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as f:
+        f.write(data)
+
+    if hashed.endswith(COMPRESSIBLE_EXTENSIONS) and len(data) >= MIN_COMPRESS_SIZE:
+        with open(target + ".gz", "wb") as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None and use_brotli:
+            with open(target + ".br", "wb") as f:
+                f.write(brotli.compress(data, quality=11))
+    return hashed
+
+
+def build(out_dir=OUTPUT_DIR, minify=True, bundle=True, use_brotli=True):
+    """Build every asset and return the manifest."""
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+
+    manifest = {}
+    totals = [0, 0]
+
+    def add(url, relative_path, data):
+        hashed = write_asset(out_dir, relative_path, data, use_brotli)
+        manifest[url] = f"{OUTPUT_URL}/{hashed}"
+        totals[0] += 1
+        totals[1] += len(data)
+
+    # Images first so scripts can refer to their hashed names
+    for name in sorted(os.listdir(IMG_DIR)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with open(os.path.join(IMG_DIR, name), "rb") as f:
+                add(f"/img/{name}", f"img/{name}", f.read())
+
+    # Sprite atlas; the coordinate map points at the hashed images
+    atlas = SpriteAtlas(img_dir=IMG_DIR)
+    add("/sprites/atlas.svg", "sprites/atlas.svg", atlas.svg)
+    images = {"svg": manifest["/sprites/atlas.svg"]}
+    if atlas.can_rasterize:
+        for scale in SCALES:
+            add(f"/sprites/atlas@{scale}x.png", f"sprites/atlas@{scale}x.png", atlas.png(scale))
+            images[scale] = manifest[f"/sprites/atlas@{scale}x.png"]
+    else:
+        print("cairosvg is not installed; only the SVG sprite atlas was written (pip install cairosvg)")
+    add("/sprites/atlas.json", "sprites/atlas.json", atlas.to_json(images).encode("utf-8"))
+
+    def rewrite_images(source):
+        return IMG_LITERAL_RE.sub(lambda m: m.group(1) + manifest.get(m.group(2), m.group(2)) + m.group(1), source)
+
+    # Unbundled modules keep loading their imports from /static
+    for entry in MODULE_ENTRIES if bundle else []:
+        source = bundle_module(entry)
+        if DYNAMIC_IMPORT_RE.search(source):
+            print(f"Skipping {entry}: dynamic import() cannot be bundled")
+            continue
+        source = rewrite_images(source)
+        add(f"/static/{entry}", entry, (minify_js(source) if minify else source).encode("utf-8"))
+
+    for script in STANDALONE_SCRIPTS:
+        source = rewrite_images(read_text(os.path.join(STATIC_DIR, script)))
+        add(f"/static/{script}", script, (minify_js(source) if minify else source).encode("utf-8"))
+
+    for sheet in STYLESHEETS:
+        source = read_text(os.path.join(STATIC_DIR, sheet))
+        add(f"/static/{sheet}", sheet, (minify_css(source) if minify else source).encode("utf-8"))
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"Built {totals[0]} assets ({totals[1] / 1024:.1f} KB) into {out_dir}")
+    if brotli is None and use_brotli:
+        print("brotli is not installed; only gzip variants were written (pip install brotli)")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build fingerprinted, precompressed static assets')
+    parser.add_argument('--out', type=str, default=OUTPUT_DIR, help='Output directory')
+    parser.add_argument('--no-minify', action='store_true', help='Keep JavaScript and CSS unminified')
+    parser.add_argument('--no-bundle', action='store_true', help='Serve ES modules unbundled from /static')
+    parser.add_argument('--no-brotli', action='store_true', help='Only write gzip variants')
+
+    args = parser.parse_args()
+
+    try:
+        build(args.out, minify=not args.no_minify, bundle=not args.no_bundle, use_brotli=not args.no_brotli)
+    except BuildError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -62,7 +62,8 @@ def check_dependencies():
         "fastapi",
         "uvicorn",
         "jinja2",
-        "pydantic"
+        "pydantic",
+        "numpy"
     ]
     
     missing_packages = []
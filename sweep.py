@@ -0,0 +1,132 @@
+"""
+Ant Simulation Parameter Sweep
+
+Runs many headless colonies with different rule parameters across a process
+pool and writes the results to one columnar .npz file, then prints a summary
+table per parameter. Each run stops early once its score rate converges.
+
+Grid sweep (every combination, 4 seeds each):
+
+    python sweep.py --grid scout_ratio=0.2,0.3,0.4 --grid needed_cheese=3,4,5 --seeds 4
+
+Random sweep (500 samples from uniform ranges):
+
+    python sweep.py --random scout_ratio=0.1:0.5 --random decay_heat=1:3 --samples 500
+
+Thousands of tiny colonies, 256 per ensemble batch:
+
+    python sweep.py --random scout_ratio=0.1:0.5 --samples 2000 --ensemble 256
+
+Check that ensemble batches give the same results as single runs
+(compares the means of every configuration over 20 seeds):
+
+    python sweep.py --grid scout_ratio=0.2,0.4 --seeds 20 --ensemble 40 --parity
+
+Summarize an earlier results file:
+
+    python sweep.py --summarize sweeps/sweep-20240101-120000.npz
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from app.engine import sweep
+
+DEFAULT_PARITY_ENSEMBLE = 64
+
+
+def parse_number(name, text):
+    return int(text) if sweep.is_integer(name) else float(text)
+
+
+def parse_space(specs, separator):
+    """Parse name=v1,v2 (grid) or name=low:high (random) arguments."""
+    space = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in sweep.parameter_names():
+            raise ValueError(f"Unknown parameter '{name}' (choose from: {', '.join(sweep.parameter_names())})")
+        values = [parse_number(name, v) for v in values.split(separator)]
+        if separator == ":" and len(values) != 2:
+            raise ValueError(f"Random range for '{name}' must be low:high")
+        space[name] = values
+    return space
+
+
+def print_progress(done, total):
+    print(f"\r{done}/{total} runs", end="", flush=True)
+    if done == total:
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep colony parameters over headless seeded runs')
+    parser.add_argument('--grid', action='append', default=[], metavar='NAME=V1,V2',
+                        help='Grid values for a parameter (repeatable)')
+    parser.add_argument('--random', action='append', default=[], metavar='NAME=LOW:HIGH',
+                        help='Uniform range for a parameter (repeatable)')
+    parser.add_argument('--samples', type=int, default=100, help='Random configurations to draw')
+    parser.add_argument('--seeds', type=int, default=1, help='Seeded runs per configuration')
+    parser.add_argument('--ensemble', type=int, default=0, metavar='K',
+                        help='Advance runs in batches of K colonies as one ensemble (for small colonies)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--max-seconds', type=float, default=sweep.DEFAULT_OPTIONS['max_seconds'],
+                        help='Simulated seconds per run before giving up on convergence')
+    parser.add_argument('--tolerance', type=float, default=sweep.DEFAULT_OPTIONS['tolerance'],
+                        help='Relative score-rate change treated as converged')
+    parser.add_argument('--out', type=str, default=None, help='Results file (.npz)')
+    parser.add_argument('--summarize', type=str, default=None, help='Print the summary of a results file')
+    parser.add_argument('--list', action='store_true', help='List the parameters that can be swept')
+    parser.add_argument('--parity', action='store_true',
+                        help='Run the configurations singly and as ensembles and compare the results')
+
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(sweep.parameter_names()))
+        return
+
+    if args.summarize:
+        print(sweep.format_summary(sweep.load_results(args.summarize)))
+        return
+
+    options = {'max_seconds': args.max_seconds, 'tolerance': args.tolerance}
+    try:
+        configs = sweep.grid(parse_space(args.grid, ","))
+        if args.random:
+            samples = sweep.random_configs(parse_space(args.random, ":"), args.samples)
+            configs = [{**fixed, **sample} for fixed in configs for sample in samples]
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.parity:
+        if args.seeds < 2:
+            print("Error: --parity needs at least 2 seeds per configuration")
+            sys.exit(1)
+        ensemble = args.ensemble or DEFAULT_PARITY_ENSEMBLE
+        print(f"Running {len(configs) * args.seeds} runs twice, singly and in ensembles of {ensemble}")
+        report = sweep.parity(configs, args.seeds, ensemble, workers=args.workers, options=options,
+                              progress=print_progress)
+        print(sweep.format_parity(report))
+        if any(abs(result['z']) > sweep.PARITY_LIMIT for result in report.values()):
+            print(f"Error: ensemble results differ from single runs by more than {sweep.PARITY_LIMIT:g} SE")
+            sys.exit(1)
+        return
+
+    out = args.out or os.path.join("sweeps", f"sweep-{datetime.now():%Y%m%d-%H%M%S}.npz")
+    print(f"Running {len(configs) * args.seeds} runs ({len(configs)} configurations x {args.seeds} seeds)")
+
+    results = sweep.run_sweep(configs, seeds=args.seeds, workers=args.workers, options=options,
+                              progress=print_progress, ensemble=args.ensemble)
+    sweep.save_results(out, results)
+
+    print(f"Results saved to {out}")
+    print(f"Converged: {results['converged'].mean():.0%}, "
+          f"mean simulated time {results['seconds'].mean():.0f}s, total wall time {results['wall_time'].sum():.0f}s")
+    print(sweep.format_summary(results))
+
+if __name__ == '__main__':
+    main()
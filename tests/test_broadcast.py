@@ -0,0 +1,17 @@
+import json
+
+from app.broadcast import ClientStream
+
+
+def message(changes, hour):
+    return json.dumps({"type": "environment", "changes": changes, "environment": {"hour": hour}})
+
+
+def test_coalesced_environment_messages_keep_every_change():
+    stream = ClientStream(websocket=None)
+    stream.push_text(message([{"kind": "weather", "to": "rain"}], 8))
+    stream.push_text(message([{"kind": "night"}], 20))
+    assert len(stream.queue) == 1
+    sent = json.loads(stream.queue[0][1])
+    assert sent["changes"] == [{"kind": "weather", "to": "rain"}, {"kind": "night"}]
+    assert sent["environment"] == {"hour": 20}  # The newest snapshot wins
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.colonies import ColonyRegistry, ColonyRunner
+from app.engine import Colony
+
+
+def test_batch_error_fails_only_that_batch():
+    async def scenario():
+        runner = ColonyRunner("test", Colony(seed=1))
+
+        def broken(*args):
+            raise RuntimeError("boom")
+
+        runner.colony.place_foods = broken
+        runner.start()
+        try:
+            status, applied = runner.submit([{"type": "food", "x": 100, "y": 100}])
+            status = await asyncio.wait_for(applied, 5)
+            assert status["status"] == "failed" and status["error"] == "boom"
+            tick = runner.colony.tick
+            await asyncio.sleep(0.3)
+            assert runner.colony.tick > tick and runner.running
+        finally:
+            await runner.stop()
+
+    asyncio.run(scenario())
+
+
+def test_tick_error_stops_the_colony_and_fails_waiting_batches():
+    async def scenario():
+        registry = ColonyRegistry()
+        runner = registry.create(seed=1)
+        other = registry.create(seed=2)
+
+        def broken(interval_ms):
+            raise RuntimeError("boom")
+
+        runner.apply_commands = lambda: None  # Batches are still queued when the tick fails
+        runner.colony.step = broken
+        status, applied = runner.submit([{"type": "food", "x": 100, "y": 100}])
+        status = await asyncio.wait_for(applied, 5)
+        assert status["status"] == "failed" and "boom" in status["error"]
+        assert not runner.running and "boom" in runner.to_dict()["error"]
+        with pytest.raises(ValueError):
+            runner.submit([{"type": "food", "x": 100, "y": 100}])
+
+        await registry.shutdown()
+        assert not registry.runners and not other.running
+
+    asyncio.run(scenario())
+
+
+def test_stop_fails_queued_batches():
+    async def scenario():
+        runner = ColonyRunner("test", Colony(seed=1))
+        runner.start()
+        status, applied = runner.submit([{"type": "food", "x": 100, "y": 100}])
+        await runner.stop()
+        assert applied.done() and applied.result()["status"] == "failed"
+
+    asyncio.run(scenario())
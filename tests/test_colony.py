@@ -0,0 +1,11 @@
+from app.engine import Colony
+from app.engine import constants as C
+
+
+def test_deaths_before_the_first_drain_are_logged():
+    colony = Colony(seed=3)
+    colony.track_deaths()
+    burned, _ = colony.burn(*colony.queen, 1000)
+    ids, causes = colony.drain_deaths()
+    assert burned and len(ids) == burned == colony.burned
+    assert (causes == C.BURNED).all()
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from app.colonies import ColonyRunner
+from app.engine import Colony
+from app.engine.commands import parse_batch
+
+
+@pytest.mark.parametrize("command", [
+    {"type": "food", "x": 1e39, "y": 10},  # Finite as float64, inf as float32
+    {"type": "food", "x": [10, 801], "y": [10, 10]},
+    {"type": "obstacle", "x": 10, "y": -1},
+    {"type": "polyline", "points": [[10, 10], [1e39, 10]]},
+    {"type": "burn", "x": 1e39, "y": 10},
+    {"type": "removeObstacle", "x": 10, "y": 601},
+])
+def test_rejects_positions_outside_the_world(command):
+    with pytest.raises(ValueError):
+        parse_batch([command], 800, 600)
+
+
+def test_colony_keeps_ticking_after_a_rejected_batch():
+    async def scenario():
+        runner = ColonyRunner("test", Colony(seed=1))
+        runner.start()
+        try:
+            with pytest.raises(ValueError):
+                runner.submit([{"type": "food", "x": [100, 1e39], "y": [100, 100]}])
+            status, applied = runner.submit([{"type": "food", "x": 100, "y": 100}])
+            assert (await asyncio.wait_for(applied, 5))["status"] == "applied"
+            tick = runner.colony.tick
+            await asyncio.sleep(0.3)
+            assert runner.colony.tick > tick
+            assert not runner.task.done()
+        finally:
+            await runner.stop()
+
+    asyncio.run(scenario())
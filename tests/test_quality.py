@@ -0,0 +1,20 @@
+from app.engine.quality import QualityController
+
+
+def feed(controller, timings, samples=200):
+    for tick in range(samples):
+        controller.observe(tick, timings)
+
+
+def test_overage_in_an_unknobbed_subsystem_changes_no_knob():
+    controller = QualityController(target_ms=10.0)
+    feed(controller, {"ants": 30.0, "food": 1.0, "predators": 1.0, "index": 1.0, "stream": 1.0})
+    assert all(knob.level == 0 for knob in controller.knobs.values())
+    assert [entry["reason"] for entry in controller.log] == ["over target, no knob"]
+
+
+def test_overage_in_a_knobbed_subsystem_lowers_its_knob():
+    controller = QualityController(target_ms=10.0)
+    feed(controller, {"ants": 5.0, "stream": 20.0}, samples=20)
+    assert controller.knobs["stream_every"].level == 1
+    assert controller.log[-1]["knob"] == "stream_every"